@@ -0,0 +1,150 @@
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from io import BytesIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Benchmark de la exportación a Word: documento python-docx completo en memoria (ruta original de
+# filos.py), la ruta actual de las aplicaciones (documento intermedio completo en memoria y exportado
+# al pulsar la descarga) y el escritor incremental solo, que escribe cada sección al llegar sin
+# conservarla. Cada caso se ejecuta en un proceso aparte para medir su pico de memoria residente (RSS)
+# sin interferencias.
+# Uso: python benchmarks/bench_docx.py --secciones 100 1000 5000
+
+PALABRAS = (
+    "la virtud el alma razón naturaleza tiempo muerte amistad sabio fortuna deseo "
+    "libertad juicio placer dolor vida ciudad ley deber hábito verdad"
+).split()
+
+
+# Función para generar secciones adaptadas sintéticas con negritas, preguntas y varios párrafos
+def generar_documentos(num_secciones, parrafos_por_seccion=8, palabras_por_parrafo=60, semilla=0):
+    azar = random.Random(semilla)
+    documentos = {}
+    for i in range(1, num_secciones + 1):
+        parrafos = []
+        for j in range(parrafos_por_seccion):
+            frase = " ".join(azar.choice(PALABRAS) for _ in range(palabras_por_parrafo))
+            if j == 0:
+                parrafos.append(f"**Idea clave {j + 1}**\n{frase}.")
+            elif j % 3 == 0:
+                parrafos.append(f"{frase}.\n¿Qué harías tú en su lugar?")
+            else:
+                parrafos.append(frase + ".")
+        documentos[f"Parte {i // 100 + 1} > Capítulo {i // 10 + 1} > Sección {i}"] = "\n\n".join(parrafos)
+    return documentos
+
+
+# Ruta original: Document de python-docx completo en memoria y guardado en un BytesIO
+def construir_python_docx(documentos):
+    from docx import Document
+    from docx.shared import Pt
+
+    def texto_a_docx(paragraph, texto):
+        for line in texto.split('\n'):
+            if line.startswith("**") and line.endswith("**"):
+                run = paragraph.add_run(line.strip('*'))
+                run.bold = True
+            elif line.endswith("?"):
+                run = paragraph.add_run(line)
+                run.italic = True
+            else:
+                paragraph.add_run(line)
+        paragraph.add_run('\n')
+
+    doc = Document()
+    estilo_normal = doc.styles['Normal']
+    estilo_normal.font.name = 'Arial'
+    estilo_normal.font.size = Pt(12)
+    for titulo, contenido in documentos.items():
+        doc.add_heading(titulo, level=1)
+        for para in contenido.split('\n\n'):
+            texto_a_docx(doc.add_paragraph(), para)
+        doc.add_page_break()
+    buffer = BytesIO()
+    doc.save(buffer)
+    return buffer.getbuffer().nbytes
+
+
+# Ruta de las aplicaciones: se monta el documento intermedio completo y se exporta con el escritor incremental
+# La memoria incluye el documento intermedio, que se conserva para el resto de formatos y para el diario
+def construir_documento(documentos):
+    from documento import exportar
+    from pipeline import documento_obra
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = exportar(documento_obra(documentos), "docx", os.path.join(directorio, "obra.docx"))
+        return os.path.getsize(ruta)
+
+
+# Escritor incremental solo: cada sección se convierte y se escribe en el fichero sin guardarla
+def construir_escritor(documentos):
+    from docx_incremental import DocxIncremental
+    from formato import texto_a_parrafos
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "obra.docx")
+        with DocxIncremental(ruta) as doc:
+            for titulo, contenido in documentos.items():
+                doc.agregar_titulo(titulo, 1)
+                for estilo, runs in texto_a_parrafos(contenido, preguntas_en_cursiva=True):
+                    doc.agregar_parrafo(runs, estilo)
+                doc.salto_pagina()
+        return os.path.getsize(ruta)
+
+
+METODOS = {"python-docx": construir_python_docx, "documento": construir_documento, "escritor": construir_escritor}
+
+
+# Ejecuta un caso en el proceso actual y devuelve tiempo, tamaño y pico de RSS
+def ejecutar_caso(metodo, num_secciones):
+    documentos = generar_documentos(num_secciones)
+    rss_inicial = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    inicio = time.perf_counter()
+    tamano = METODOS[metodo](documentos)
+    segundos = time.perf_counter() - inicio
+    rss_pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {
+        "metodo": metodo,
+        "secciones": num_secciones,
+        "segundos": round(segundos, 3),
+        "tamano_kb": round(tamano / 1024, 1),
+        # ru_maxrss está en KB en Linux
+        "rss_pico_mb": round(rss_pico / 1024, 1),
+        "rss_extra_mb": round((rss_pico - rss_inicial) / 1024, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara la exportación a Word en memoria con la del documento intermedio y la incremental")
+    parser.add_argument("--secciones", type=int, nargs="+", default=[100, 1000, 5000])
+    parser.add_argument("--caso", nargs=2, metavar=("METODO", "SECCIONES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.caso:
+        print(json.dumps(ejecutar_caso(args.caso[0], int(args.caso[1]))))
+        sys.exit(0)
+
+    resultados = []
+    for num_secciones in args.secciones:
+        for metodo in METODOS:
+            salida = subprocess.run(
+                [sys.executable, __file__, "--caso", metodo, str(num_secciones)],
+                check=True, capture_output=True, text=True,
+            )
+            resultado = json.loads(salida.stdout)
+            resultados.append(resultado)
+            print(
+                f"{metodo:12} {num_secciones:6} secciones: {resultado['segundos']:8.2f} s, "
+                f"pico RSS {resultado['rss_pico_mb']:7.1f} MB (+{resultado['rss_extra_mb']:.1f} MB), "
+                f"{resultado['tamano_kb']:.0f} KB",
+                file=sys.stderr,
+            )
+    print(json.dumps(resultados, indent=2))
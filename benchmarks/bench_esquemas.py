@@ -0,0 +1,102 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from esquemas import parse_esquema, validar_esquema  # noqa: E402
+
+# Benchmark de la lectura del esquema del libro: el parse_esquema original de seneca.py (solo "Capítulo N" y
+# "- Sección N") frente a esquemas.parse_esquema con validar_esquema, sobre un corpus de variantes del esquema
+# con los formatos que suelen devolver los modelos (esquemas.json). Cada variante indica cuántos capítulos
+# y secciones se pidieron y los títulos que se esperan; una variante se da por buena si el esquema leído tiene
+# exactamente esos capítulos y secciones y los primeros títulos coinciden.
+# Uso: python benchmarks/bench_esquemas.py --repeticiones 200
+# Termina con código 1 si el analizador nuevo falla en alguna variante.
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "esquemas.json")
+
+
+# Analizador original de seneca.py
+def parse_esquema_original(esquema):
+    capitulos = {}
+    cap_pattern = re.compile(r'Capítulo\s*\d+[:\.\-]?\s*(.*)', re.IGNORECASE)
+    seccion_pattern = re.compile(r'(?:-|\*)\s*Sección\s*\d+[:\.\-]?\s*(.*)', re.IGNORECASE)
+
+    cap = None
+    for linea in esquema.split('\n'):
+        cap_match = cap_pattern.match(linea)
+        if cap_match:
+            cap = cap_match.group(1).strip()
+            capitulos[cap] = []
+            continue
+        seccion_match = seccion_pattern.match(linea)
+        if seccion_match and cap:
+            seccion = seccion_match.group(1).strip()
+            capitulos[cap].append(seccion)
+
+    return capitulos
+
+
+def leer_original(variante):
+    return parse_esquema_original(variante["texto"])
+
+
+def leer_nuevo(variante):
+    return validar_esquema(parse_esquema(variante["texto"]), variante["capitulos"], variante["secciones"])[0]
+
+
+METODOS = {"original": leer_original, "tolerante": leer_nuevo}
+
+
+def es_correcto(capitulos, variante):
+    if len(capitulos) != variante["capitulos"]:
+        return False
+    if any(len(secciones) != variante["secciones"] for secciones in capitulos.values()):
+        return False
+    primer_capitulo, primeras_secciones = next(iter(capitulos.items()))
+    return primer_capitulo == variante["primer_capitulo"] and primeras_secciones[0] == variante["primera_seccion"]
+
+
+# Función para medir el mejor de varios recorridos completos sobre el corpus
+def medir(funcion, corpus, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for variante in corpus:
+            funcion(variante)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de la lectura del esquema del libro")
+    parser.add_argument("--corpus", default=CORPUS, help="Fichero JSON con las variantes del esquema")
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--detalle", action="store_true", help="Incluir lo leído en cada variante")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    resultado = {"variantes": len(corpus), "metodos": {}}
+    for nombre, funcion in METODOS.items():
+        variantes = {}
+        for variante in corpus:
+            capitulos = funcion(variante)
+            variantes[variante["nombre"]] = {"correcto": es_correcto(capitulos, variante) if capitulos else False}
+            if args.detalle:
+                variantes[variante["nombre"]]["capitulos"] = capitulos
+        segundos = medir(funcion, corpus, args.repeticiones)
+        resultado["metodos"][nombre] = {
+            "correctas": sum(1 for datos in variantes.values() if datos["correcto"]),
+            "fallidas": [nombre_variante for nombre_variante, datos in variantes.items() if not datos["correcto"]],
+            "ms_por_esquema": round(segundos * 1000 / len(corpus), 4),
+            "variantes": variantes,
+        }
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    sys.exit(1 if resultado["metodos"]["tolerante"]["fallidas"] else 0)
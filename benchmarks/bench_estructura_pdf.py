@@ -0,0 +1,93 @@
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from estructura_pdf import estructurar_texto, extraer_texto_paginas  # noqa: E402
+from pdf_sintetico import escribir_pdf, generar_paginas  # noqa: E402
+
+# Benchmark del extractor de estructura: versión original de filos.py frente a la de una sola pasada
+# Uso: python benchmarks/bench_estructura_pdf.py --paginas 1000
+
+
+# Versión original de extraer_estructura_pdf (a partir del texto de las páginas), conservada solo como referencia
+def estructurar_texto_original(paginas):
+    texto_completo = ""
+    for texto_pagina in paginas:
+        texto_completo += texto_pagina + "\n"
+
+    patron_parte = re.compile(r'Parte\s+\w+', re.IGNORECASE)
+    patron_capitulo = re.compile(r'Capítulo\s+\d+', re.IGNORECASE)
+    patron_seccion = re.compile(r'Sección\s+\d+', re.IGNORECASE)
+
+    def capitulos_de(texto, destino):
+        capitulos = patron_capitulo.findall(texto)
+        indices_capitulos = [m.start() for m in patron_capitulo.finditer(texto)]
+        indices_capitulos.append(len(texto))
+        for j in range(len(capitulos)):
+            texto_capitulo = texto[indices_capitulos[j]:indices_capitulos[j + 1]]
+            titulo_capitulo = capitulos[j].strip()
+            destino[titulo_capitulo] = {}
+            secciones = patron_seccion.findall(texto_capitulo)
+            indices_secciones = [m.start() for m in patron_seccion.finditer(texto_capitulo)]
+            indices_secciones.append(len(texto_capitulo))
+            if secciones:
+                for k in range(len(secciones)):
+                    texto_seccion = texto_capitulo[indices_secciones[k]:indices_secciones[k + 1]]
+                    titulo_seccion = secciones[k].strip()
+                    destino[titulo_capitulo][titulo_seccion] = texto_seccion.replace(titulo_seccion, '').strip()
+            else:
+                destino[titulo_capitulo] = texto_capitulo.replace(titulo_capitulo, '').strip()
+
+    estructura = {}
+    partes = patron_parte.findall(texto_completo)
+    if partes:
+        indices_partes = [m.start() for m in patron_parte.finditer(texto_completo)]
+        indices_partes.append(len(texto_completo))
+        for i in range(len(partes)):
+            texto_parte = texto_completo[indices_partes[i]:indices_partes[i + 1]]
+            estructura[partes[i].strip()] = {}
+            capitulos_de(texto_parte, estructura[partes[i].strip()])
+    else:
+        capitulos_de(texto_completo, estructura)
+    return estructura
+
+
+# Función para medir tiempo y memoria máxima de una función
+def medir(funcion, argumento):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    resultado = funcion(argumento)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultado, {"segundos": round(segundos, 3), "pico_mb": round(pico / 1024 / 1024, 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara el extractor de estructura original con el nuevo")
+    parser.add_argument("--paginas", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "obra.pdf")
+        escribir_pdf(generar_paginas(args.paginas), ruta)
+
+        paginas, metricas_extraccion = medir(extraer_texto_paginas, ruta)
+
+    original, metricas_original = medir(estructurar_texto_original, paginas)
+    nuevo, metricas_nuevo = medir(estructurar_texto, paginas)
+
+    print(json.dumps({
+        "paginas": args.paginas,
+        "extraccion_texto": metricas_extraccion,
+        "original": metricas_original,
+        "una_pasada": metricas_nuevo,
+        "misma_estructura": original == nuevo,
+    }, indent=2))
@@ -0,0 +1,110 @@
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from formato import texto_a_parrafos  # noqa: E402
+
+# Micro-benchmark de la conversión de formato: BeautifulSoup por párrafo (html_a_docx original de seneca2.py)
+# frente al tokenizador de una sola pasada de formato.py, sobre la salida sintética de las 65 cartas.
+# Uso: python benchmarks/bench_formato.py --cartas 65 --repeticiones 5
+
+PALABRAS = (
+    "the leader team meeting deadline stress balance email strategy growth mind time "
+    "virtue wisdom focus burnout colleague project budget calm discipline purpose"
+).split()
+
+
+# Función para generar la adaptación sintética de una carta con el formato que devuelve el modelo
+def generar_carta(numero, azar, parrafos=18, palabras_por_parrafo=90):
+    bloques = [f"<h2>Letter {numero}: On {azar.choice(PALABRAS).title()}</h2>"]
+    for j in range(parrafos):
+        palabras = [azar.choice(PALABRAS) for _ in range(palabras_por_parrafo)]
+        for k in range(3, len(palabras) - 3, 17):
+            palabras[k] = f"<i>{palabras[k]}</i>"
+        for k in range(9, len(palabras) - 3, 29):
+            palabras[k] = f"<b>{palabras[k]} {palabras[k + 1]}</b>"
+            palabras[k + 1] = ""
+        texto = " ".join(p for p in palabras if p) + " &amp; more."
+        if j % 6 == 5:
+            bloques.append(f"<h3>{azar.choice(PALABRAS).title()} at work</h3>")
+        bloques.append(texto)
+    return "\n\n".join(bloques)
+
+
+# Conversión original: un BeautifulSoup por párrafo, solo con los elementos de primer nivel
+def html_a_parrafo_original(html_text):
+    from bs4 import BeautifulSoup
+
+    estilo = None
+    runs = []
+    soup = BeautifulSoup(html_text, 'html.parser')
+    for elem in soup:
+        if isinstance(elem, str):
+            runs.append((str(elem), False, False))
+        elif elem.name in ['i', 'em']:
+            runs.append((elem.get_text(), False, True))
+        elif elem.name in ['b', 'strong']:
+            runs.append((elem.get_text(), True, False))
+        elif re.match(r'h[1-6]', elem.name):
+            estilo = f'Heading{int(elem.name[1])}'
+            runs.append((elem.get_text(), False, False))
+        else:
+            runs.append((elem.get_text(), False, False))
+    return estilo, runs
+
+
+def convertir_original(texto):
+    return [html_a_parrafo_original(parrafo) for parrafo in texto.split('\n\n')]
+
+
+METODOS = {"beautifulsoup": convertir_original, "una_pasada": texto_a_parrafos}
+
+
+# Función para medir el mejor de varios recorridos completos sobre todas las cartas
+def medir(funcion, cartas, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        parrafos = sum(len(funcion(carta)) for carta in cartas)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return parrafos, mejor
+
+
+def texto_plano(parrafos):
+    return ["".join(texto for texto, _, _ in runs) for _, runs in parrafos]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara la conversión de formato con BeautifulSoup y en una pasada")
+    parser.add_argument("--cartas", type=int, default=65)
+    parser.add_argument("--repeticiones", type=int, default=5)
+    args = parser.parse_args()
+
+    azar = random.Random(0)
+    cartas = [generar_carta(numero, azar) for numero in range(1, args.cartas + 1)]
+    megabytes = sum(len(carta.encode("utf-8")) for carta in cartas) / 1024 / 1024
+
+    # Ambas conversiones deben producir el mismo texto en estas cartas (sin etiquetas anidadas)
+    for carta in cartas[:5]:
+        assert texto_plano(convertir_original(carta)) == texto_plano(texto_a_parrafos(carta))
+
+    resultados = {"cartas": args.cartas, "megabytes": round(megabytes, 2)}
+    for nombre, funcion in METODOS.items():
+        parrafos, segundos = medir(funcion, cartas, args.repeticiones)
+        resultados[nombre] = {
+            "segundos": round(segundos, 4),
+            "parrafos": parrafos,
+            "parrafos_por_segundo": round(parrafos / segundos),
+            "mb_por_segundo": round(megabytes / segundos, 2),
+        }
+        print(f"{nombre:14} {segundos:7.3f} s  {parrafos / segundos:10.0f} párrafos/s  {megabytes / segundos:6.2f} MB/s",
+              file=sys.stderr)
+    resultados["aceleracion"] = round(resultados["beautifulsoup"]["segundos"] / resultados["una_pasada"]["segundos"], 1)
+    print(json.dumps(resultados, indent=2))
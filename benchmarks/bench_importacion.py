@@ -0,0 +1,84 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Benchmark del tiempo de importación de cada punto de entrada (las tres apps y la CLI)
+# Para cada script se ejecutan sus importaciones de primer nivel en un intérprete nuevo, como al arrancar un
+# contenedor: primero streamlit (que no depende de nosotros) y luego el resto, y se anotan las dependencias
+# pesadas que han quedado cargadas. Con --directorio se mide otra copia del repositorio, por ejemplo una
+# revisión anterior sacada con git worktree, para comparar.
+# Uso: python benchmarks/bench_importacion.py --repeticiones 10
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PUNTOS_DE_ENTRADA = ("filos.py", "seneca.py", "seneca2.py", "cli.py")
+PESADOS = ("requests", "bs4", "PyPDF2", "docx", "urllib3", "lxml")
+
+CODIGO = """
+import json, sys, time
+sys.path.insert(0, {directorio!r})
+inicio = time.perf_counter()
+{importaciones_streamlit}
+medio = time.perf_counter()
+{importaciones_app}
+fin = time.perf_counter()
+print(json.dumps({{
+    "streamlit_ms": (medio - inicio) * 1000,
+    "app_ms": (fin - medio) * 1000,
+    "pesados": [modulo for modulo in {pesados!r} if modulo in sys.modules],
+}}))
+"""
+
+
+# Función para separar las importaciones de primer nivel de un script en las de streamlit y las demás
+def importaciones(ruta):
+    with open(ruta, encoding="utf-8") as f:
+        arbol = ast.parse(f.read())
+    streamlit, app = [], []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.Import):
+            modulos = [alias.name for alias in nodo.names]
+        elif isinstance(nodo, ast.ImportFrom):
+            modulos = [nodo.module or ""]
+        else:
+            continue
+        destino = streamlit if all(modulo.split(".")[0] == "streamlit" for modulo in modulos) else app
+        destino.append(ast.unparse(nodo))
+    return "\n".join(streamlit) or "pass", "\n".join(app) or "pass"
+
+
+# Función para medir las importaciones de un script en repeticiones intérpretes nuevos
+def medir(directorio, script, repeticiones):
+    importaciones_streamlit, importaciones_app = importaciones(os.path.join(directorio, script))
+    codigo = CODIGO.format(directorio=directorio, importaciones_streamlit=importaciones_streamlit,
+                           importaciones_app=importaciones_app, pesados=PESADOS)
+    muestras = []
+    for _ in range(repeticiones):
+        salida = subprocess.run([sys.executable, "-c", codigo], cwd=directorio, capture_output=True, text=True,
+                                check=True).stdout
+        muestras.append(json.loads(salida.strip().splitlines()[-1]))
+    return {
+        "streamlit_ms": round(statistics.median(m["streamlit_ms"] for m in muestras), 1),
+        "app_ms": round(statistics.median(m["app_ms"] for m in muestras), 1),
+        "pesados_cargados": muestras[-1]["pesados"],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark del tiempo de importación de las apps y la CLI")
+    parser.add_argument("--directorio", default=RAIZ, help="Copia del repositorio que se mide")
+    parser.add_argument("--scripts", default=",".join(PUNTOS_DE_ENTRADA), help="Puntos de entrada, separados por comas")
+    parser.add_argument("--repeticiones", type=int, default=5, help="Intérpretes nuevos por script (se da la mediana)")
+    args = parser.parse_args()
+
+    directorio = os.path.abspath(args.directorio)
+    resultado = {
+        "directorio": directorio,
+        "python": sys.version.split()[0],
+        "repeticiones": args.repeticiones,
+        "scripts": {script: medir(directorio, script, args.repeticiones) for script in args.scripts.split(",")},
+    }
+    print(json.dumps(resultado, ensure_ascii=False, indent=2))
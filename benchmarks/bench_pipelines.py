@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import estructura_pdf  # noqa: E402
+from cartas_wikisource import extraer_texto_carta  # noqa: E402
+from cliente_llm import crear_cliente, respuesta_simulada  # noqa: E402
+from documento import FORMATOS, Documento  # noqa: E402
+from estructura_pdf import aplanar_estructura, estructurar_texto, extraer_estructura_pdf, extraer_texto_paginas  # noqa: E402
+from formato import texto_a_parrafos  # noqa: E402
+from html_sintetico import generar_cartas  # noqa: E402
+from metricas import Metricas  # noqa: E402
+from pdf_sintetico import escribir_pdf, generar_paginas  # noqa: E402
+from pipeline import (  # noqa: E402
+    OBRA_TITULO,
+    adaptar_cartas_concurrente,
+    adaptar_contenidos_concurrente,
+    agregar_seccion_obra,
+    documento_cartas,
+    documento_libro,
+    exportar_a_bytes,
+    generar_esquema,
+    generar_libro,
+    parse_esquema,
+)
+from servidor_falso import iniciar_servidor, texto_simulado  # noqa: E402
+
+# Benchmark de extremo a extremo de las tres aplicaciones contra el servidor falso, sin Streamlit ni red
+# Genera una obra en PDF y cartas con el HTML de Wikisource, arranca servidor_falso en un hilo y repite
+# los pasos de filos.py, seneca2.py y seneca.py midiendo cada etapa con metricas.Metricas. Además mide
+# por separado las funciones que más CPU consumen (estructura del PDF, texto de las cartas, formato y esquema).
+# El resultado es JSON (en --salida o por la salida estándar). Con --referencia se compara con un resultado
+# anterior y se termina con código 1 si alguna medida empeora más de --tolerancia.
+# Uso: python benchmarks/bench_pipelines.py --salida base.json
+#      python benchmarks/bench_pipelines.py --latencia 0.5 --tasa-429 0.05 --referencia base.json
+API_KEY = "falsa"
+MINIMO_COMPARABLE = 0.01  # Segundos por debajo de los cuales una medida es ruido y no se compara
+
+
+# Función para ejecutar el flujo de filos.py: extraer la estructura, adaptar las secciones y exportar
+def pipeline_obra(datos_pdf, url, cliente, args):
+    metricas = Metricas()
+    inicio = time.perf_counter()
+    with metricas.etapa("extraccion_pdf"):
+        secciones = aplanar_estructura(extraer_estructura_pdf(datos_pdf, args.procesos))
+    documento = Documento(OBRA_TITULO)
+    errores = []
+    with metricas.etapa("adaptacion"):
+        adaptar_contenidos_concurrente(
+            secciones, API_KEY, url, max_concurrencia=args.concurrencia, cliente=cliente,
+            al_completar=lambda titulo, adaptacion, error, hechos, total: error and errores.append(titulo),
+            al_terminar_seccion=lambda titulo, adaptacion: agregar_seccion_obra(documento, titulo, adaptacion),
+            umbral_lote=args.lotes, metricas=metricas,
+        )
+    for formato in FORMATOS:
+        exportar_a_bytes(documento, formato, metricas)
+    return resultado_pipeline(metricas, inicio, secciones=len(secciones), errores=len(errores))
+
+
+# Función para ejecutar el flujo de seneca2.py: texto de cada carta desde su HTML, adaptación y exportación
+def pipeline_cartas(paginas, url, cliente, args):
+    metricas = Metricas()
+    inicio = time.perf_counter()
+    errores = []
+
+    def obtener_texto(numero):
+        with metricas.etapa("obtener_carta"):
+            return extraer_texto_carta(paginas[numero])
+
+    def al_completar(clave, adaptacion, error):
+        if error:
+            errores.append(clave)
+
+    with metricas.etapa("adaptacion"):
+        documentos = adaptar_cartas_concurrente(
+            sorted(paginas), obtener_texto, API_KEY, url, max_concurrencia=args.concurrencia, cliente=cliente,
+            al_completar=al_completar, metricas=metricas,
+        )
+    with metricas.etapa("documento"):
+        documento = documento_cartas(documentos)
+    for formato in FORMATOS:
+        exportar_a_bytes(documento, formato, metricas)
+    return resultado_pipeline(metricas, inicio, cartas=len(paginas), errores=len(errores))
+
+
+# Función para ejecutar el flujo de seneca.py: esquema, secciones en paralelo, documento y exportación
+def pipeline_libro(url, cliente, args):
+    metricas = Metricas()
+    inicio = time.perf_counter()
+    with metricas.etapa("esquema"):
+        esquema = generar_esquema("Benchmark", args.capitulos, args.secciones, API_KEY, url, cliente, metricas=metricas)
+    with metricas.etapa("parse_esquema"):
+        capitulos = parse_esquema(esquema)
+    errores = []
+    with metricas.etapa("secciones"):
+        libro = generar_libro(
+            "Benchmark", capitulos, API_KEY, url, cliente=cliente, max_concurrencia=args.concurrencia,
+            al_completar=lambda seccion, contenido, error, hechos, total: error and errores.append(seccion),
+            metricas=metricas,
+        )
+    with metricas.etapa("documento"):
+        documento = documento_libro(libro)
+    for formato in FORMATOS:
+        exportar_a_bytes(documento, formato, metricas)
+    return resultado_pipeline(metricas, inicio, secciones=sum(len(s) for s in capitulos.values()), errores=len(errores))
+
+
+def resultado_pipeline(metricas, inicio, **datos):
+    resumen = metricas.resumen()
+    return {
+        "segundos": time.perf_counter() - inicio,
+        **datos,
+        "etapas": {nombre: etapa["segundos_total"] for nombre, etapa in resumen["etapas"].items()},
+        "solicitudes": resumen["solicitudes"],
+    }
+
+
+# Función para medir el mejor tiempo de varias repeticiones de funcion(argumento)
+def medir(funcion, argumento, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion(argumento)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor
+
+
+# Extracción del texto sin la memoria de PDFs ya leídos, para medir siempre el trabajo completo
+def extraer_sin_memoria(ruta_pdf):
+    estructura_pdf._paginas_en_memoria.clear()
+    return extraer_texto_paginas(ruta_pdf)
+
+
+# Funciones que más CPU consumen, medidas por separado con las mismas entradas sintéticas
+def medir_funciones(ruta_pdf, paginas_html, args):
+    paginas = extraer_texto_paginas(ruta_pdf)
+    textos_cartas = [extraer_texto_carta(html) for html in paginas_html.values()]
+    respuestas = [texto_simulado(texto, max(args.palabras_respuesta, 300)) for texto in textos_cartas]
+    prompt_esquema = f"esquema con {args.capitulos * 10} capítulos y {args.secciones * 5} secciones"
+    esquema = respuesta_simulada({"messages": [{"content": prompt_esquema}]})
+    return {
+        "extraer_texto_paginas": medir(extraer_sin_memoria, ruta_pdf, args.repeticiones),
+        "estructurar_texto": medir(estructurar_texto, paginas, args.repeticiones),
+        "extraer_texto_carta": medir(lambda htmls: [extraer_texto_carta(html) for html in htmls],
+                                     list(paginas_html.values()), args.repeticiones),
+        "texto_a_parrafos": medir(lambda textos: [texto_a_parrafos(texto) for texto in textos], respuestas, args.repeticiones),
+        "parse_esquema": medir(parse_esquema, esquema, args.repeticiones),
+    }
+
+
+# Función para obtener el commit actual, si el benchmark se ejecuta dentro del repositorio
+def commit_actual():
+    try:
+        salida = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=10,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return salida.stdout.strip() or None
+
+
+# Función para aplanar los tiempos comparables del resultado: {"pipelines.obra.etapas.adaptacion": segundos}
+def tiempos(resultado):
+    planos = {}
+    for nombre, pipeline in resultado["pipelines"].items():
+        planos[f"pipelines.{nombre}.segundos"] = pipeline["segundos"]
+        for etapa, segundos in pipeline["etapas"].items():
+            planos[f"pipelines.{nombre}.etapas.{etapa}"] = segundos
+    for nombre, segundos in resultado["funciones"].items():
+        planos[f"funciones.{nombre}"] = segundos
+    return planos
+
+
+# Función para comparar con un resultado anterior; devuelve las medidas que empeoran más de la tolerancia
+def comparar(resultado, referencia, tolerancia):
+    actuales = tiempos(resultado)
+    regresiones = []
+    for clave, anterior in tiempos(referencia).items():
+        actual = actuales.get(clave)
+        if actual is None or anterior < MINIMO_COMPARABLE:
+            continue
+        cambio = actual / anterior - 1
+        print(f"{clave:50} {anterior:9.3f} s -> {actual:9.3f} s  {cambio:+7.1%}", file=sys.stderr)
+        if cambio > tolerancia:
+            regresiones.append({"medida": clave, "referencia": anterior, "actual": actual, "cambio": round(cambio, 3)})
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de extremo a extremo de las tres aplicaciones")
+    parser.add_argument("--pipelines", default="obra,cartas,libro", help="Flujos a medir, separados por comas")
+    parser.add_argument("--paginas", type=int, default=200, help="Páginas del PDF sintético")
+    parser.add_argument("--cartas", type=int, default=20, help="Cartas sintéticas de Wikisource")
+    parser.add_argument("--parrafos", type=int, default=18, help="Párrafos por carta")
+    parser.add_argument("--capitulos", type=int, default=5)
+    parser.add_argument("--secciones", type=int, default=4, help="Secciones por capítulo")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    parser.add_argument("--procesos", type=int, default=1, help="Procesos para extraer el PDF")
+    parser.add_argument("--lotes", type=int, default=0, help="Umbral de agrupación de secciones en lotes (0 sin lotes)")
+    parser.add_argument("--latencia", type=float, default=0.2, help="Segundos de espera del servidor por solicitud")
+    parser.add_argument("--latencia-token", type=float, default=0.0, help="Segundos entre fragmentos en streaming")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429 (0-1)")
+    parser.add_argument("--tasa-500", type=float, default=0.0, help="Proporción de respuestas 500 (0-1)")
+    parser.add_argument("--palabras-respuesta", type=int, default=400, help="Palabras aproximadas de cada respuesta")
+    parser.add_argument("--repeticiones", type=int, default=3, help="Repeticiones de las medidas de funciones")
+    parser.add_argument("--salida", help="Fichero JSON donde guardar el resultado")
+    parser.add_argument("--referencia", help="Resultado anterior con el que comparar")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="Empeoramiento relativo admitido (0.25 = 25%%)")
+    args = parser.parse_args()
+    pipelines = [nombre.strip() for nombre in args.pipelines.split(",") if nombre.strip()]
+
+    servidor, url = iniciar_servidor(
+        latencia=args.latencia, latencia_token=args.latencia_token, tasa_429=args.tasa_429, tasa_500=args.tasa_500,
+        palabras_respuesta=args.palabras_respuesta,
+    )
+    # Reintentos rápidos: los 429 y 500 inyectados no deben dominar el tiempo medido
+    cliente = crear_cliente({"reintentos": 8, "umbral_fallos": 1000})
+    cliente.espera_base = 0.05
+    cliente.espera_maxima = 1.0
+
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta_pdf = os.path.join(directorio, "obra.pdf")
+        escribir_pdf(generar_paginas(args.paginas), ruta_pdf)
+        with open(ruta_pdf, "rb") as f:
+            datos_pdf = f.read()
+        _, paginas_html = generar_cartas(args.cartas, args.parrafos)
+
+        resultado = {
+            "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": commit_actual(),
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "parametros": vars(args),
+            "pipelines": {},
+        }
+        for nombre in pipelines:
+            print(f"Midiendo {nombre}...", file=sys.stderr)
+            if nombre == "obra":
+                resultado["pipelines"]["obra"] = pipeline_obra(datos_pdf, url, cliente, args)
+            elif nombre == "cartas":
+                resultado["pipelines"]["cartas"] = pipeline_cartas(paginas_html, url, cliente, args)
+            elif nombre == "libro":
+                resultado["pipelines"]["libro"] = pipeline_libro(url, cliente, args)
+            else:
+                sys.exit(f"Flujo desconocido: {nombre}")
+        print("Midiendo funciones...", file=sys.stderr)
+        resultado["funciones"] = medir_funciones(ruta_pdf, paginas_html, args)
+    servidor.shutdown()
+
+    codigo = 0
+    if args.referencia:
+        with open(args.referencia, encoding="utf-8") as f:
+            resultado["regresiones"] = comparar(resultado, json.load(f), args.tolerancia)
+        codigo = 1 if resultado["regresiones"] else 0
+
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+    sys.exit(codigo)
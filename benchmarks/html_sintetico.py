@@ -0,0 +1,138 @@
+import argparse
+import os
+import random
+
+# Generador de páginas HTML con la estructura de Wikisource (índice y cartas) para los benchmarks
+# Imita lo que devuelve en.wikisource.org: cabecera con scripts y estilos, menús de navegación,
+# la cabecera de la obra en una tabla, los párrafos en div.mw-parser-output con notas al pie y el pie de página.
+# Uso: python benchmarks/html_sintetico.py directorio/ --cartas 65 --parrafos 18
+
+PALABRAS = (
+    "the mind virtue nature reason death time friend wise fortune desire freedom judgment pleasure "
+    "pain life soul philosophy Lucilius letter body wealth fear anger leisure study"
+).split()
+
+CABECERA = """<!DOCTYPE html>
+<html class="client-nojs" lang="en" dir="ltr">
+<head>
+<meta charset="UTF-8">
+<title>{titulo} - Wikisource, the free online library</title>
+<script>document.documentElement.className="client-js";RLCONF={{"wgPageName":"{pagina}","wgNamespaceNumber":0}};</script>
+<link rel="stylesheet" href="/w/load.php?lang=en&amp;modules=site.styles&amp;only=styles&amp;skin=vector">
+{estilos}
+</head>
+<body class="mediawiki ltr sitedir-ltr ns-0 page-{pagina} skin-vector action-view">
+<div id="mw-page-base" class="noprint"></div>
+<div id="mw-head-base" class="noprint"></div>
+<div id="content" class="mw-body" role="main">
+<h1 id="firstHeading" class="firstHeading">{titulo}</h1>
+<div id="bodyContent" class="vector-body">
+<div id="siteSub" class="noprint">From Wikisource</div>
+<div id="mw-content-text" class="mw-body-content" lang="en" dir="ltr">
+<div class="mw-parser-output">
+"""
+
+PIE = """</div>
+</div>
+</div>
+</div>
+<div id="mw-navigation"><h2>Navigation menu</h2>
+<div id="mw-head"><nav id="p-personal" class="vector-menu" aria-labelledby="p-personal-label"><ul>{menu}</ul></nav></div>
+<div id="mw-panel"><nav id="p-navigation" class="vector-menu portal"><ul>{menu}</ul></nav></div>
+</div>
+<footer id="footer" class="mw-footer" role="contentinfo"><ul id="footer-info"><li>This page was last edited on 1 January 2024.</li></ul></footer>
+<script>RLQ.push(function(){{mw.config.set({{"wgBackendResponseTime":120}});}});</script>
+</body>
+</html>
+"""
+
+
+def _estilos(azar):
+    return "\n".join(
+        f'<style data-mw-deduplicate="TemplateStyles:r{azar.randrange(10**6, 10**7)}">'
+        f'.mw-parser-output .ws-{indice}{{margin:0 auto;max-width:36em;text-align:justify}}</style>'
+        for indice in range(6)
+    )
+
+
+def _menu():
+    return "".join(f'<li id="n-{nombre}"><a href="/wiki/{nombre}">{nombre.title()}</a></li>'
+                   for nombre in ("main", "random", "portals", "authors", "help", "community", "changes", "donate"))
+
+
+def _frase(azar, palabras):
+    frase = " ".join(azar.choice(PALABRAS) for _ in range(palabras))
+    return frase[0].upper() + frase[1:] + "."
+
+
+def _pagina(titulo, pagina, cuerpo, azar):
+    return (CABECERA.format(titulo=titulo, pagina=pagina, estilos=_estilos(azar)) + cuerpo
+            + PIE.format(menu=_menu()))
+
+
+# Función para generar la página de una carta con parrafos párrafos de unas palabras_por_parrafo palabras
+def generar_carta_html(numero, azar, parrafos=18, palabras_por_parrafo=110):
+    titulo = f"Moral letters to Lucilius/Letter {numero}"
+    partes = [
+        '<table class="ws-header headertemplate"><tbody><tr>'
+        f'<td class="header_backlink"><a href="/wiki/Moral_letters_to_Lucilius/Letter_{max(numero - 1, 1)}">← Letter {numero - 1}</a></td>'
+        f'<td class="header_title"><b>Moral letters to Lucilius</b><br>by <a href="/wiki/Author:Seneca">Seneca</a></td>'
+        f'<td class="header_forelink"><a href="/wiki/Moral_letters_to_Lucilius/Letter_{numero + 1}">Letter {numero + 1} →</a></td>'
+        '</tr></tbody></table>',
+        f'<div class="prp-pages-output"><h2><span class="mw-headline" id="Letter_{numero}">'
+        f'Letter {numero}: On {azar.choice(PALABRAS).title()}</span></h2>',
+    ]
+    notas = []
+    for indice in range(1, parrafos + 1):
+        frases = [_frase(azar, azar.randint(8, 18)) for _ in range(max(1, palabras_por_parrafo // 13))]
+        texto = " ".join(frases)
+        if indice % 4 == 0:
+            # Referencia a una nota al pie, como en las cartas con notas del traductor
+            notas.append(_frase(azar, 12))
+            texto += (f'<sup id="cite_ref-{len(notas)}" class="reference">'
+                      f'<a href="#cite_note-{len(notas)}">[{len(notas)}]</a></sup>')
+        if indice % 7 == 0:
+            texto = f"<i>{texto}</i>"
+        partes.append(f'<p><span class="pagenum ws-pagenum" id="{numero}.{indice}"></span>{indice}. {texto}\n</p>')
+    partes.append("</div>")
+    partes.append('<div class="reflist"><ol class="references">' + "".join(
+        f'<li id="cite_note-{indice}"><span class="reference-text">{nota}</span></li>'
+        for indice, nota in enumerate(notas, start=1)
+    ) + "</ol></div>")
+    partes.append('<div class="licenseContainer licenseBanner"><table class="licenseTemplate"><tr>'
+                  '<td>This work is in the public domain.</td></tr></table></div>')
+    return _pagina(titulo, f"Moral_letters_to_Lucilius_Letter_{numero}", "\n".join(partes), azar)
+
+
+# Función para generar la página de índice con los enlaces a las cartas
+def generar_indice_html(total_cartas, azar):
+    enlaces = "\n".join(
+        f'<li><a href="/wiki/Moral_letters_to_Lucilius/Letter_{numero}" title="Moral letters to Lucilius/Letter {numero}">'
+        f'Letter {numero}</a>: On {azar.choice(PALABRAS).title()}</li>'
+        for numero in range(1, total_cartas + 1)
+    )
+    return _pagina("Moral letters to Lucilius", "Moral_letters_to_Lucilius", f"<ul>\n{enlaces}\n</ul>", azar)
+
+
+# Función para generar el índice y las cartas en memoria: (indice, {numero: html})
+def generar_cartas(total_cartas, parrafos=18, palabras_por_parrafo=110, semilla=0):
+    azar = random.Random(semilla)
+    indice = generar_indice_html(total_cartas, azar)
+    return indice, {numero: generar_carta_html(numero, azar, parrafos, palabras_por_parrafo)
+                    for numero in range(1, total_cartas + 1)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera páginas HTML sintéticas con la estructura de Wikisource")
+    parser.add_argument("directorio")
+    parser.add_argument("--cartas", type=int, default=65)
+    parser.add_argument("--parrafos", type=int, default=18, help="Párrafos por carta")
+    parser.add_argument("--palabras", type=int, default=110, help="Palabras por párrafo")
+    args = parser.parse_args()
+    os.makedirs(args.directorio, exist_ok=True)
+    indice, cartas = generar_cartas(args.cartas, args.parrafos, args.palabras)
+    with open(os.path.join(args.directorio, "indice.html"), "w", encoding="utf-8") as f:
+        f.write(indice)
+    for numero, html in cartas.items():
+        with open(os.path.join(args.directorio, f"carta_{numero}.html"), "w", encoding="utf-8") as f:
+            f.write(html)
@@ -0,0 +1,84 @@
+import argparse
+import random
+
+# Generador de PDFs sintéticos con partes, capítulos y secciones para los benchmarks
+# Escribe el PDF a mano (Helvetica con WinAnsiEncoding) para no depender de librerías de escritura.
+
+PALABRAS = (
+    "la virtud el alma razón naturaleza tiempo muerte amistad sabio fortuna deseo "
+    "libertad juicio placer dolor vida ciudad ley deber hábito verdad"
+).split()
+
+
+# Función para generar las líneas de texto de cada página de la obra
+def generar_paginas(num_paginas, lineas_por_pagina=45, paginas_por_capitulo=10, secciones_por_capitulo=3,
+                    capitulos_por_parte=10, semilla=0):
+    azar = random.Random(semilla)
+    paginas = []
+    capitulo = 0
+    parte = 0
+    # Página (dentro del capítulo) en la que empieza cada sección
+    inicios_seccion = {k * paginas_por_capitulo // secciones_por_capitulo: k + 1 for k in range(secciones_por_capitulo)}
+    for num in range(num_paginas):
+        lineas = []
+        if num % paginas_por_capitulo == 0:
+            if capitulo % capitulos_por_parte == 0:
+                parte += 1
+                lineas.append(f"Parte {parte}")
+            capitulo += 1
+            lineas.append(f"Capítulo {capitulo}")
+        if num % paginas_por_capitulo in inicios_seccion:
+            lineas.append(f"Sección {inicios_seccion[num % paginas_por_capitulo]}")
+        while len(lineas) < lineas_por_pagina:
+            lineas.append(" ".join(azar.choice(PALABRAS) for _ in range(12)))
+        paginas.append(lineas)
+    return paginas
+
+
+def _escapar(linea):
+    return linea.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)").encode("cp1252", "replace")
+
+
+# Función para escribir las páginas como un PDF mínimo válido
+def escribir_pdf(paginas, ruta):
+    objetos = []  # Cuerpos de los objetos, numerados a partir de 1
+
+    def agregar(cuerpo):
+        objetos.append(cuerpo)
+        return len(objetos)
+
+    catalogo = agregar(None)
+    arbol = agregar(None)
+    fuente = agregar(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    hojas = []
+    for lineas in paginas:
+        contenido = b"BT /F1 10 Tf 12 TL 50 780 Td " + b" ".join(b"(" + _escapar(l) + b") Tj T*" for l in lineas) + b" ET"
+        flujo = agregar(b"<< /Length %d >>\nstream\n" % len(contenido) + contenido + b"\nendstream")
+        hojas.append(agregar(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>"
+            % (arbol, fuente, flujo)
+        ))
+    objetos[catalogo - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % arbol
+    objetos[arbol - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (
+        b" ".join(b"%d 0 R" % h for h in hojas), len(hojas)
+    )
+
+    with open(ruta, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        posiciones = []
+        for num, cuerpo in enumerate(objetos, start=1):
+            posiciones.append(f.tell())
+            f.write(b"%d 0 obj\n" % num + cuerpo + b"\nendobj\n")
+        inicio_xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1))
+        for pos in posiciones:
+            f.write(b"%010d 00000 n \n" % pos)
+        f.write(b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, catalogo, inicio_xref))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un PDF sintético con estructura de obra filosófica")
+    parser.add_argument("ruta")
+    parser.add_argument("--paginas", type=int, default=1000)
+    args = parser.parse_args()
+    escribir_pdf(generar_paginas(args.paginas), args.ruta)
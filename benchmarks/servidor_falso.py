@@ -0,0 +1,176 @@
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cliente_llm import respuesta_simulada  # noqa: E402
+
+# Servidor local que imita /v1/chat/completions para medir el rendimiento sin gastar en la API real
+# Uso: python benchmarks/servidor_falso.py --puerto 8765 --latencia 1.5
+# y en .streamlit/secrets.toml: [api] url = "http://127.0.0.1:8765/v1/chat/completions"
+
+
+PALABRAS = (
+    "the virtue reason mind team student leader time habit goal calm focus purpose wisdom "
+    "friend fear change growth choice value"
+).split()
+
+
+# Función para generar una respuesta en Markdown de unas palabras palabras (encabezados, listas, negritas),
+# determinista para cada prompt, de modo que el formato y la exportación trabajen como con respuestas reales
+def texto_simulado(prompt, palabras=0):
+    if not palabras:
+        return f"Adaptación simulada de {len(prompt)} caracteres."
+    azar = random.Random(len(prompt))
+    bloques = []
+    escritas = 0
+    while escritas < palabras:
+        if len(bloques) % 6 == 0:
+            bloques.append(f"## {azar.choice(PALABRAS).title()} and {azar.choice(PALABRAS)}")
+        elif len(bloques) % 6 == 4:
+            bloques.append("\n".join(f"- **{azar.choice(PALABRAS).title()}**: {' '.join(azar.choices(PALABRAS, k=8))}"
+                                     for _ in range(3)))
+            escritas += 27
+        else:
+            frase = azar.choices(PALABRAS, k=60)
+            frase[5] = f"*{frase[5]}*"
+            frase[20] = f"**{frase[20]}**"
+            bloques.append(" ".join(frase).capitalize() + ".")
+            escritas += 60
+    return "\n\n".join(bloques)
+
+
+class ManejadorChat(BaseHTTPRequestHandler):
+    latencia = 1.0
+    latencia_token = 0.01  # Pausa entre fragmentos cuando se pide stream=True
+    tasa_429 = 0.0  # Proporción de solicitudes que responden 429 con Retry-After
+    tasa_500 = 0.0  # Proporción de solicitudes que responden 500
+    retry_after = 1
+    palabras_respuesta = 0  # Longitud aproximada de las respuestas normales; 0 para una frase corta
+    solicitudes = 0
+    candado = threading.Lock()
+
+    def log_message(self, formato, *args):
+        pass
+
+    def do_POST(self):
+        longitud = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(longitud) or b"{}")
+        with ManejadorChat.candado:
+            ManejadorChat.solicitudes += 1
+
+        azar = random.random()
+        if azar < self.tasa_429:
+            self.responder_error(429, "Rate limit reached", {"Retry-After": str(self.retry_after)})
+            return
+        if azar < self.tasa_429 + self.tasa_500:
+            self.responder_error(500, "Internal server error")
+            return
+
+        time.sleep(self.latencia)
+        prompt = payload.get("messages", [{}])[-1].get("content", "")
+        # Los prompts de lote (pipeline.prompt_obra_lote) y de esquema se responden como el backend local
+        contenido = respuesta_simulada(payload, lambda payload: texto_simulado(prompt, self.palabras_respuesta))
+        if payload.get("stream"):
+            self.responder_streaming(payload, contenido)
+            return
+
+        cuerpo = json.dumps({
+            "id": "chatcmpl-falso",
+            "object": "chat.completion",
+            "model": payload.get("model", "falso"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": contenido}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(contenido) // 4},
+        }).encode("utf-8")
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def responder_error(self, codigo, mensaje, cabeceras=None):
+        cuerpo = json.dumps({"error": {"message": mensaje, "code": codigo}}).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        for nombre, valor in (cabeceras or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    # Envía el contenido palabra a palabra como server-sent events
+    def responder_streaming(self, payload, contenido):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        palabras = contenido.split(" ")
+        for i, palabra in enumerate(palabras):
+            fragmento = palabra if i == 0 else " " + palabra
+            evento = {
+                "id": "chatcmpl-falso",
+                "object": "chat.completion.chunk",
+                "model": payload.get("model", "falso"),
+                "choices": [{"index": 0, "delta": {"content": fragmento}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(evento)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+            time.sleep(self.latencia_token)
+        if payload.get("stream_options", {}).get("include_usage"):
+            prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+            evento = {
+                "id": "chatcmpl-falso",
+                "object": "chat.completion.chunk",
+                "model": payload.get("model", "falso"),
+                "choices": [],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(palabras)},
+            }
+            self.wfile.write(f"data: {json.dumps(evento)}\n\n".encode("utf-8"))
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+# Función para arrancar el servidor en un hilo (útil desde otros benchmarks)
+def iniciar_servidor(puerto=0, latencia=1.0, latencia_token=0.01, tasa_429=0.0, tasa_500=0.0, retry_after=1,
+                     palabras_respuesta=0):
+    ManejadorChat.latencia = latencia
+    ManejadorChat.latencia_token = latencia_token
+    ManejadorChat.tasa_429 = tasa_429
+    ManejadorChat.tasa_500 = tasa_500
+    ManejadorChat.retry_after = retry_after
+    ManejadorChat.palabras_respuesta = palabras_respuesta
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), ManejadorChat)
+    hilo = threading.Thread(target=servidor.serve_forever, daemon=True)
+    hilo.start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}/v1/chat/completions"
+    return servidor, url
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor falso de chat completions")
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--latencia", type=float, default=1.0, help="Segundos de espera por solicitud")
+    parser.add_argument("--latencia-token", type=float, default=0.01, help="Segundos entre fragmentos en streaming")
+    parser.add_argument("--tasa-429", type=float, default=0.0, help="Proporción de respuestas 429 (0-1)")
+    parser.add_argument("--tasa-500", type=float, default=0.0, help="Proporción de respuestas 500 (0-1)")
+    parser.add_argument("--retry-after", type=int, default=1, help="Segundos indicados en Retry-After de los 429")
+    parser.add_argument("--palabras-respuesta", type=int, default=0, help="Palabras aproximadas de cada respuesta")
+    args = parser.parse_args()
+
+    servidor, url = iniciar_servidor(
+        args.puerto, args.latencia, args.latencia_token, args.tasa_429, args.tasa_500, args.retry_after,
+        args.palabras_respuesta,
+    )
+    print(f"Servidor falso escuchando en {url}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.shutdown()
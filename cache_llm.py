@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Caché persistente de respuestas del modelo, direccionada por contenido
+# La clave es un hash de (modelo, temperatura, prompt de sistema, prompt de usuario),
+# así que el mismo prompt nunca se paga dos veces aunque Streamlit vuelva a ejecutar el script.
+
+RUTA_CACHE = os.environ.get("ESTOICOS_CACHE", os.path.join(".cache", "adaptaciones.sqlite"))
+TAMANO_MAXIMO = 200 * 1024 * 1024  # 200 MB
+TTL = 30 * 24 * 3600  # 30 días
+
+
+# Función para calcular la clave de una solicitud
+def clave_solicitud(modelo, temperatura, sistema, prompt):
+    datos = json.dumps([modelo, temperatura, sistema, prompt], ensure_ascii=False)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()
+
+
+class CacheLLM:
+    def __init__(self, ruta=RUTA_CACHE, tamano_maximo=TAMANO_MAXIMO, ttl=TTL):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self.tamano_maximo = tamano_maximo
+        self.ttl = ttl
+        self.aciertos = 0
+        self.fallos = 0
+        self._candado = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS respuestas ("
+            " clave TEXT PRIMARY KEY, valor TEXT NOT NULL, tamano INTEGER NOT NULL,"
+            " creado REAL NOT NULL, usado REAL NOT NULL)"
+        )
+        self._conexion.execute("CREATE INDEX IF NOT EXISTS idx_usado ON respuestas (usado)")
+        self._conexion.commit()
+
+    # Devuelve la respuesta guardada o None si no existe o ha caducado
+    def obtener(self, clave):
+        ahora = time.time()
+        with self._candado:
+            fila = self._conexion.execute(
+                "SELECT valor, creado FROM respuestas WHERE clave = ?", (clave,)
+            ).fetchone()
+            if fila is None or ahora - fila[1] > self.ttl:
+                if fila is not None:
+                    self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+                    self._conexion.commit()
+                self.fallos += 1
+                return None
+            self._conexion.execute("UPDATE respuestas SET usado = ? WHERE clave = ?", (ahora, clave))
+            self._conexion.commit()
+            self.aciertos += 1
+            return fila[0]
+
+    def guardar(self, clave, valor):
+        ahora = time.time()
+        with self._candado:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO respuestas (clave, valor, tamano, creado, usado) VALUES (?, ?, ?, ?, ?)",
+                (clave, valor, len(valor.encode("utf-8")), ahora, ahora),
+            )
+            self._desalojar()
+            self._conexion.commit()
+
+    # Elimina las entradas caducadas y, si se supera el tamaño máximo, las usadas hace más tiempo (LRU)
+    def _desalojar(self):
+        self._conexion.execute("DELETE FROM respuestas WHERE creado < ?", (time.time() - self.ttl,))
+        total = self._conexion.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas").fetchone()[0]
+        if total <= self.tamano_maximo:
+            return
+        for clave, tamano in self._conexion.execute(
+            "SELECT clave, tamano FROM respuestas ORDER BY usado ASC"
+        ).fetchall():
+            self._conexion.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+            total -= tamano
+            if total <= self.tamano_maximo:
+                break
+
+    def estadisticas(self):
+        with self._candado:
+            entradas, tamano = self._conexion.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM respuestas"
+            ).fetchone()
+        return {"aciertos": self.aciertos, "fallos": self.fallos, "entradas": entradas, "tamano": tamano}
+
+    def vaciar(self):
+        with self._candado:
+            self._conexion.execute("DELETE FROM respuestas")
+            self._conexion.commit()
+
+
+# Función para consultar la caché antes de llamar al modelo
+# generar() solo se ejecuta si no hay respuesta guardada; con omitir=True se ignora lo guardado pero se actualiza
+def con_cache(cache, modelo, temperatura, sistema, prompt, generar, omitir=False):
+    if cache is None:
+        return generar()
+    clave = clave_solicitud(modelo, temperatura, sistema, prompt)
+    if not omitir:
+        valor = cache.obtener(clave)
+        if valor is not None:
+            return valor
+    valor = generar()
+    if valor:
+        cache.guardar(clave, valor)
+    return valor
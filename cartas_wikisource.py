@@ -0,0 +1,137 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+# Espejo local de las cartas de Wikisource
+# Guarda solo el texto de los párrafos (no el HTML) junto con ETag/Last-Modified,
+# de modo que las ejecuciones siguientes se sirven desde disco y la revalidación es condicional.
+# requests y BeautifulSoup se importan cuando hacen falta (al crear la sesión o al descargar una carta):
+# si todas las cartas están en el espejo no se llegan a cargar.
+
+URL_INDICE = "https://en.wikisource.org/wiki/Moral_letters_to_Lucilius"
+URL_CARTA = URL_INDICE + "/Letter_{numero}"
+RUTA_ESPEJO = os.environ.get("ESTOICOS_ESPEJO", os.path.join(".cache", "cartas.sqlite"))
+TOTAL_CARTAS_POR_DEFECTO = 65
+TIMEOUT = 30
+
+
+# Función para crear una sesión HTTP con conexiones reutilizables
+def crear_sesion(max_conexiones=8):
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    sesion = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=max_conexiones, pool_maxsize=max_conexiones)
+    sesion.mount("https://", adaptador)
+    sesion.mount("http://", adaptador)
+    sesion.headers["User-Agent"] = "estoicos/1.0 (adaptador de cartas de Séneca)"
+    return sesion
+
+
+# Función para extraer el texto de los párrafos de una página de carta
+# Solo se construye el árbol del contenido principal, no el de toda la página
+def extraer_texto_carta(html):
+    from bs4 import BeautifulSoup, SoupStrainer
+
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer('div', {'class': 'mw-parser-output'}))
+    content_div = soup.find('div', {'class': 'mw-parser-output'})
+    if not content_div:
+        return None
+    return "\n\n".join([para.get_text() for para in content_div.find_all('p')])
+
+
+# Función para averiguar cuántas cartas hay realmente enlazadas en el índice
+def descubrir_total_cartas(sesion, por_defecto=TOTAL_CARTAS_POR_DEFECTO):
+    import requests
+
+    try:
+        response = sesion.get(URL_INDICE, timeout=TIMEOUT)
+    except requests.RequestException:
+        return por_defecto
+    if response.status_code != 200:
+        return por_defecto
+    numeros = [int(n) for n in re.findall(r'/Letter_(\d+)', response.text)]
+    return max(numeros) if numeros else por_defecto
+
+
+class EspejoCartas:
+    def __init__(self, ruta=RUTA_ESPEJO):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._candado = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS cartas ("
+            " numero INTEGER PRIMARY KEY, texto TEXT, etag TEXT, last_modified TEXT, revisado REAL NOT NULL)"
+        )
+        self._conexion.commit()
+
+    def leer(self, numero):
+        with self._candado:
+            return self._conexion.execute(
+                "SELECT texto, etag, last_modified FROM cartas WHERE numero = ?", (numero,)
+            ).fetchone()
+
+    def escribir(self, numero, texto, etag, last_modified):
+        with self._candado:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO cartas (numero, texto, etag, last_modified, revisado) VALUES (?, ?, ?, ?, ?)",
+                (numero, texto, etag, last_modified, time.time()),
+            )
+            self._conexion.commit()
+
+    def marcar_revisada(self, numero):
+        with self._candado:
+            self._conexion.execute("UPDATE cartas SET revisado = ? WHERE numero = ?", (time.time(), numero))
+            self._conexion.commit()
+
+    def numeros_guardados(self):
+        with self._candado:
+            return [fila[0] for fila in self._conexion.execute("SELECT numero FROM cartas ORDER BY numero")]
+
+    # Devuelve el texto de la carta; solo va a la red si no está en disco o si se pide revalidar
+    def obtener(self, numero, sesion, revalidar=False):
+        guardada = self.leer(numero)
+        if guardada is not None and not revalidar:
+            return guardada[0]
+
+        headers = {}
+        if guardada is not None:
+            if guardada[1]:
+                headers["If-None-Match"] = guardada[1]
+            if guardada[2]:
+                headers["If-Modified-Since"] = guardada[2]
+
+        import requests
+
+        try:
+            response = sesion.get(URL_CARTA.format(numero=numero), headers=headers, timeout=TIMEOUT)
+        except requests.RequestException:
+            return guardada[0] if guardada is not None else None
+
+        if response.status_code == 304 and guardada is not None:
+            self.marcar_revisada(numero)
+            return guardada[0]
+        if response.status_code != 200:
+            return guardada[0] if guardada is not None else None
+
+        texto = extraer_texto_carta(response.content)
+        if texto is None:
+            # Página sin el contenido esperado: no se guarda, para volver a pedirla la próxima vez
+            return guardada[0] if guardada is not None else None
+        self.escribir(numero, texto, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return texto
+
+    # Descarga en bloque las cartas indicadas reutilizando las conexiones de la sesión
+    def descargar_todas(self, sesion, numeros, max_concurrencia=8, revalidar=False, al_completar=None):
+        with ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+            futuros = {executor.submit(self.obtener, numero, sesion, revalidar): numero for numero in numeros}
+            for futuro in as_completed(futuros):
+                numero = futuros[futuro]
+                texto = futuro.result()
+                if al_completar:
+                    al_completar(numero, texto)
@@ -0,0 +1,343 @@
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from cache_llm import CacheLLM
+from cartas_wikisource import EspejoCartas, crear_sesion
+from cliente_llm import crear_cliente, crear_enrutador
+from documento import FORMATOS, Documento, exportar
+from estructura_pdf import aplanar_estructura, extraer_estructura_pdf, hash_pdf
+from fragmentos import PRESUPUESTO_TOKENS, UMBRAL_LOTE
+from metricas import Metricas
+from revisiones import RegistroRevisiones, comparar_ediciones, huellas_secciones
+from pipeline import (
+    OBRA_TITULO,
+    adaptar_cartas_concurrente,
+    adaptar_contenidos_concurrente,
+    agregar_seccion_obra,
+    cargar_configuracion,
+    documento_cartas,
+    documento_libro,
+    generar_libro,
+    obtener_esquema,
+)
+from trabajos import DiarioTrabajo, id_trabajo
+
+# Entrada por línea de comandos para procesar lotes sin Streamlit (cron, CI, un servidor)
+# Usa la misma lógica que las aplicaciones y los mismos diarios de trabajo, así que un lote
+# interrumpido se reanuda al volver a lanzar el mismo comando.
+#
+# Las claves se leen de las variables de entorno (OPENAI_API_KEY, XAI_API_KEY, OPENAI_API_URL, XAI_API_URL)
+# o de un fichero TOML con el formato de .streamlit/secrets.toml (--config o ESTOICOS_CONFIG).
+# Las secciones [backends] y [enrutado.obra|cartas|libro] de ese fichero eligen backend y modelo por tamaño;
+# con un backend por defecto en el enrutado (por ejemplo tipo = "local") no hace falta la clave de la API.
+#
+# Ejemplos:
+#   python cli.py obra obra1.pdf obra2.pdf --salida adaptadas/
+#   python cli.py obra obra.pdf --lotes 600
+#   python cli.py obra obra_corregida.pdf --incremental
+#   python cli.py cartas 1-10,15 --salida cartas.docx
+#   python cli.py --formatos docx,epub cartas 1-10 --salida cartas
+#   python cli.py libro "Introducción a la Estoa" --capitulos 5 --secciones 4 --salida libro.md
+#   python cli.py --metricas metricas.prom obra obra.pdf
+#   python cli.py cache --vaciar
+
+
+def informar(mensaje):
+    print(mensaje, file=sys.stderr, flush=True)
+
+
+# Función para convertir "1-10,15,20-22" en [1, ..., 10, 15, 20, 21, 22]
+def parsear_rangos(texto):
+    numeros = []
+    for parte in texto.split(","):
+        parte = parte.strip()
+        if not parte:
+            continue
+        inicio, _, fin = parte.partition("-")
+        try:
+            inicio = int(inicio)
+            fin = int(fin) if fin else inicio
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"Rango de cartas no válido: {parte}")
+        if inicio < 1 or fin < inicio:
+            raise argparse.ArgumentTypeError(f"Rango de cartas no válido: {parte}")
+        numeros.extend(n for n in range(inicio, fin + 1) if n not in numeros)
+    if not numeros:
+        raise argparse.ArgumentTypeError("Indica al menos una carta")
+    return numeros
+
+
+# Función para convertir "docx,epub" en ["docx", "epub"]
+def parsear_formatos(texto):
+    formatos = [formato.strip().lower() for formato in texto.split(",") if formato.strip()]
+    for formato in formatos:
+        if formato not in FORMATOS:
+            raise argparse.ArgumentTypeError(f"Formato no válido: {formato} (disponibles: {', '.join(FORMATOS)})")
+    if not formatos:
+        raise argparse.ArgumentTypeError("Indica al menos un formato")
+    return formatos
+
+
+def requerir_clave(config, seccion, variable, enrutador=None):
+    if enrutador and enrutador.backend:
+        return config[seccion]["key"]
+    if not config[seccion]["key"]:
+        sys.exit(f"Falta la clave de API: define {variable} o usa --config con un fichero de secrets")
+    return config[seccion]["key"]
+
+
+# Función para guardar el documento en cada formato pedido, junto a la ruta de salida
+# Sin --formatos se usa el de la extensión de la ruta o, si no se reconoce, el indicado por defecto
+def guardar_documento(documento, ruta, formatos, por_defecto, metricas):
+    base, extension = os.path.splitext(ruta)
+    if not formatos:
+        formatos = [clave for clave, datos in FORMATOS.items() if datos["extension"] == extension.lower()] or [por_defecto]
+    rutas = []
+    for formato in formatos:
+        with metricas.etapa(f"exportacion_{formato}"):
+            rutas.append(exportar(documento, formato, base + FORMATOS[formato]["extension"]))
+    return rutas
+
+
+# Función para mostrar un resumen de las métricas y guardarlas en JSON o, con extensión .prom, para Prometheus
+def informar_metricas(metricas, ruta):
+    solicitudes = metricas.resumen()["solicitudes"]
+    if solicitudes["total"]:
+        latencia = solicitudes["latencia_segundos"]
+        informar(
+            f"{solicitudes['total']} solicitudes ({solicitudes['fallidas']} fallidas); latencia p50 {latencia['p50']:.2f} s, "
+            f"p90 {latencia['p90']:.2f} s; {solicitudes['tokens_entrada']} tokens de entrada y {solicitudes['tokens_salida']} "
+            f"de salida; coste estimado {solicitudes['coste_estimado_usd']:.4f} USD"
+        )
+    if ruta:
+        with open(ruta, "w", encoding="utf-8") as f:
+            f.write(metricas.a_prometheus() if ruta.endswith(".prom") else metricas.a_json())
+        informar(f"Métricas guardadas en {ruta}")
+
+
+def comando_obra(args, config, cache, cliente, enrutador, metricas):
+    api_key = requerir_clave(config, "obra", "OPENAI_API_KEY", enrutador)
+    os.makedirs(args.salida, exist_ok=True)
+    revisiones = RegistroRevisiones()
+    fallos = 0
+    for ruta_pdf in args.pdfs:
+        with open(ruta_pdf, "rb") as f:
+            datos_pdf = f.read()
+        with metricas.etapa("extraccion_pdf"):
+            secciones = aplanar_estructura(extraer_estructura_pdf(datos_pdf, args.procesos))
+        if not secciones:
+            informar(f"{ruta_pdf}: no se pudieron extraer partes, capítulos o secciones")
+            fallos += 1
+            continue
+
+        # Mismo id que usa filos.py para el mismo PDF y opciones, así que ambos comparten el diario
+        pdf_hash = hash_pdf(datos_pdf)
+        diario = DiarioTrabajo(id_trabajo("obra", pdf_hash, sorted(secciones), args.presupuesto, args.solapamiento))
+        informar(f"{ruta_pdf}: {len(secciones)} secciones (trabajo {diario.id})")
+        huellas = huellas_secciones(secciones)
+        anterior = revisiones.edicion_anterior(huellas, pdf_hash)
+        if anterior:
+            cambios = comparar_ediciones(anterior[1], huellas)
+            informar(
+                f"{ruta_pdf}: respecto a la edición anterior, {len(cambios['sin_cambios'])} secciones sin cambios, "
+                f"{len(cambios['modificadas'])} modificadas, {len(cambios['nuevas'])} nuevas y {len(cambios['eliminadas'])} eliminadas"
+            )
+
+        def al_completar(titulo, adaptacion, error, hechos, total):
+            if error:
+                informar(f"  Error al adaptar {titulo}: {error}")
+            informar(f"  [{hechos}/{total}] {titulo}")
+
+        inicio = time.perf_counter()
+        documento = Documento(OBRA_TITULO)
+        estadisticas_lotes = {}
+        with metricas.etapa("adaptacion"):
+            adaptar_contenidos_concurrente(
+                secciones, api_key, config["obra"]["url"], max_concurrencia=args.concurrencia, al_completar=al_completar,
+                cache=cache, omitir_cache=args.sin_cache, presupuesto_tokens=args.presupuesto,
+                solapamiento=args.solapamiento, cliente=cliente, diario=diario,
+                al_terminar_seccion=lambda titulo, adaptacion: agregar_seccion_obra(documento, titulo, adaptacion),
+                umbral_lote=args.lotes, estadisticas_lotes=estadisticas_lotes, enrutador=enrutador, metricas=metricas,
+                revisiones=revisiones, solo_cambios=args.incremental, deduplicar=not args.conservar_duplicados,
+            )
+        revisiones.guardar_edicion(pdf_hash, huellas)
+        if estadisticas_lotes["secciones_reutilizadas"]:
+            informar(f"{ruta_pdf}: {estadisticas_lotes['secciones_reutilizadas']} secciones reutilizadas de ediciones anteriores")
+        if estadisticas_lotes["solicitudes_evitadas"]:
+            informar(
+                f"{ruta_pdf}: {estadisticas_lotes['secciones_descartadas']} secciones descartadas (vacías o del índice), "
+                f"{estadisticas_lotes['secciones_duplicadas']} duplicadas y {estadisticas_lotes['secciones_conservadas']} "
+                f"cortas sin adaptar; {estadisticas_lotes['solicitudes_evitadas']} solicitudes "
+                f"y unos {estadisticas_lotes['tokens_evitados']} tokens de prompt evitados"
+            )
+        if estadisticas_lotes["lotes"]:
+            informar(
+                f"{ruta_pdf}: {estadisticas_lotes['solicitudes']} solicitudes en lugar de {estadisticas_lotes['solicitudes_sin_lotes']} "
+                f"({estadisticas_lotes['lotes']} lotes, {estadisticas_lotes['lotes_fallidos']} repetidos uno a uno); "
+                f"unos {estadisticas_lotes['tokens_ahorrados']} de {estadisticas_lotes['tokens_prompt_sin_lotes']} tokens de prompt ahorrados"
+            )
+        # El documento queda junto al diario para que filos.py ofrezca las descargas sin repetir el trabajo
+        diario.guardar_documento(documento.a_json())
+        fallos += len(diario.fallidos())
+        nombre = os.path.splitext(os.path.basename(ruta_pdf))[0] + "_adaptado"
+        rutas = guardar_documento(documento, os.path.join(args.salida, nombre), args.formatos, "docx", metricas)
+        informar(f"{ruta_pdf}: guardado en {', '.join(rutas)} ({time.perf_counter() - inicio:.1f} s)")
+    return 1 if fallos else 0
+
+
+def comando_cartas(args, config, cache, cliente, enrutador, metricas):
+    api_key = requerir_clave(config, "cartas", "XAI_API_KEY", enrutador)
+    espejo = EspejoCartas()
+    sesion = crear_sesion()
+    # Mismo id que usa seneca2.py para la misma lista de cartas
+    diario = DiarioTrabajo(id_trabajo("cartas", args.cartas))
+    informar(f"{len(args.cartas)} cartas (trabajo {diario.id})")
+
+    inicio = time.perf_counter()
+
+    # Las cartas se anuncian según terminan; el documento se monta después, en el orden pedido
+    def al_completar(clave, adaptacion, error):
+        if error:
+            informar(f"  Error al adaptar {clave}: {error}")
+        else:
+            informar(f"  {clave}")
+
+    with metricas.etapa("adaptacion"):
+        documentos = adaptar_cartas_concurrente(
+            args.cartas, lambda numero: espejo.obtener(numero, sesion), api_key, config["cartas"]["url"],
+            max_concurrencia=args.concurrencia, cache=cache, omitir_cache=args.sin_cache, cliente=cliente,
+            diario=diario, al_completar=al_completar, enrutador=enrutador, metricas=metricas,
+        )
+    with metricas.etapa("documento"):
+        documento = documento_cartas(documentos)
+    diario.guardar_documento(documento.a_json())
+    rutas = guardar_documento(documento, args.salida, args.formatos, "docx", metricas)
+    informar(f"Guardado en {', '.join(rutas)} ({time.perf_counter() - inicio:.1f} s)")
+    return 1 if diario.fallidos() else 0
+
+
+def comando_libro(args, config, cache, cliente, enrutador, metricas):
+    api_key = requerir_clave(config, "libro", "XAI_API_KEY", enrutador)
+    url = config["libro"]["url"]
+    inicio = time.perf_counter()
+    with metricas.etapa("esquema"):
+        capitulos, esquema, avisos = obtener_esquema(
+            args.titulo, args.capitulos, args.secciones, api_key, url, cliente, enrutador=enrutador, metricas=metricas,
+        )
+    for aviso in avisos:
+        informar(f"  Aviso: {aviso}")
+    if not capitulos:
+        informar(esquema)
+        sys.exit("No se pudieron extraer los capítulos y secciones del esquema generado")
+    errores = []
+
+    def al_completar(seccion, contenido, error, hechos, total):
+        if error:
+            errores.append(seccion)
+            informar(f"  Error al generar la sección '{seccion}': {error}")
+        informar(f"  [{hechos}/{total}] {seccion}")
+
+    estadisticas = {}
+    with metricas.etapa("secciones"):
+        libro = generar_libro(
+            args.titulo, capitulos, api_key, url, cache, args.sin_cache, cliente,
+            max_concurrencia=args.concurrencia, al_completar=al_completar, estadisticas=estadisticas,
+            enrutador=enrutador, metricas=metricas,
+        )
+    latencias = sorted(estadisticas["segundos_seccion"].values())
+    if latencias:
+        informar(
+            f"{estadisticas['secciones']} secciones en {estadisticas['segundos_total']:.1f} s; "
+            f"latencia por sección: mediana {statistics.median(latencias):.2f} s, máxima {latencias[-1]:.2f} s"
+        )
+    with metricas.etapa("documento"):
+        documento = documento_libro(libro)
+    rutas = guardar_documento(documento, args.salida, args.formatos, "md", metricas)
+    informar(f"Guardado en {', '.join(rutas)} ({time.perf_counter() - inicio:.1f} s)")
+    return 1 if errores else 0
+
+
+# Estadísticas de la caché de adaptaciones; con --vaciar se borran todas las respuestas guardadas
+def comando_cache(args, config, cache, cliente, enrutador, metricas):
+    if cache is None:
+        sys.exit("El comando cache no admite --sin-cache")
+    stats = cache.estadisticas()
+    informar(f"Caché: {stats['entradas']} entradas, {stats['tamano'] / 1024 / 1024:.1f} MB")
+    if args.vaciar:
+        cache.vaciar()
+        informar("Caché vaciada")
+    return 0
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Adaptación por lotes de textos estoicos sin interfaz web")
+    parser.add_argument("--config", help="Fichero TOML con las claves (por defecto .streamlit/secrets.toml)")
+    parser.add_argument("--sin-cache", action="store_true", help="No usar la caché de adaptaciones")
+    parser.add_argument("--concurrencia", type=int, default=4, help="Solicitudes simultáneas a la API")
+    parser.add_argument(
+        "--formatos", type=parsear_formatos,
+        help=f"Formatos de salida separados por comas ({','.join(FORMATOS)}); por defecto, el de la extensión de --salida",
+    )
+    parser.add_argument(
+        "--metricas", metavar="RUTA",
+        help="Guardar las métricas de la ejecución en JSON o, si la ruta termina en .prom, en formato Prometheus",
+    )
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    obra = subparsers.add_parser("obra", help="Adaptar obras filosóficas en PDF para estudiantes")
+    obra.add_argument("pdfs", nargs="+", help="Ficheros PDF a adaptar")
+    obra.add_argument("--salida", default=".", help="Directorio donde guardar los documentos")
+    obra.add_argument("--procesos", type=int, default=os.cpu_count() or 1, help="Procesos para extraer el PDF")
+    obra.add_argument("--presupuesto", type=int, default=PRESUPUESTO_TOKENS, help="Tokens máximos de texto original por solicitud")
+    obra.add_argument("--solapamiento", type=int, default=0, help="Párrafos de solapamiento entre fragmentos")
+    obra.add_argument(
+        "--lotes", type=int, nargs="?", const=UMBRAL_LOTE, default=0, metavar="UMBRAL",
+        help=f"Agrupar en una solicitud las secciones de hasta UMBRAL tokens (por defecto {UMBRAL_LOTE})",
+    )
+    obra.add_argument(
+        "--incremental", action="store_true",
+        help="Adaptar solo las secciones nuevas o modificadas respecto a las ediciones ya adaptadas (sin efecto con --sin-cache)",
+    )
+    obra.add_argument(
+        "--conservar-duplicados", action="store_true",
+        help="Adaptar también las secciones vacías, las entradas del índice y las duplicadas",
+    )
+    obra.set_defaults(funcion=comando_obra)
+
+    cartas = subparsers.add_parser("cartas", help="Adaptar cartas de Séneca a un contexto corporativo")
+    cartas.add_argument("cartas", type=parsear_rangos, help="Números o rangos de cartas, por ejemplo 1-10,15")
+    cartas.add_argument("--salida", default="Adapted_Seneca_Letters.docx", help="Fichero de salida")
+    cartas.set_defaults(funcion=comando_cartas)
+
+    libro = subparsers.add_parser("libro", help="Generar un libro a partir de un título")
+    libro.add_argument("titulo")
+    libro.add_argument("--capitulos", type=int, default=5)
+    libro.add_argument("--secciones", type=int, default=4, help="Secciones por capítulo")
+    libro.add_argument("--salida", help="Fichero de salida (por defecto, el título en Markdown)")
+    libro.set_defaults(funcion=comando_libro)
+
+    cache = subparsers.add_parser("cache", help="Consultar o vaciar la caché de adaptaciones")
+    cache.add_argument("--vaciar", action="store_true", help="Borrar todas las respuestas guardadas")
+    cache.set_defaults(funcion=comando_cache)
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    if args.comando == "libro" and not args.salida:
+        args.salida = f"{args.titulo.replace(' ', '_')}.md"
+    config = cargar_configuracion(args.config)
+    cache = None if args.sin_cache else CacheLLM()
+    cliente = crear_cliente(config["limites"])
+    enrutador = crear_enrutador(config["backends"], config["enrutado"].get(args.comando), cliente)
+    metricas = Metricas(config["precios"])
+    codigo = args.funcion(args, config, cache, cliente, enrutador, metricas)
+    informar_metricas(metricas, args.metricas)
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
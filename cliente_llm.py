@@ -0,0 +1,485 @@
+import json
+import random
+import re
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from fragmentos import estimar_tokens
+
+# Cliente de chat completions en streaming (server-sent events)
+# Sirve tanto para la API de OpenAI como para la de x.ai, que usan el mismo formato.
+# Todas las solicitudes pasan por un ClienteLLM que limita la tasa (solicitudes y tokens por minuto),
+# reintenta los 429/5xx con espera exponencial y aleatoria respetando Retry-After, aplica timeouts,
+# corta el circuito cuando el proveedor falla de forma continuada y reutiliza las conexiones HTTP.
+#
+# Los proveedores se registran como tipos de backend (registrar_tipo_backend) y un Enrutador elige
+# backend y modelo según el tamaño del texto, por ejemplo un modelo más barato para las secciones cortas.
+
+OPENAI_URL = "https://api.openai.com/v1/chat/completions"
+XAI_URL = "https://api.x.ai/v1/chat/completions"
+CODIGOS_REINTENTABLES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class ErrorAPI(RuntimeError):
+    def __init__(self, codigo, texto):
+        super().__init__(f"{codigo} - {texto}")
+        self.codigo = codigo
+
+
+class CircuitoAbierto(RuntimeError):
+    def __init__(self, mensaje, segundos=0.0):
+        super().__init__(mensaje)
+        self.segundos = segundos  # Hasta que el circuito vuelva a dejar pasar una solicitud de prueba
+
+
+# Limitador de tasa con dos cubos de tokens: solicitudes por minuto y tokens por minuto
+class LimitadorTasa:
+    def __init__(self, solicitudes_por_minuto=None, tokens_por_minuto=None):
+        self.capacidades = (solicitudes_por_minuto, tokens_por_minuto)
+        self.disponibles = [solicitudes_por_minuto or 0, tokens_por_minuto or 0]
+        self.ultima_recarga = time.monotonic()
+        self._condicion = threading.Condition()
+
+    def _recargar(self):
+        ahora = time.monotonic()
+        transcurrido = ahora - self.ultima_recarga
+        self.ultima_recarga = ahora
+        for i, capacidad in enumerate(self.capacidades):
+            if capacidad:
+                self.disponibles[i] = min(capacidad, self.disponibles[i] + capacidad * transcurrido / 60)
+
+    # Bloquea hasta que haya cupo para una solicitud de `tokens` tokens
+    def adquirir(self, tokens):
+        pedidos = [1, tokens]
+        for i, capacidad in enumerate(self.capacidades):
+            if capacidad:
+                pedidos[i] = min(pedidos[i], capacidad)
+        with self._condicion:
+            while True:
+                self._recargar()
+                esperas = [
+                    (pedidos[i] - self.disponibles[i]) * 60 / capacidad
+                    for i, capacidad in enumerate(self.capacidades)
+                    if capacidad and self.disponibles[i] < pedidos[i]
+                ]
+                if not esperas:
+                    for i, capacidad in enumerate(self.capacidades):
+                        if capacidad:
+                            self.disponibles[i] -= pedidos[i]
+                    return
+                self._condicion.wait(max(esperas))
+
+
+# Cortacircuitos: tras umbral_fallos fallos seguidos rechaza las solicitudes durante segundos_abierto
+# y después deja pasar una de prueba (semiabierto)
+class Cortacircuitos:
+    def __init__(self, umbral_fallos=10, segundos_abierto=30):
+        self.umbral_fallos = umbral_fallos
+        self.segundos_abierto = segundos_abierto
+        self.fallos_seguidos = 0
+        self.abierto_hasta = 0.0
+        self._candado = threading.Lock()
+
+    def permitir(self):
+        with self._candado:
+            ahora = time.monotonic()
+            if ahora < self.abierto_hasta:
+                raise CircuitoAbierto(
+                    f"Demasiados fallos seguidos de la API; se reintentará en {self.abierto_hasta - ahora:.0f} s",
+                    self.abierto_hasta - ahora,
+                )
+            if self.fallos_seguidos >= self.umbral_fallos:
+                # Semiabierto: esta solicitud sirve de prueba; las demás se rechazan con CircuitoAbierto
+                # hasta que la prueba salga bien o pase otro periodo de segundos_abierto
+                self.abierto_hasta = ahora + self.segundos_abierto
+
+    def registrar_exito(self):
+        with self._candado:
+            self.fallos_seguidos = 0
+            self.abierto_hasta = 0.0
+
+    def registrar_fallo(self):
+        with self._candado:
+            self.fallos_seguidos += 1
+            if self.fallos_seguidos >= self.umbral_fallos:
+                self.abierto_hasta = time.monotonic() + self.segundos_abierto
+
+
+# Función para llamar a funcion() esperando mientras el circuito esté abierto, en lugar de fallar en el acto
+# Se vuelve a intentar cada sondeo segundos como mucho (una prueba que sale bien cierra el circuito antes de
+# que acabe el periodo) y, tras espera_maxima segundos esperando, se deja pasar el CircuitoAbierto.
+def con_espera_circuito(funcion, espera_maxima=120.0, sondeo=5.0):
+    esperado = 0.0
+    while True:
+        try:
+            return funcion()
+        except CircuitoAbierto as e:
+            if esperado >= espera_maxima:
+                raise
+            espera = min(max(e.segundos, 0.1), sondeo, espera_maxima - esperado)
+            time.sleep(espera)
+            esperado += espera
+
+
+# Función para leer la cabecera Retry-After (segundos o fecha HTTP)
+def segundos_retry_after(valor):
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(valor).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class ClienteLLM:
+    def __init__(self, limitador=None, cortacircuitos=None, reintentos=5, espera_base=1.0, espera_maxima=60.0,
+                 timeout=(10, 120), max_conexiones=16):
+        self.limitador = limitador or LimitadorTasa()
+        self.cortacircuitos = cortacircuitos or Cortacircuitos()
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.espera_maxima = espera_maxima
+        self.timeout = timeout  # (conexión, lectura entre fragmentos) en segundos
+        self.max_conexiones = max_conexiones
+        self._sesion = None
+        self._candado_sesion = threading.Lock()
+        self._cabeceras = {}
+
+    # Sesión compartida: las solicitudes al mismo proveedor reutilizan las conexiones (keep-alive)
+    # Se crea con la primera solicitud, así que importar el módulo (y CLIENTE_POR_DEFECTO) no carga requests
+    @property
+    def sesion(self):
+        if self._sesion is None:
+            with self._candado_sesion:
+                if self._sesion is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    sesion = requests.Session()
+                    adaptador = HTTPAdapter(pool_connections=self.max_conexiones, pool_maxsize=self.max_conexiones)
+                    sesion.mount("https://", adaptador)
+                    sesion.mount("http://", adaptador)
+                    sesion.headers["Content-Type"] = "application/json"
+                    self._sesion = sesion
+        return self._sesion
+
+    # Cabeceras de autorización de cada clave, construidas una sola vez
+    def _cabeceras_clave(self, api_key, stream):
+        clave = (api_key, stream)
+        if clave not in self._cabeceras:
+            cabeceras = {"Authorization": f"Bearer {api_key}"}
+            if stream:
+                cabeceras["Accept"] = "text/event-stream"
+            self._cabeceras[clave] = cabeceras
+        return self._cabeceras[clave]
+
+    # Espera exponencial con jitter completo
+    def _espera(self, intento):
+        return random.uniform(0, min(self.espera_maxima, self.espera_base * 2 ** intento))
+
+    # Función para enviar una solicitud al endpoint de chat completions con límites, reintentos y timeouts
+    def enviar(self, url, api_key, payload, stream=False):
+        import requests
+
+        headers = self._cabeceras_clave(api_key, stream)
+        texto_prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+        tokens_prompt = estimar_tokens(texto_prompt)
+        tokens = tokens_prompt + payload.get("max_tokens", tokens_prompt)
+
+        for intento in range(self.reintentos + 1):
+            self.cortacircuitos.permitir()
+            self.limitador.adquirir(tokens)
+            ultimo = intento == self.reintentos
+            try:
+                response = self.sesion.post(url, headers=headers, json=payload, stream=stream, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                self.cortacircuitos.registrar_fallo()
+                if ultimo:
+                    raise
+                time.sleep(self._espera(intento))
+                continue
+
+            if response.status_code == 200:
+                self.cortacircuitos.registrar_exito()
+                return response
+            if response.status_code not in CODIGOS_REINTENTABLES:
+                raise ErrorAPI(response.status_code, response.text)
+
+            # Un 429 indica que hay que frenar, no que el proveedor esté caído: no cuenta para el cortacircuitos
+            if response.status_code != 429:
+                self.cortacircuitos.registrar_fallo()
+            if ultimo:
+                raise ErrorAPI(response.status_code, response.text)
+            espera = segundos_retry_after(response.headers.get("Retry-After"))
+            response.close()
+            time.sleep(min(self.espera_maxima, espera) if espera is not None else self._espera(intento))
+
+
+CLIENTE_POR_DEFECTO = ClienteLLM()
+
+
+# Función para crear un cliente a partir de la configuración (por ejemplo la sección [limites] de los secrets)
+def crear_cliente(config):
+    config = dict(config or {})
+    return ClienteLLM(
+        limitador=LimitadorTasa(config.get("solicitudes_por_minuto"), config.get("tokens_por_minuto")),
+        cortacircuitos=Cortacircuitos(config.get("umbral_fallos", 10), config.get("segundos_abierto", 30)),
+        reintentos=config.get("reintentos", 5),
+        timeout=(config.get("timeout_conexion", 10), config.get("timeout_lectura", 120)),
+        max_conexiones=config.get("max_conexiones", 16),
+    )
+
+
+class Respuesta:
+    def __init__(self):
+        self.texto = ""
+        self.ttft = None  # Segundos hasta el primer token
+        self.segundos = None  # Duración total de la solicitud
+        self.tokens_entrada = None  # Del campo usage de la API, si lo devuelve
+        self.tokens_salida = None
+
+
+# Función para leer los eventos SSE línea a línea y devolver el campo data de cada uno
+def leer_eventos_sse(lineas):
+    datos = []
+    for linea in lineas:
+        if linea is None:
+            continue
+        if linea == "":
+            # Una línea vacía cierra el evento
+            if datos:
+                evento = "\n".join(datos)
+                datos = []
+                if evento == "[DONE]":
+                    return
+                yield evento
+            continue
+        if linea.startswith(":"):
+            continue  # Comentario o keep-alive
+        campo, _, valor = linea.partition(":")
+        if campo == "data":
+            datos.append(valor[1:] if valor.startswith(" ") else valor)
+    if datos and "\n".join(datos) != "[DONE]":
+        yield "\n".join(datos)
+
+
+# Generador que envía la solicitud con stream=True y va devolviendo los fragmentos de texto
+# Al terminar rellena el objeto respuesta (si se pasa) con el texto completo, los tiempos y,
+# con incluir_uso, los tokens que informa la API en el último evento (stream_options.include_usage)
+def transmitir_completado(url, api_key, payload, respuesta=None, cliente=None, incluir_uso=True):
+    respuesta = respuesta if respuesta is not None else Respuesta()
+    cliente = cliente or CLIENTE_POR_DEFECTO
+    inicio = time.perf_counter()
+    payload = dict(payload, stream=True)
+    if incluir_uso:
+        payload["stream_options"] = {"include_usage": True}
+    response = cliente.enviar(url, api_key, payload, stream=True)
+    # text/event-stream no declara charset, así que requests asumiría ISO-8859-1
+    response.encoding = "utf-8"
+
+    partes = []
+    with response:
+        for datos in leer_eventos_sse(response.iter_lines(decode_unicode=True)):
+            evento = json.loads(datos)
+            uso = evento.get("usage")
+            if uso:
+                respuesta.tokens_entrada = uso.get("prompt_tokens")
+                respuesta.tokens_salida = uso.get("completion_tokens")
+            opciones = evento.get("choices") or [{}]
+            fragmento = opciones[0].get("delta", {}).get("content")
+            if not fragmento:
+                continue
+            if respuesta.ttft is None:
+                respuesta.ttft = time.perf_counter() - inicio
+            partes.append(fragmento)
+            yield fragmento
+
+    respuesta.texto = "".join(partes).strip()
+    respuesta.segundos = time.perf_counter() - inicio
+
+
+# Función para obtener la respuesta completa de cualquier backend, llamando a al_recibir(fragmento) con cada trozo
+# Con metricas (metricas.Metricas) se registran la latencia y los tokens de la solicitud; si la API no
+# informa de los tokens se estiman a partir del texto
+def completar(backend, payload, al_recibir=None, metricas=None):
+    respuesta = Respuesta()
+    modelo = backend.modelo_cache(payload.get("model"))
+    try:
+        for fragmento in backend.transmitir(payload, respuesta):
+            if al_recibir:
+                al_recibir(fragmento)
+    except Exception:
+        if metricas:
+            metricas.registrar_fallo(modelo)
+        raise
+    if metricas:
+        estimado = respuesta.tokens_entrada is None or respuesta.tokens_salida is None
+        if estimado:
+            texto_prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+            tokens_entrada = estimar_tokens(texto_prompt)
+            tokens_salida = estimar_tokens(respuesta.texto)
+        else:
+            tokens_entrada, tokens_salida = respuesta.tokens_entrada, respuesta.tokens_salida
+        metricas.registrar_solicitud(modelo, respuesta.segundos, respuesta.ttft, tokens_entrada, tokens_salida, estimado)
+    return respuesta
+
+
+# ---------------------------------------------------------------------------
+# Backends
+# ---------------------------------------------------------------------------
+
+# API compatible con OpenAI (OpenAI, x.ai, servidores locales como vLLM u Ollama...)
+# incluir_uso=False para servidores que no admiten stream_options (los tokens se estiman)
+class BackendHTTP:
+    def __init__(self, url, api_key, cliente=None, incluir_uso=True):
+        self.url = url
+        self.api_key = api_key
+        self.cliente = cliente
+        self.incluir_uso = incluir_uso
+
+    def transmitir(self, payload, respuesta):
+        return transmitir_completado(self.url, self.api_key, payload, respuesta, self.cliente, self.incluir_uso)
+
+    # Modelo con el que se guardan las respuestas en la caché
+    def modelo_cache(self, modelo):
+        return modelo
+
+
+# Backend local sin conexión: responde al instante con un texto simulado, para probar la aplicación
+# completa sin clave ni red. responder(payload) permite cambiar la respuesta.
+# Sus respuestas se guardan en la caché con otro nombre de modelo para no mezclarlas con las reales.
+class BackendLocal:
+    def __init__(self, responder=None, latencia_token=0.0):
+        self.responder = responder or respuesta_simulada
+        self.latencia_token = latencia_token
+
+    def transmitir(self, payload, respuesta):
+        inicio = time.perf_counter()
+        texto = self.responder(payload)
+        respuesta.ttft = time.perf_counter() - inicio
+        for i, palabra in enumerate(texto.split(" ")):
+            if self.latencia_token:
+                time.sleep(self.latencia_token)
+            yield palabra if i == 0 else " " + palabra
+        respuesta.texto = texto.strip()
+        respuesta.segundos = time.perf_counter() - inicio
+
+    def modelo_cache(self, modelo):
+        return f"local/{modelo}"
+
+
+# Respuesta por defecto del backend local; respeta las marcas de los lotes (=== SECCIÓN N ===)
+# y devuelve un esquema con el número de capítulos y secciones pedido cuando se pide un esquema de libro
+# Para el resto de prompts se usa generica(payload) si se indica
+def respuesta_simulada(payload, generica=None):
+    prompt = payload.get("messages", [{}])[-1].get("content", "")
+    secciones = prompt.count("=== SECCIÓN ")
+    if secciones:
+        return "\n\n".join(
+            f"=== ADAPTACIÓN {indice} ===\nRespuesta local simulada para la sección {indice}."
+            for indice in range(1, secciones + 1)
+        )
+    esquema = re.search(r'(\d+) capítulos.*?(\d+) secciones', prompt)
+    if "esquema" in prompt and esquema:
+        capitulos, secciones = int(esquema.group(1)), int(esquema.group(2))
+        if payload.get("response_format", {}).get("type") == "json_object":
+            return json.dumps({"capitulos": [
+                {"titulo": f"Capítulo simulado {capitulo}",
+                 "secciones": [f"Sección simulada {capitulo}.{seccion}" for seccion in range(1, secciones + 1)]}
+                for capitulo in range(1, capitulos + 1)
+            ]}, ensure_ascii=False)
+        return "\n".join(
+            f"Capítulo {capitulo}: Capítulo simulado {capitulo}\n" + "\n".join(
+                f"- Sección {seccion}: Sección simulada {capitulo}.{seccion}" for seccion in range(1, secciones + 1)
+            )
+            for capitulo in range(1, capitulos + 1)
+        )
+    if generica:
+        return generica(payload)
+    return f"Respuesta local simulada ({payload.get('model')}) para un prompt de {estimar_tokens(prompt)} tokens."
+
+
+# Tipos de backend disponibles: {tipo: (fabrica(config, cliente), url_por_defecto)}
+TIPOS_BACKEND = {}
+
+
+def registrar_tipo_backend(tipo, fabrica, url_por_defecto=None):
+    TIPOS_BACKEND[tipo] = (fabrica, url_por_defecto)
+
+
+def _backend_http(config, cliente):
+    return BackendHTTP(config["url"], config.get("key"), cliente, config.get("incluir_uso", True))
+
+
+registrar_tipo_backend("openai", _backend_http, OPENAI_URL)
+registrar_tipo_backend("xai", _backend_http, XAI_URL)
+registrar_tipo_backend("local", lambda config, cliente: BackendLocal(latencia_token=config.get("latencia_token", 0.0)))
+
+
+# Función para crear un backend a partir de su configuración, por ejemplo {"tipo": "openai", "key": "...", "url": "..."}
+def crear_backend(config, cliente=None):
+    config = dict(config)
+    tipo = config.get("tipo", "openai")
+    if tipo not in TIPOS_BACKEND:
+        raise ValueError(f"Tipo de backend desconocido: {tipo} (disponibles: {', '.join(TIPOS_BACKEND)})")
+    fabrica, url_por_defecto = TIPOS_BACKEND[tipo]
+    config.setdefault("url", url_por_defecto)
+    return fabrica(config, cliente)
+
+
+# Enrutado: elige backend y modelo para cada solicitud según los tokens del texto de entrada
+# reglas es [(hasta_tokens, backend, modelo)] ordenadas de menor a mayor; backend y modelo pueden ser None
+# para usar los de por defecto (los de la aplicación si el enrutador tampoco los define)
+class Enrutador:
+    def __init__(self, reglas=None, backend=None, modelo=None):
+        self.reglas = sorted(reglas or [], key=lambda regla: regla[0])
+        self.backend = backend
+        self.modelo = modelo
+
+    def elegir(self, tokens):
+        for hasta_tokens, backend, modelo in self.reglas:
+            if tokens <= hasta_tokens:
+                return backend or self.backend, modelo or self.modelo
+        return self.backend, self.modelo
+
+
+# Función para crear el enrutador de una aplicación a partir de la configuración
+# backends es {nombre: config del backend} (sección [backends] de los secrets) y enrutado la parte de la
+# aplicación en [enrutado], por ejemplo:
+#   [backends.mini]
+#   tipo = "openai"
+#   key = "sk-..."
+#   [enrutado.obra]
+#   reglas = [{ hasta_tokens = 800, backend = "mini", modelo = "gpt-4o-mini" }]
+# Devuelve None si la aplicación no tiene enrutado configurado
+def crear_enrutador(backends, enrutado, cliente=None):
+    if not enrutado:
+        return None
+    creados = {}
+
+    def backend(nombre):
+        if not nombre:
+            return None
+        if nombre not in backends:
+            raise ValueError(f"Backend no configurado en [backends]: {nombre}")
+        if nombre not in creados:
+            creados[nombre] = crear_backend(backends[nombre], cliente)
+        return creados[nombre]
+
+    reglas = [
+        (regla["hasta_tokens"], backend(regla.get("backend")), regla.get("modelo"))
+        for regla in enrutado.get("reglas", [])
+    ]
+    return Enrutador(reglas, backend(enrutado.get("backend")), enrutado.get("modelo"))
+
+
+# Función para elegir el backend y el modelo de una solicitud de tokens tokens
+# Sin enrutador (o si no decide) se usa la API compatible con OpenAI en url con el modelo indicado
+def elegir_backend(enrutador, tokens, modelo, url, api_key, cliente=None):
+    backend, modelo_elegido = enrutador.elegir(tokens) if enrutador else (None, None)
+    return backend or BackendHTTP(url, api_key, cliente), modelo_elegido or modelo
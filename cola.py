@@ -0,0 +1,246 @@
+import concurrent.futures
+import threading
+import time
+from collections import OrderedDict, deque
+
+# Cola de trabajos compartida por todas las sesiones del servidor
+# Los trabajos de adaptación se ejecutan en hilos de fondo y no en el hilo del script de Streamlit, así que
+# siguen adelante aunque el usuario cierre la pestaña y se pueden consultar por su id desde cualquier sesión.
+# Las solicitudes de todos los trabajos pasan por un único EjecutorJusto: un número fijo de hilos que atiende
+# por turnos a los usuarios con tareas pendientes, de modo que un trabajo grande no deja sin turno a los demás.
+# Como todos usan el mismo ClienteLLM, el límite de solicitudes y tokens por minuto también es único.
+
+HILOS_SOLICITUDES = 16  # Solicitudes simultáneas a la API entre todos los usuarios
+TRABAJOS_SIMULTANEOS = 4  # Trabajos en curso a la vez (como mucho uno por usuario)
+TRABAJOS_GUARDADOS = 200  # Trabajos terminados que se conservan en memoria para consultarlos
+
+
+class EjecutorJusto:
+    def __init__(self, max_hilos=HILOS_SOLICITUDES):
+        self._condicion = threading.Condition()
+        self._colas = OrderedDict()  # {usuario: deque de tareas}; el orden es el turno
+        self._en_curso = {}  # {usuario: tareas ejecutándose}
+        self._cerrado = False
+        for indice in range(max_hilos):
+            threading.Thread(target=self._trabajar, name=f"ejecutor-justo-{indice}", daemon=True).start()
+
+    # Ejecutor con la interfaz de concurrent.futures (submit, shutdown, with) para las tareas de un usuario
+    def para(self, usuario, max_concurrencia=4):
+        return EjecutorUsuario(self, usuario, max(1, max_concurrencia))
+
+    # Encola funcion(*args, **kwargs) para el usuario; limite es el máximo de sus tareas ejecutándose a la vez
+    def enviar(self, usuario, funcion, args=(), kwargs=None, limite=1):
+        futuro = concurrent.futures.Future()
+        with self._condicion:
+            if self._cerrado:
+                raise RuntimeError("El ejecutor está cerrado")
+            self._colas.setdefault(usuario, deque()).append((limite, futuro, funcion, args, kwargs or {}))
+            self._condicion.notify()
+        return futuro
+
+    def pendientes(self):
+        with self._condicion:
+            return sum(len(cola) for cola in self._colas.values())
+
+    # Elige la siguiente tarea por turnos entre los usuarios que no han llegado a su límite
+    def _siguiente(self):
+        for usuario in list(self._colas):
+            cola = self._colas[usuario]
+            if not cola:
+                if not self._en_curso.get(usuario):
+                    del self._colas[usuario]
+                continue
+            if self._en_curso.get(usuario, 0) < cola[0][0]:
+                self._en_curso[usuario] = self._en_curso.get(usuario, 0) + 1
+                # El usuario atendido pasa al final del turno
+                self._colas.move_to_end(usuario)
+                return (usuario,) + cola.popleft()[1:]
+        return None
+
+    def _trabajar(self):
+        while True:
+            with self._condicion:
+                tarea = self._siguiente()
+                while tarea is None:
+                    if self._cerrado:
+                        return
+                    self._condicion.wait()
+                    tarea = self._siguiente()
+            usuario, futuro, funcion, args, kwargs = tarea
+            try:
+                if futuro.set_running_or_notify_cancel():
+                    try:
+                        futuro.set_result(funcion(*args, **kwargs))
+                    except BaseException as e:
+                        futuro.set_exception(e)
+            finally:
+                with self._condicion:
+                    # Sin tareas en curso el usuario deja de ocupar memoria; cada sesión es un usuario nuevo
+                    self._en_curso[usuario] -= 1
+                    if not self._en_curso[usuario]:
+                        del self._en_curso[usuario]
+                    self._condicion.notify_all()
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrado = True
+            self._condicion.notify_all()
+
+
+class EjecutorUsuario:
+    def __init__(self, ejecutor, usuario, max_concurrencia):
+        self._ejecutor = ejecutor
+        self._usuario = usuario
+        self._max_concurrencia = max_concurrencia
+        self._futuros = set()
+
+    def submit(self, funcion, *args, **kwargs):
+        futuro = self._ejecutor.enviar(self._usuario, funcion, args, kwargs, self._max_concurrencia)
+        self._futuros.add(futuro)
+        return futuro
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        if cancel_futures:
+            for futuro in self._futuros:
+                futuro.cancel()
+        if wait:
+            concurrent.futures.wait(self._futuros)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        # Si el trabajo falla a medias no se siguen pidiendo sus tareas pendientes
+        self.shutdown(cancel_futures=exc[0] is not None)
+        return False
+
+
+# Estado de un trabajo de la cola; las funciones de retorno del trabajo lo actualizan desde su hilo
+# y la interfaz lo consulta con instantanea()
+class Trabajo:
+    def __init__(self, id_trabajo, usuario, descripcion):
+        self.id = id_trabajo
+        self.usuario = usuario
+        self.descripcion = descripcion
+        self.estado = "en_cola"  # en_cola, en_curso, terminado o error
+        self.hechos = 0
+        self.total = 0
+        self.mensaje = ""
+        self.errores = []
+        self.parciales = {}
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.inicio = None
+        self.fin = None
+        self._candado = threading.Lock()
+
+    @property
+    def terminado(self):
+        return self.estado in ("terminado", "error")
+
+    def progresar(self, hechos, total, mensaje=""):
+        with self._candado:
+            self.hechos = hechos
+            self.total = total
+            self.mensaje = mensaje
+
+    def agregar_error(self, mensaje):
+        with self._candado:
+            self.errores.append(mensaje)
+
+    def actualizar_parciales(self, parciales):
+        with self._candado:
+            self.parciales = dict(parciales)
+
+    def empezar(self):
+        with self._candado:
+            self.estado = "en_curso"
+            self.inicio = time.time()
+
+    def terminar(self, resultado, error=None):
+        with self._candado:
+            self.resultado = resultado
+            self.estado = "error" if error else "terminado"
+            self.error = error
+            self.parciales = {}
+            self.fin = time.time()
+
+    def instantanea(self):
+        with self._candado:
+            return {
+                "id": self.id,
+                "descripcion": self.descripcion,
+                "estado": self.estado,
+                "hechos": self.hechos,
+                "total": self.total,
+                "mensaje": self.mensaje,
+                "errores": list(self.errores),
+                "parciales": dict(self.parciales),
+                "error": self.error,
+                "creado": self.creado,
+                "inicio": self.inicio,
+                "fin": self.fin,
+            }
+
+
+class ColaTrabajos:
+    def __init__(self, hilos_solicitudes=HILOS_SOLICITUDES, trabajos_simultaneos=TRABAJOS_SIMULTANEOS):
+        self.solicitudes = EjecutorJusto(hilos_solicitudes)
+        self._ejecutor_trabajos = EjecutorJusto(trabajos_simultaneos)
+        self._trabajos = OrderedDict()  # {id: Trabajo}, del más antiguo al más reciente
+        self._candado = threading.Lock()
+
+    # Encola funcion(trabajo, ejecutor) como el trabajo id_trabajo del usuario y devuelve su Trabajo
+    # ejecutor reparte las solicitudes del trabajo (hasta max_concurrencia a la vez) con las de los demás usuarios.
+    # Si ya hay un trabajo con ese id sin terminar (por ejemplo, el mismo botón pulsado desde otra pestaña),
+    # se devuelve ese en lugar de lanzar otro.
+    def enviar(self, usuario, id_trabajo, descripcion, funcion, max_concurrencia=4):
+        with self._candado:
+            existente = self._trabajos.get(id_trabajo)
+            if existente and not existente.terminado:
+                return existente
+            trabajo = Trabajo(id_trabajo, usuario, descripcion)
+            self._trabajos.pop(id_trabajo, None)
+            self._trabajos[id_trabajo] = trabajo
+            self._olvidar_terminados()
+
+        def ejecutar():
+            trabajo.empezar()
+            try:
+                trabajo.terminar(funcion(trabajo, self.solicitudes.para(usuario, max_concurrencia)))
+            except Exception as e:
+                trabajo.terminar(None, str(e) or type(e).__name__)
+
+        # Un trabajo en curso por usuario; los demás esperan su turno en la cola
+        self._ejecutor_trabajos.para(usuario, 1).submit(ejecutar)
+        return trabajo
+
+    def obtener(self, id_trabajo):
+        with self._candado:
+            return self._trabajos.get(id_trabajo)
+
+    # Trabajos del usuario (o de todos), del más reciente al más antiguo
+    def trabajos(self, usuario=None):
+        with self._candado:
+            trabajos = list(self._trabajos.values())
+        return [trabajo for trabajo in reversed(trabajos) if usuario is None or trabajo.usuario == usuario]
+
+    # Posición del trabajo entre los que esperan (1 es el siguiente); 0 si no está en cola
+    def posicion(self, id_trabajo):
+        with self._candado:
+            en_cola = [trabajo.id for trabajo in self._trabajos.values() if trabajo.estado == "en_cola"]
+        return en_cola.index(id_trabajo) + 1 if id_trabajo in en_cola else 0
+
+    def estadisticas(self):
+        trabajos = self.trabajos()
+        return {
+            "en_cola": sum(1 for trabajo in trabajos if trabajo.estado == "en_cola"),
+            "en_curso": sum(1 for trabajo in trabajos if trabajo.estado == "en_curso"),
+            "solicitudes_pendientes": self.solicitudes.pendientes(),
+        }
+
+    def _olvidar_terminados(self):
+        terminados = [id_trabajo for id_trabajo, trabajo in self._trabajos.items() if trabajo.terminado]
+        for id_trabajo in terminados[:max(0, len(terminados) - TRABAJOS_GUARDADOS)]:
+            del self._trabajos[id_trabajo]
@@ -0,0 +1,238 @@
+import json
+import time
+import uuid
+import zipfile
+from html import escape
+
+from docx_incremental import DocxIncremental
+from formato import ESTILO_NUMERADA, ESTILO_VINETA, VINETA, texto_a_parrafos
+
+# Representación intermedia de los documentos adaptados o generados
+# Se construye una vez por ejecución (a medida que llegan los resultados) y a partir de ella se
+# genera cada formato de descarga solo cuando se pide. Se puede guardar en JSON junto al diario
+# del trabajo para volver a ofrecer las descargas sin repetir nada.
+#
+# Cada bloque es una tupla:
+#   ("encabezado", nivel, texto)
+#   ("parrafo", estilo, runs)   con estilo None, "Heading1".."Heading6", "ListBullet" o "ListNumber"
+#                               y runs [(texto, negrita, cursiva)]
+#   ("salto",)                  salto de página
+
+
+class Documento:
+    def __init__(self, titulo, idioma="es", bloques=None):
+        self.titulo = titulo
+        self.idioma = idioma
+        self.bloques = bloques if bloques is not None else []
+
+    def agregar_encabezado(self, texto, nivel=1):
+        self.bloques.append(("encabezado", nivel, texto))
+
+    # Añade el texto devuelto por el modelo (Markdown o HTML sencillo) convertido en párrafos
+    def agregar_texto(self, texto, preguntas_en_cursiva=False):
+        for estilo, runs in texto_a_parrafos(texto, preguntas_en_cursiva):
+            self.bloques.append(("parrafo", estilo, runs))
+
+    def salto_pagina(self):
+        self.bloques.append(("salto",))
+
+    # Agrupa los bloques por encabezados de nivel 1: [(titulo, bloques)]
+    def capitulos(self):
+        capitulos = []
+        for bloque in self.bloques:
+            if bloque[0] == "encabezado" and bloque[1] == 1:
+                capitulos.append((bloque[2], [bloque]))
+            elif capitulos:
+                capitulos[-1][1].append(bloque)
+            else:
+                capitulos.append((self.titulo, [bloque]))
+        return capitulos
+
+    def a_json(self):
+        return json.dumps({"titulo": self.titulo, "idioma": self.idioma, "bloques": self.bloques}, ensure_ascii=False)
+
+    @classmethod
+    def desde_json(cls, datos):
+        datos = json.loads(datos)
+        bloques = []
+        for bloque in datos["bloques"]:
+            if bloque[0] == "parrafo":
+                bloque = ("parrafo", bloque[1], [tuple(run) for run in bloque[2]])
+            bloques.append(tuple(bloque))
+        return cls(datos["titulo"], datos["idioma"], bloques)
+
+
+# ---------------------------------------------------------------------------
+# Renderizadores: cada uno escribe el documento en un fichero binario abierto
+# ---------------------------------------------------------------------------
+
+def renderizar_docx(documento, f):
+    with DocxIncremental(f) as doc:
+        for bloque in documento.bloques:
+            if bloque[0] == "encabezado":
+                doc.agregar_titulo(bloque[2], bloque[1])
+            elif bloque[0] == "parrafo":
+                doc.agregar_parrafo(bloque[2], bloque[1])
+            else:
+                doc.salto_pagina()
+
+
+# Función para escribir un run en Markdown, dejando los espacios de los extremos fuera de las marcas
+def _run_markdown(texto, negrita, cursiva):
+    marca = ("**" if negrita else "") + ("*" if cursiva else "")
+    texto = texto.replace("\n", "  \n")
+    contenido = texto.strip()
+    if not marca or not contenido:
+        return texto
+    inicio = texto[:len(texto) - len(texto.lstrip())]
+    fin = texto[len(texto.rstrip()):]
+    return f"{inicio}{marca}{contenido}{marca[::-1]}{fin}"
+
+
+def renderizar_markdown(documento, f):
+    lista_anterior = None
+    for bloque in documento.bloques:
+        estilo = bloque[1] if bloque[0] == "parrafo" else None
+        lista = estilo if estilo in (ESTILO_VINETA, ESTILO_NUMERADA) else None
+        # Los elementos de una lista van seguidos; al terminar la lista hace falta una línea en blanco
+        if lista_anterior and lista != lista_anterior:
+            f.write(b"\n")
+        lista_anterior = lista
+        if bloque[0] == "encabezado":
+            f.write(f"{'#' * bloque[1]} {bloque[2]}\n\n".encode("utf-8"))
+        elif bloque[0] == "parrafo":
+            texto = "".join(_run_markdown(*run) for run in bloque[2])
+            if estilo and estilo.startswith("Heading"):
+                texto = f"{'#' * int(estilo[-1])} {texto}"
+            elif estilo == ESTILO_VINETA:
+                texto = "- " + texto.removeprefix(VINETA)
+            # En las listas numeradas el número ya forma parte del texto
+            f.write((texto + ("\n" if lista else "\n\n")).encode("utf-8"))
+    if lista_anterior:
+        f.write(b"\n")
+
+
+def _run_html(texto, negrita, cursiva):
+    texto = escape(texto).replace("\n", "<br/>")
+    if cursiva:
+        texto = f"<em>{texto}</em>"
+    if negrita:
+        texto = f"<strong>{texto}</strong>"
+    return texto
+
+
+# Función para convertir una lista de bloques en el cuerpo HTML (XHTML válido, sirve también para EPUB)
+def _cuerpo_html(bloques):
+    partes = []
+    lista_abierta = None
+    for bloque in bloques:
+        estilo = bloque[1] if bloque[0] == "parrafo" else None
+        lista = {ESTILO_VINETA: "ul", ESTILO_NUMERADA: "ol"}.get(estilo)
+        if lista_abierta and lista != lista_abierta:
+            partes.append(f"</{lista_abierta}>")
+            lista_abierta = None
+        if bloque[0] == "encabezado":
+            partes.append(f"<h{bloque[1]}>{escape(bloque[2])}</h{bloque[1]}>")
+        elif bloque[0] == "salto":
+            partes.append('<hr class="salto"/>')
+        elif lista:
+            if not lista_abierta:
+                partes.append(f"<{lista}>")
+                lista_abierta = lista
+            runs = list(bloque[2])
+            # La viñeta o el número ya los pone la lista HTML
+            if runs:
+                prefijo = VINETA if lista == "ul" else runs[0][0].split(" ", 1)[0] + " "
+                runs[0] = (runs[0][0].removeprefix(prefijo),) + tuple(runs[0][1:])
+            partes.append(f"<li>{''.join(_run_html(*run) for run in runs)}</li>")
+        else:
+            etiqueta = f"h{estilo[-1]}" if estilo and estilo.startswith("Heading") else "p"
+            partes.append(f"<{etiqueta}>{''.join(_run_html(*run) for run in bloque[2])}</{etiqueta}>")
+    if lista_abierta:
+        partes.append(f"</{lista_abierta}>")
+    return "\n".join(partes)
+
+
+ESTILO_CSS = "body{font-family:Arial,sans-serif;font-size:12pt;max-width:45em;margin:auto}hr.salto{border:0;page-break-after:always}"
+
+
+def renderizar_html(documento, f):
+    f.write((
+        f'<!DOCTYPE html>\n<html lang="{documento.idioma}">\n<head>\n<meta charset="utf-8"/>\n'
+        f"<title>{escape(documento.titulo)}</title>\n<style>{ESTILO_CSS}</style>\n</head>\n<body>\n"
+    ).encode("utf-8"))
+    for _, bloques in documento.capitulos():
+        f.write((_cuerpo_html(bloques) + "\n").encode("utf-8"))
+    f.write(b"</body>\n</html>\n")
+
+
+def _xhtml(titulo, idioma, cuerpo):
+    return (
+        '<?xml version="1.0" encoding="utf-8"?>\n<!DOCTYPE html>\n'
+        f'<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+        f'lang="{idioma}" xml:lang="{idioma}">\n'
+        f'<head><title>{escape(titulo)}</title><style>{ESTILO_CSS}</style></head>\n<body>\n{cuerpo}\n</body>\n</html>\n'
+    )
+
+
+# EPUB 3 mínimo: un XHTML por capítulo (encabezado de nivel 1) y la tabla de contenidos de navegación
+def renderizar_epub(documento, f):
+    capitulos = documento.capitulos()
+    identificador = uuid.uuid5(uuid.NAMESPACE_URL, documento.titulo + str(len(documento.bloques)))
+    modificado = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    with zipfile.ZipFile(f, "w", compression=zipfile.ZIP_DEFLATED) as epub:
+        # El fichero mimetype tiene que ser el primero y sin comprimir
+        epub.writestr("mimetype", "application/epub+zip", compress_type=zipfile.ZIP_STORED)
+        epub.writestr("META-INF/container.xml", (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+            '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/></rootfiles>'
+            '</container>'
+        ))
+        manifiesto = ['<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>']
+        orden = []
+        indice = []
+        for numero, (titulo, bloques) in enumerate(capitulos, start=1):
+            nombre = f"capitulo{numero}.xhtml"
+            bloques = [bloque for bloque in bloques if bloque[0] != "salto"]
+            epub.writestr(f"OEBPS/{nombre}", _xhtml(titulo, documento.idioma, _cuerpo_html(bloques)))
+            manifiesto.append(f'<item id="c{numero}" href="{nombre}" media-type="application/xhtml+xml"/>')
+            orden.append(f'<itemref idref="c{numero}"/>')
+            indice.append(f'<li><a href="{nombre}">{escape(titulo)}</a></li>')
+        navegacion = f'<nav epub:type="toc" id="toc"><h1>{escape(documento.titulo)}</h1><ol>{"".join(indice)}</ol></nav>'
+        epub.writestr("OEBPS/nav.xhtml", _xhtml(documento.titulo, documento.idioma, navegacion))
+        epub.writestr("OEBPS/content.opf", (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="id">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="id">urn:uuid:{identificador}</dc:identifier>'
+            f'<dc:title>{escape(documento.titulo)}</dc:title>'
+            f'<dc:language>{documento.idioma}</dc:language>'
+            f'<meta property="dcterms:modified">{modificado}</meta>'
+            '</metadata>'
+            f'<manifest>{"".join(manifiesto)}</manifest>'
+            f'<spine>{"".join(orden)}</spine>'
+            '</package>'
+        ))
+
+
+# Formatos disponibles; se pueden añadir otros con registrar_formato
+FORMATOS = {}
+
+
+def registrar_formato(clave, nombre, extension, mime, renderizar):
+    FORMATOS[clave] = {"nombre": nombre, "extension": extension, "mime": mime, "renderizar": renderizar}
+
+
+registrar_formato("docx", "Word", ".docx",
+                  "application/vnd.openxmlformats-officedocument.wordprocessingml.document", renderizar_docx)
+registrar_formato("md", "Markdown", ".md", "text/markdown", renderizar_markdown)
+registrar_formato("html", "HTML", ".html", "text/html", renderizar_html)
+registrar_formato("epub", "EPUB", ".epub", "application/epub+zip", renderizar_epub)
+
+
+# Función para escribir el documento en el formato indicado en la ruta dada
+def exportar(documento, formato, ruta):
+    with open(ruta, "wb") as f:
+        FORMATOS[formato]["renderizar"](documento, f)
+    return ruta
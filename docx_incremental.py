@@ -0,0 +1,154 @@
+import re
+import zipfile
+from html import escape
+
+# Escritor de documentos Word (.docx) que va añadiendo los párrafos directamente al fichero
+# python-docx mantiene todo el documento como un árbol XML en memoria hasta guardarlo, lo que en
+# obras de cientos de páginas ocupa cientos de MB por sesión. Aquí cada párrafo se serializa y se
+# comprime en cuanto se añade, así que la memoria no crece con el tamaño del documento.
+#
+# Solo cubre lo que usan las aplicaciones: encabezados, elementos de lista, párrafos con runs en
+# negrita/cursiva, saltos de línea y de página, con Arial 12 como fuente por defecto.
+# Las listas usan estilos con sangría y la viñeta o el número como texto, sin definiciones de numeración.
+
+NS_W = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+RELACIONES_PAQUETE = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+RELACIONES_DOCUMENTO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+# Tamaño (en medios puntos) de los encabezados de nivel 1 a 6
+TAMANOS_ENCABEZADO = (28, 26, 24, 24, 22, 22)
+
+
+def _estilos(fuente, tamano):
+    encabezados = "".join(
+        f'<w:style w:type="paragraph" w:styleId="Heading{nivel}">'
+        f'<w:name w:val="heading {nivel}"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/><w:qFormat/>'
+        f'<w:pPr><w:keepNext/><w:spacing w:before="240" w:after="60"/><w:outlineLvl w:val="{nivel - 1}"/></w:pPr>'
+        f'<w:rPr><w:b/><w:color w:val="365F91"/><w:sz w:val="{tamano_encabezado}"/></w:rPr>'
+        f'</w:style>'
+        for nivel, tamano_encabezado in enumerate(TAMANOS_ENCABEZADO, start=1)
+    )
+    listas = "".join(
+        f'<w:style w:type="paragraph" w:styleId="{id_estilo}">'
+        f'<w:name w:val="{nombre}"/><w:basedOn w:val="Normal"/><w:qFormat/>'
+        '<w:pPr><w:ind w:left="720" w:hanging="360"/></w:pPr>'
+        '</w:style>'
+        for id_estilo, nombre in (("ListBullet", "List Bullet"), ("ListNumber", "List Number"))
+    )
+    fuente_normal = (
+        f'<w:rPr><w:rFonts w:ascii="{fuente}" w:hAnsi="{fuente}" w:cs="{fuente}" w:eastAsia="{fuente}"/>'
+        f'<w:sz w:val="{tamano * 2}"/><w:szCs w:val="{tamano * 2}"/></w:rPr>'
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        f'<w:styles xmlns:w="{NS_W}">'
+        f'<w:docDefaults><w:rPrDefault>{fuente_normal}</w:rPrDefault><w:pPrDefault/></w:docDefaults>'
+        '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/><w:qFormat/>'
+        f'{fuente_normal}</w:style>'
+        f'{encabezados}{listas}'
+        '</w:styles>'
+    )
+
+
+INICIO_DOCUMENTO = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    f'<w:document xmlns:w="{NS_W}"><w:body>'
+)
+
+FIN_DOCUMENTO = (
+    '<w:sectPr><w:pgSz w:w="12240" w:h="15840"/>'
+    '<w:pgMar w:top="1440" w:right="1800" w:bottom="1440" w:left="1800" w:header="720" w:footer="720" w:gutter="0"/>'
+    '</w:sectPr></w:body></w:document>'
+)
+
+# Caracteres de control que no se pueden representar en XML 1.0
+CARACTERES_NO_VALIDOS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+SALTOS_Y_TABULADORES = re.compile(r'(\n|\t)')
+
+
+# Función para serializar un run; los saltos de línea y tabuladores se convierten como en python-docx
+def _run_xml(texto, negrita=False, cursiva=False):
+    propiedades = ""
+    if negrita or cursiva:
+        propiedades = "<w:rPr>" + ("<w:b/>" if negrita else "") + ("<w:i/>" if cursiva else "") + "</w:rPr>"
+    contenido = []
+    for trozo in SALTOS_Y_TABULADORES.split(CARACTERES_NO_VALIDOS.sub("", texto)):
+        if trozo == "\n":
+            contenido.append("<w:br/>")
+        elif trozo == "\t":
+            contenido.append("<w:tab/>")
+        elif trozo:
+            contenido.append(f'<w:t xml:space="preserve">{escape(trozo, quote=False)}</w:t>')
+    return f"<w:r>{propiedades}{''.join(contenido)}</w:r>"
+
+
+class DocxIncremental:
+    def __init__(self, ruta, fuente="Arial", tamano=12):
+        self.ruta = ruta
+        self.parrafos = 0
+        self._zip = zipfile.ZipFile(ruta, "w", compression=zipfile.ZIP_DEFLATED)
+        self._zip.writestr("[Content_Types].xml", CONTENT_TYPES)
+        self._zip.writestr("_rels/.rels", RELACIONES_PAQUETE)
+        self._zip.writestr("word/_rels/document.xml.rels", RELACIONES_DOCUMENTO)
+        self._zip.writestr("word/styles.xml", _estilos(fuente, tamano))
+        # document.xml se escribe en último lugar y en streaming (force_zip64 por si supera 2 GB)
+        self._documento = self._zip.open("word/document.xml", "w", force_zip64=True)
+        self._escribir(INICIO_DOCUMENTO)
+
+    def _escribir(self, xml):
+        self._documento.write(xml.encode("utf-8"))
+
+    # Añade un párrafo a partir de una lista de runs (texto, negrita, cursiva)
+    # estilo es el id del estilo de párrafo, por ejemplo "Heading2"
+    def agregar_parrafo(self, runs, estilo=None):
+        propiedades = f'<w:pPr><w:pStyle w:val="{estilo}"/></w:pPr>' if estilo else ""
+        self._escribir(f"<w:p>{propiedades}{''.join(_run_xml(*run) for run in runs)}</w:p>")
+        self.parrafos += 1
+
+    def agregar_titulo(self, texto, nivel=1):
+        self.agregar_parrafo([(texto, False, False)], f"Heading{nivel}")
+
+    def salto_pagina(self):
+        self._escribir('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    def cerrar(self):
+        if self._documento is None:
+            return
+        self._escribir(FIN_DOCUMENTO)
+        self._documento.close()
+        self._documento = None
+        self._zip.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
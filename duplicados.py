@@ -0,0 +1,107 @@
+import heapq
+import re
+from collections import Counter, defaultdict
+
+from revisiones import normalizar_texto
+
+# Revisión previa de las secciones de una obra antes de adaptarlas
+# La extracción del PDF deja a veces secciones que no merece la pena pagar: el índice (sus líneas empiezan por
+# "Capítulo N" igual que los capítulos de verdad), cuerpos vacíos o con solo un número de página y secciones
+# repetidas o casi idénticas (cabeceras de página, la misma sección copiada en dos partes). Las vacías y las del
+# índice se descartan, y cada duplicada reutiliza la adaptación de la primera sección con el mismo texto.
+# Las secciones muy cortas (un epígrafe, una cita) no se descartan: se conservan en el documento sin adaptar.
+# Las casi idénticas se buscan con MinHash (firma de los k menores hashes de los shingles de palabras) y un índice
+# invertido de los valores de la firma, así que no hace falta comparar todas las parejas de secciones.
+
+TAMANO_SHINGLE = 5  # Palabras por shingle
+TAMANO_FIRMA = 128  # Hashes de la firma MinHash
+UMBRAL_SIMILITUD = 0.85  # Similitud de Jaccard estimada a partir de la cual dos secciones son la misma
+MIN_PALABRAS = 8  # Por debajo, la sección se conserva tal cual en lugar de adaptarse
+PROPORCION_INDICE = 0.6  # Proporción de líneas con aspecto de entrada del índice para descartar la sección
+
+MOTIVO_VACIA = "vacía"
+MOTIVO_INDICE = "entrada del índice"
+
+PATRON_PALABRA = re.compile(r'\w+')
+# Título con puntos de relleno y número de página, línea corta que acaba en número o solo un número
+PATRON_LINEA_INDICE = re.compile(
+    r'^(?:.{0,120}?(?:\.{3,}|…+|(?:\s?\.){3,}|·{3,})\s*\d{1,4}|(?:\S+\s+){0,8}\d{1,4}|[IVXLCDM]+|\d{1,4})\s*$'
+)
+FINALES_INDICE = frozenset("0123456789IVXLCDM")
+MASCARA_HASH = (1 << 64) - 1
+
+
+# Función para saber si una sección se descarta antes de adaptarla; devuelve el motivo o None
+def motivo_descarte(texto):
+    lineas = [linea.strip() for linea in (texto or "").splitlines() if linea.strip()]
+    if not lineas:
+        return MOTIVO_VACIA
+    # Solo las líneas que acaban en un número o en un número romano pueden ser del índice
+    del_indice = sum(1 for linea in lineas if linea[-1] in FINALES_INDICE and PATRON_LINEA_INDICE.match(linea))
+    if del_indice >= PROPORCION_INDICE * len(lineas):
+        return MOTIVO_INDICE
+    return None
+
+
+# Función para saber si una sección es demasiado corta para adaptarla
+def es_corta(texto):
+    return len(PATRON_PALABRA.findall(texto or "")) < MIN_PALABRAS
+
+
+# Firma MinHash de un texto ya normalizado: los TAMANO_FIRMA menores hashes de sus shingles de palabras
+# Se usa hash() de Python: las firmas solo se comparan dentro del mismo proceso
+def firma_minhash(texto, tamano=TAMANO_FIRMA, palabras_por_shingle=TAMANO_SHINGLE):
+    palabras = PATRON_PALABRA.findall(texto.lower())
+    shingles = {tuple(palabras[i:i + palabras_por_shingle])
+                for i in range(max(1, len(palabras) - palabras_por_shingle + 1))}
+    return frozenset(heapq.nsmallest(tamano, {hash(shingle) & MASCARA_HASH for shingle in shingles}))
+
+
+# Similitud de Jaccard estimada a partir de dos firmas
+def similitud(firma_a, firma_b, tamano=TAMANO_FIRMA):
+    union = heapq.nsmallest(tamano, firma_a | firma_b)
+    if not union:
+        return 0.0
+    return sum(1 for valor in union if valor in firma_a and valor in firma_b) / len(union)
+
+
+# Función para revisar las secciones {titulo: texto} en orden
+# Devuelve {"descartadas": {titulo: motivo}, "duplicadas": {titulo: titulo_original}, "cortas": [titulo]}; el
+# original es siempre una sección anterior que se adapta, y las cortas no se comparan con las demás
+def revisar_secciones(secciones, umbral=UMBRAL_SIMILITUD):
+    descartadas = {}
+    duplicadas = {}
+    cortas = []
+    por_texto = {}  # {texto normalizado: titulo} de las secciones originales
+    firmas = {}
+    indice = defaultdict(list)  # {valor de la firma: títulos de las secciones originales que lo tienen}
+    for titulo, texto in secciones.items():
+        motivo = motivo_descarte(texto)
+        if motivo:
+            descartadas[titulo] = motivo
+            continue
+        if es_corta(texto):
+            cortas.append(titulo)
+            continue
+        normalizado = normalizar_texto(texto)
+        if normalizado in por_texto:
+            duplicadas[titulo] = por_texto[normalizado]
+            continue
+        firma = firma_minhash(normalizado)
+        # Solo se comparan las secciones que comparten una parte apreciable de la firma
+        comunes = Counter(original for valor in firma for original in indice[valor])
+        original = None
+        for candidato, cuenta in comunes.most_common():
+            if cuenta < umbral * len(firma) / 2:
+                break
+            if similitud(firma, firmas[candidato]) >= umbral:
+                original = candidato
+                break
+        if original:
+            duplicadas[titulo] = original
+            continue
+        por_texto[normalizado] = titulo
+        firmas[titulo] = firma
+        for valor in firma:
+            indice[valor].append(titulo)
+    return {"descartadas": descartadas, "duplicadas": duplicadas, "cortas": cortas}
@@ -0,0 +1,179 @@
+import json
+import re
+from collections import Counter
+
+# Lectura de los esquemas de libro que devuelve el modelo
+# Se pide el esquema en JSON, pero no todos los modelos lo respetan: si la respuesta no es JSON se interpreta
+# como texto con un analizador tolerante que reconoce los formatos habituales (Capítulo N / Chapter N,
+# encabezados Markdown, listas numeradas o con viñetas, numeración 1.1, números romanos, negritas...).
+# El resultado es siempre {capitulo: [secciones]} con los títulos limpios de numeración y marcas.
+
+PATRON_BLOQUE_JSON = re.compile(r'```(?:json)?\s*(.*?)```', re.DOTALL | re.IGNORECASE)
+CLAVES_CAPITULOS = ("capitulos", "capítulos", "chapters", "esquema", "outline")
+CLAVES_TITULO = ("titulo", "título", "title", "nombre", "name")
+CLAVES_SECCIONES = ("secciones", "sections", "subsecciones", "subsections")
+
+PATRON_ENCABEZADO = re.compile(r'^(#{1,6})\s+')
+PATRON_VINETA = re.compile(r'^[-*+•·]\s+')
+PATRON_CAPITULO = re.compile(r'^(?i:cap[ií]tulo|chapter)\s*(?:\d+|[IVXLCDM]+)\b')
+PATRON_SECCION = re.compile(r'^(?i:secci[oó]n|section|subsecci[oó]n|apartado)\b')
+PATRON_NUMERO_COMPUESTO = re.compile(r'^\d+\.\d+(?:\.\d+)*\.?(?:\s|$)')
+PATRON_NUMERO = re.compile(r'^(?:\d+|[IVXLCDM]+|[a-z])[.)](?:\s|$)')
+PATRON_PREFIJO = re.compile(
+    r'^(?:(?i:cap[ií]tulo|chapter|secci[oó]n|section|subsecci[oó]n|apartado)\s*(?:\d+(?:\.\d+)*|[IVXLCDM]+)\b\s*[.:)\-–—]*'
+    r'|(?:\d+(?:\.\d+)*|[IVXLCDM]+|[a-z])\s*[.:)\-–—]+(?=\s|$)'
+    r'|\d+(?:\.\d+)+(?=\s|$))\s*'
+)
+
+
+# Función para quitar la numeración, las marcas de formato y las comillas de un título
+def limpiar_titulo(texto):
+    texto = texto.replace("**", "").replace("__", "").strip().strip("*_`").strip()
+    titulo = PATRON_PREFIJO.sub("", texto, count=1).strip().strip('"“”«»\'').strip(" :.-–—").strip()
+    return titulo or texto.strip(" :")
+
+
+def _clave_unica(capitulos, titulo):
+    clave = titulo
+    repeticion = 2
+    while clave in capitulos:
+        clave = f"{titulo} ({repeticion})"
+        repeticion += 1
+    return clave
+
+
+def _titulo_json(elemento):
+    if isinstance(elemento, str):
+        return elemento
+    if isinstance(elemento, dict):
+        for clave in CLAVES_TITULO:
+            if isinstance(elemento.get(clave), str):
+                return elemento[clave]
+    return ""
+
+
+# Función para leer un esquema en JSON, también dentro de un bloque ```json o con texto alrededor
+# Acepta {"capitulos": [{"titulo": ..., "secciones": [...]}]} (o las claves en inglés), una lista de capítulos
+# o {capitulo: [secciones]}. Devuelve {} si no hay JSON válido con capítulos.
+def parse_esquema_json(texto):
+    candidatos = [texto] + PATRON_BLOQUE_JSON.findall(texto)
+    inicio, fin = texto.find("{"), texto.rfind("}")
+    if 0 <= inicio < fin:
+        candidatos.append(texto[inicio:fin + 1])
+    for candidato in candidatos:
+        try:
+            datos = json.loads(candidato)
+        except ValueError:
+            continue
+        if isinstance(datos, dict) and not any(isinstance(datos.get(clave), list) for clave in CLAVES_CAPITULOS):
+            if datos and all(isinstance(valor, list) for valor in datos.values()):
+                datos = [{"titulo": titulo, "secciones": secciones} for titulo, secciones in datos.items()]
+        if isinstance(datos, dict):
+            datos = next((datos[clave] for clave in CLAVES_CAPITULOS if isinstance(datos.get(clave), list)), None)
+        if not isinstance(datos, list):
+            continue
+        capitulos = {}
+        for elemento in datos:
+            titulo = limpiar_titulo(_titulo_json(elemento))
+            if not titulo:
+                continue
+            secciones = []
+            if isinstance(elemento, dict):
+                secciones = next((elemento[clave] for clave in CLAVES_SECCIONES if isinstance(elemento.get(clave), list)), [])
+            secciones = [limpiar_titulo(_titulo_json(seccion)) for seccion in secciones]
+            capitulos[_clave_unica(capitulos, titulo)] = [seccion for seccion in secciones if seccion]
+        if capitulos:
+            return capitulos
+    return {}
+
+
+# Descompone una línea en (rango, texto): el rango ordena los niveles de la jerarquía
+# (encabezados Markdown por su nivel, luego listas numeradas y con viñetas por su sangría); None si no es
+# ni encabezado ni elemento de lista
+def _analizar_linea(linea):
+    linea = linea.replace("\t", "    ")
+    sangria = len(linea) - len(linea.lstrip(" "))
+    texto = linea.strip()
+    rango = None
+    encabezado = PATRON_ENCABEZADO.match(texto)
+    if encabezado:
+        rango = len(encabezado.group(1))
+        texto = texto[encabezado.end():]
+    vineta = PATRON_VINETA.match(texto)
+    if vineta:
+        texto = texto[vineta.end():]
+    texto = texto.replace("**", "").replace("__", "").strip()
+    if rango is None:
+        if PATRON_NUMERO.match(texto) or PATRON_NUMERO_COMPUESTO.match(texto):
+            rango = 10 + sangria
+        elif vineta:
+            rango = 20 + sangria
+    return rango, texto
+
+
+# Elige las líneas de las secciones de un capítulo: las que dicen "Sección", si las hay; si no, las numeradas
+# como 1.1; si no, los elementos de lista o encabezados del nivel más alto por debajo del capítulo
+def _secciones(cuerpo, rango_capitulo=None):
+    elegidas = [texto for _, texto in cuerpo if PATRON_SECCION.match(texto)]
+    if not elegidas:
+        elegidas = [texto for _, texto in cuerpo if PATRON_NUMERO_COMPUESTO.match(texto)]
+    if not elegidas:
+        candidatas = [(rango, texto) for rango, texto in cuerpo
+                      if rango is not None and (rango_capitulo is None or rango > rango_capitulo)]
+        if candidatas:
+            minimo = min(rango for rango, _ in candidatas)
+            elegidas = [texto for rango, texto in candidatas if rango == minimo]
+    return [titulo for titulo in (limpiar_titulo(texto) for texto in elegidas) if titulo]
+
+
+# Función para leer un esquema en texto libre
+# Si alguna línea empieza por "Capítulo N" o "Chapter N", esas líneas son los capítulos; si no, lo son los
+# elementos del nivel más alto que se repite (el título del libro como único encabezado de nivel 1 no cuenta)
+def parse_esquema_texto(texto):
+    lineas = [_analizar_linea(linea) for linea in texto.splitlines() if linea.strip()]
+    rango_capitulo = None
+    if any(PATRON_CAPITULO.match(texto_linea) for _, texto_linea in lineas):
+        indices = [i for i, (_, texto_linea) in enumerate(lineas) if PATRON_CAPITULO.match(texto_linea)]
+    else:
+        rangos = [(i, rango) for i, (rango, texto_linea) in enumerate(lineas)
+                  if rango is not None and not PATRON_NUMERO_COMPUESTO.match(texto_linea)
+                  and not PATRON_SECCION.match(texto_linea)]
+        if not rangos:
+            return {}
+        conteo = Counter(rango for _, rango in rangos)
+        rango_capitulo = next((rango for rango in sorted(conteo) if conteo[rango] >= 2), min(conteo))
+        indices = [i for i, rango in rangos if rango == rango_capitulo]
+
+    capitulos = {}
+    for posicion, inicio in enumerate(indices):
+        fin = indices[posicion + 1] if posicion + 1 < len(indices) else len(lineas)
+        titulo = limpiar_titulo(lineas[inicio][1])
+        capitulos[_clave_unica(capitulos, titulo)] = _secciones(lineas[inicio + 1:fin], rango_capitulo)
+    return capitulos
+
+
+# Función para extraer {capitulo: [secciones]} de un esquema en JSON o en texto
+def parse_esquema(esquema):
+    return parse_esquema_json(esquema) or parse_esquema_texto(esquema)
+
+
+# Función para ajustar el esquema al número de capítulos y secciones pedido
+# Recorta lo que sobra y descarta los capítulos sin secciones; devuelve (capitulos, avisos)
+def validar_esquema(capitulos, num_capitulos, num_secciones):
+    avisos = []
+    validos = {}
+    for capitulo, secciones in capitulos.items():
+        if not secciones:
+            avisos.append(f"El capítulo '{capitulo}' no tiene secciones y se omite.")
+            continue
+        if len(secciones) > num_secciones:
+            avisos.append(f"El capítulo '{capitulo}' tiene {len(secciones)} secciones; se usan las {num_secciones} primeras.")
+        elif len(secciones) < num_secciones:
+            avisos.append(f"El capítulo '{capitulo}' tiene {len(secciones)} secciones en lugar de {num_secciones}.")
+        validos[capitulo] = secciones[:num_secciones]
+    if len(validos) > num_capitulos:
+        avisos.append(f"El esquema tiene {len(validos)} capítulos; se usan los {num_capitulos} primeros.")
+        validos = dict(list(validos.items())[:num_capitulos])
+    elif validos and len(validos) < num_capitulos:
+        avisos.append(f"El esquema tiene {len(validos)} capítulos en lugar de {num_capitulos}.")
+    return validos, avisos
@@ -0,0 +1,164 @@
+import hashlib
+import multiprocessing
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+# Extracción de la estructura (partes, capítulos y secciones) de una obra en PDF
+# Los encabezados se localizan con una sola expresión regular combinada sobre el texto completo
+# y la jerarquía se construye a partir de las posiciones, sin copiar trozos intermedios del texto.
+# PyPDF2 se importa al leer el primer PDF y no al importar el módulo, para no retrasar el arranque de las apps.
+
+PATRON_ENCABEZADO = re.compile(
+    r'(?P<parte>Parte\s+\w+)|(?P<capitulo>Capítulo\s+\d+)|(?P<seccion>Sección\s+\d+)',
+    re.IGNORECASE,
+)
+
+# Texto por página de los últimos PDFs procesados, indexado por el hash del contenido
+# Sobrevive a las re-ejecuciones del script de Streamlit porque vive en el módulo importado
+MAX_PDFS_EN_MEMORIA = 8
+PAGINAS_POR_TAREA = 25
+_paginas_en_memoria = OrderedDict()
+_candado_memoria = threading.Lock()
+_reader_trabajador = None
+
+
+# Función para calcular el hash del contenido de un PDF
+def hash_pdf(datos):
+    return hashlib.sha256(datos).hexdigest()
+
+
+def _leer_bytes(archivo_pdf):
+    if isinstance(archivo_pdf, (bytes, bytearray)):
+        return bytes(archivo_pdf)
+    if hasattr(archivo_pdf, "getvalue"):
+        return archivo_pdf.getvalue()
+    if isinstance(archivo_pdf, str):
+        with open(archivo_pdf, "rb") as f:
+            return f.read()
+    archivo_pdf.seek(0)
+    return archivo_pdf.read()
+
+
+# Cada proceso de trabajo abre el PDF una sola vez y luego extrae los rangos que se le asignan
+def _iniciar_trabajador(datos_pdf):
+    import PyPDF2
+
+    global _reader_trabajador
+    _reader_trabajador = PyPDF2.PdfReader(BytesIO(datos_pdf))
+
+
+def _extraer_rango(inicio, fin):
+    return [_reader_trabajador.pages[i].extract_text() or "" for i in range(inicio, fin)]
+
+
+# Función para extraer el texto de cada página del PDF
+# Con num_procesos > 1 las páginas se reparten en un pool de procesos y se reensamblan en orden.
+# Si se pasa el diccionario estadisticas, se rellena con páginas, segundos y páginas por segundo.
+def extraer_texto_paginas(archivo_pdf, num_procesos=1, estadisticas=None):
+    datos = _leer_bytes(archivo_pdf)
+    clave = hash_pdf(datos)
+    inicio_reloj = time.perf_counter()
+
+    with _candado_memoria:
+        paginas = _paginas_en_memoria.get(clave)
+        if paginas is not None:
+            _paginas_en_memoria.move_to_end(clave)
+
+    desde_memoria = paginas is not None
+    if not desde_memoria:
+        import PyPDF2
+
+        reader = PyPDF2.PdfReader(BytesIO(datos))
+        total = len(reader.pages)
+        if num_procesos <= 1 or total <= PAGINAS_POR_TAREA:
+            paginas = [page.extract_text() or "" for page in reader.pages]
+        else:
+            rangos = [(i, min(i + PAGINAS_POR_TAREA, total)) for i in range(0, total, PAGINAS_POR_TAREA)]
+            with ProcessPoolExecutor(
+                max_workers=num_procesos,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_iniciar_trabajador,
+                initargs=(datos,),
+            ) as executor:
+                paginas = []
+                for bloque in executor.map(_extraer_rango, *zip(*rangos)):
+                    paginas.extend(bloque)
+
+        with _candado_memoria:
+            _paginas_en_memoria[clave] = paginas
+            while len(_paginas_en_memoria) > MAX_PDFS_EN_MEMORIA:
+                _paginas_en_memoria.popitem(last=False)
+
+    if estadisticas is not None:
+        segundos = time.perf_counter() - inicio_reloj
+        estadisticas.update({
+            "paginas": len(paginas),
+            "segundos": segundos,
+            "paginas_por_segundo": len(paginas) / segundos if segundos > 0 else 0.0,
+            "desde_memoria": desde_memoria,
+        })
+    return paginas
+
+
+# Función para construir la jerarquía a partir del texto de las páginas
+# Devuelve {parte: {capitulo: {seccion: texto} | texto}} si hay partes, o {capitulo: {seccion: texto} | texto} si no
+def estructurar_texto(paginas):
+    texto_completo = "\n".join(paginas) + "\n" if paginas else ""
+    encabezados = [(m.lastgroup, m.start(), m.end(), m.group().strip()) for m in PATRON_ENCABEZADO.finditer(texto_completo)]
+    hay_partes = any(tipo == 'parte' for tipo, _, _, _ in encabezados)
+
+    estructura = {}
+    capitulos = None if hay_partes else estructura  # Diccionario de capítulos de la parte actual
+    secciones = None  # Diccionario de secciones del capítulo actual
+
+    for i, (tipo, inicio, fin, titulo) in enumerate(encabezados):
+        siguiente = encabezados[i + 1] if i + 1 < len(encabezados) else None
+        fin_cuerpo = siguiente[1] if siguiente else len(texto_completo)
+
+        if tipo == 'parte':
+            capitulos = estructura[titulo] = {}
+            secciones = None
+        elif tipo == 'capitulo':
+            if capitulos is None:
+                continue  # Capítulo anterior a la primera parte
+            if siguiente and siguiente[0] == 'seccion':
+                secciones = capitulos[titulo] = {}
+            else:
+                # Si no hay secciones, asignar el texto completo al capítulo
+                capitulos[titulo] = texto_completo[fin:fin_cuerpo].strip()
+                secciones = None
+        elif secciones is not None:
+            secciones[titulo] = texto_completo[fin:fin_cuerpo].strip()
+
+    return estructura
+
+
+# Función para extraer texto de un PDF por partes, capítulos y secciones
+# En estadisticas se añade también el tiempo de la estructuración (segundos_estructura)
+def extraer_estructura_pdf(archivo_pdf, num_procesos=1, estadisticas=None):
+    paginas = extraer_texto_paginas(archivo_pdf, num_procesos, estadisticas)
+    inicio = time.perf_counter()
+    estructura = estructurar_texto(paginas)
+    if estadisticas is not None:
+        estadisticas["segundos_estructura"] = time.perf_counter() - inicio
+    return estructura
+
+
+# Función para aplanar la estructura en un diccionario {"Parte > Capítulo > Sección": texto}
+def aplanar_estructura(estructura):
+    secciones = {}
+    for parte, contenido_parte in estructura.items():
+        if isinstance(contenido_parte, dict):
+            for capitulo, contenido_capitulo in contenido_parte.items():
+                if isinstance(contenido_capitulo, dict):
+                    for seccion, contenido_seccion in contenido_capitulo.items():
+                        secciones[f"{parte} > {capitulo} > {seccion}"] = contenido_seccion
+                else:
+                    secciones[f"{parte} > {capitulo}"] = contenido_capitulo
+        else:
+            secciones[parte] = contenido_parte
+    return secciones
@@ -1,12 +1,18 @@
 import streamlit as st
-import requests
-from docx import Document
-from docx.shared import Pt
-from io import BytesIO
-import time
-from bs4 import BeautifulSoup
-import re
-import PyPDF2
+import os
+import statistics
+from trabajos import DiarioTrabajo, id_trabajo, id_valido
+from fragmentos import PRESUPUESTO_TOKENS, UMBRAL_LOTE
+from estructura_pdf import aplanar_estructura, extraer_estructura_pdf, hash_pdf
+from documento import Documento
+from metricas import Metricas
+from revisiones import RegistroRevisiones, comparar_ediciones, huellas_secciones
+from duplicados import revisar_secciones
+from pipeline import OBRA_TITULO, OPENAI_URL, adaptar_contenidos_concurrente, agregar_seccion_obra
+from ui_comun import (
+    mostrar_descargas, mostrar_metricas, mostrar_resultado, obtener_cache, obtener_cliente, obtener_cola,
+    obtener_enrutador, obtener_usuario, seguir_trabajo,
+)
 
 # Configuración de la página
 st.set_page_config(
@@ -23,178 +29,88 @@ st.markdown("""
 Esta aplicación adapta una obra filosófica proporcionada en **PDF** para estudiantes de 16 años, aplicando estrategias de simplificación de lenguaje, relevancia para adolescentes y técnicas de engagement.
 """)
 
-# Función para extraer texto de un PDF por partes, capítulos y secciones
-def extraer_estructura_pdf(archivo_pdf):
-    reader = PyPDF2.PdfReader(archivo_pdf)
-    texto_completo = ""
-    for page in reader.pages:
-        texto_completo += page.extract_text() + "\n"
-
-    # Definir patrones para partes, capítulos y secciones
-    patron_parte = re.compile(r'Parte\s+\w+', re.IGNORECASE)
-    patron_capitulo = re.compile(r'Capítulo\s+\d+', re.IGNORECASE)
-    patron_seccion = re.compile(r'Sección\s+\d+', re.IGNORECASE)
+# Adaptaciones guardadas por huella de sección y huellas de cada edición subida, compartidas entre sesiones
+@st.cache_resource
+def obtener_revisiones():
+    return RegistroRevisiones()
+
+# Resumen propio de la obra al terminar el trabajo: primer token y secciones reutilizadas, descartadas o en lotes
+def mostrar_detalles_obra(resultado):
+    tiempos_primer_token = resultado["tiempos_primer_token"]
+    if tiempos_primer_token:
+        col_media, col_max = st.columns(2)
+        col_media.metric("Tiempo hasta el primer token (mediana)", f"{statistics.median(tiempos_primer_token.values()):.2f} s")
+        col_max.metric("Tiempo hasta el primer token (máximo)", f"{max(tiempos_primer_token.values()):.2f} s")
+    estadisticas_lotes = resultado["estadisticas_lotes"]
+    if estadisticas_lotes["secciones_reutilizadas"]:
+        st.sidebar.caption(
+            f"{estadisticas_lotes['secciones_reutilizadas']} de {resultado['total']} secciones reutilizadas de ediciones anteriores."
+        )
+    if estadisticas_lotes["solicitudes_evitadas"]:
+        st.sidebar.caption(
+            f"Revisión previa: {estadisticas_lotes['secciones_descartadas']} secciones descartadas, "
+            f"{estadisticas_lotes['secciones_duplicadas']} duplicadas y {estadisticas_lotes['secciones_conservadas']} "
+            f"cortas sin adaptar; {estadisticas_lotes['solicitudes_evitadas']} solicitudes "
+            f"y unos {estadisticas_lotes['tokens_evitados']} tokens de prompt evitados."
+        )
+    if estadisticas_lotes["lotes"]:
+        st.sidebar.caption(
+            f"Lotes: {estadisticas_lotes['solicitudes']} solicitudes en lugar de {estadisticas_lotes['solicitudes_sin_lotes']} "
+            f"({estadisticas_lotes['secciones_en_lotes']} fragmentos en {estadisticas_lotes['lotes']} lotes, "
+            f"{estadisticas_lotes['lotes_fallidos']} repetidos uno a uno); "
+            f"unos {estadisticas_lotes['tokens_ahorrados']} tokens de prompt ahorrados."
+        )
 
-    # Encontrar todas las partes
-    partes = patron_parte.findall(texto_completo)
-    if partes:
-        # Estructura jerárquica con partes, capítulos y secciones
-        estructura = {}
-        indices_partes = [m.start() for m in patron_parte.finditer(texto_completo)]
-        indices_partes.append(len(texto_completo))  # Para capturar el último segmento
+# Estructura del PDF y secciones aplanadas, compartidas entre sesiones e indexadas por el hash del contenido
+@st.cache_data(max_entries=8, show_spinner="Extrayendo la estructura del PDF...")
+def cargar_pdf(hash_contenido, _datos_pdf, num_procesos):
+    estadisticas = {}
+    estructura = extraer_estructura_pdf(_datos_pdf, num_procesos, estadisticas)
+    return estructura, aplanar_estructura(estructura), estadisticas
 
-        for i in range(len(partes)):
-            inicio = indices_partes[i]
-            fin = indices_partes[i+1]
-            texto_parte = texto_completo[inicio:fin]
-            titulo_parte = partes[i].strip()
-            estructura[titulo_parte] = {}
+# Claves de la sesión que dependen del PDF subido
+CLAVES_PDF = ("pdf_id", "pdf_hash", "estructura", "secciones", "estadisticas_pdf", "huellas", "revision", "edicion_anterior")
 
-            # Encontrar capítulos dentro de la parte
-            capitulos = patron_capitulo.findall(texto_parte)
-            indices_capitulos = [m.start() for m in patron_capitulo.finditer(texto_parte)]
-            indices_capitulos.append(len(texto_parte))  # Para capturar el último segmento
+# Al subir un archivo distinto se descartan los datos de la sesión derivados del anterior
+def invalidar_pdf():
+    for clave in CLAVES_PDF:
+        st.session_state.pop(clave, None)
 
-            for j in range(len(capitulos)):
-                inicio_cap = indices_capitulos[j]
-                fin_cap = indices_capitulos[j+1]
-                texto_capitulo = texto_parte[inicio_cap:fin_cap]
-                titulo_capitulo = capitulos[j].strip()
-                estructura[titulo_parte][titulo_capitulo] = {}
+# Cargar el archivo PDF
+uploaded_file = st.file_uploader("Sube la obra filosófica en PDF", type=["pdf"], on_change=invalidar_pdf)
 
-                # Encontrar secciones dentro del capítulo
-                secciones = patron_seccion.findall(texto_capitulo)
-                indices_secciones = [m.start() for m in patron_seccion.finditer(texto_capitulo)]
-                indices_secciones.append(len(texto_capitulo))  # Para capturar el último segmento
+# Número de procesos para extraer el texto de las páginas en paralelo
+num_procesos = st.sidebar.number_input(
+    "Procesos para extraer el PDF", min_value=1, max_value=os.cpu_count() or 1, value=os.cpu_count() or 1
+)
 
-                if secciones:
-                    for k in range(len(secciones)):
-                        inicio_sec = indices_secciones[k]
-                        fin_sec = indices_secciones[k+1]
-                        texto_seccion = texto_capitulo[inicio_sec:fin_sec]
-                        titulo_seccion = secciones[k].strip()
-                        estructura[titulo_parte][titulo_capitulo][titulo_seccion] = texto_seccion.replace(titulo_seccion, '').strip()
-                else:
-                    # Si no hay secciones, asignar el texto completo al capítulo
-                    contenido_capitulo = texto_capitulo.replace(titulo_capitulo, '').strip()
-                    estructura[titulo_parte][titulo_capitulo] = contenido_capitulo
+if uploaded_file is not None:
+    # Solo se lee y se hashea el archivo cuando cambia; en el resto de re-ejecuciones se usa la sesión
+    if st.session_state.get("pdf_id") != uploaded_file.file_id:
+        invalidar_pdf()
+        datos_pdf = uploaded_file.getvalue()
+        pdf_hash = hash_pdf(datos_pdf)
+        estructura, secciones, estadisticas_pdf = cargar_pdf(pdf_hash, datos_pdf, num_procesos)
+        st.session_state.update(
+            pdf_id=uploaded_file.file_id,
+            pdf_hash=pdf_hash,
+            estructura=estructura,
+            secciones=secciones,
+            estadisticas_pdf=estadisticas_pdf,
+            huellas=huellas_secciones(secciones),
+            revision=revisar_secciones(secciones),
+        )
 
-        return estructura
+    estructura = st.session_state["estructura"]
+    secciones = st.session_state["secciones"]
+    estadisticas_pdf = st.session_state["estadisticas_pdf"]
+    if estadisticas_pdf["desde_memoria"]:
+        st.sidebar.caption(f"Texto de {estadisticas_pdf['paginas']} páginas reutilizado de una extracción anterior.")
     else:
-        # Si no hay partes, manejar solo capítulos y secciones
-        estructura = {}
-        capitulos = patron_capitulo.findall(texto_completo)
-        indices_capitulos = [m.start() for m in patron_capitulo.finditer(texto_completo)]
-        indices_capitulos.append(len(texto_completo))  # Para capturar el último segmento
-
-        for i in range(len(capitulos)):
-            inicio = indices_capitulos[i]
-            fin = indices_capitulos[i+1]
-            texto_capitulo = texto_completo[inicio:fin]
-            titulo_capitulo = capitulos[i].strip()
-            estructura[titulo_capitulo] = {}
-
-            # Encontrar secciones dentro del capítulo
-            secciones = patron_seccion.findall(texto_capitulo)
-            indices_secciones = [m.start() for m in patron_seccion.finditer(texto_capitulo)]
-            indices_secciones.append(len(texto_capitulo))  # Para capturar el último segmento
-
-            if secciones:
-                for j in range(len(secciones)):
-                    inicio_sec = indices_secciones[j]
-                    fin_sec = indices_secciones[j+1]
-                    texto_seccion = texto_capitulo[inicio_sec:fin_sec]
-                    titulo_seccion = secciones[j].strip()
-                    estructura[titulo_capitulo][titulo_seccion] = texto_seccion.replace(titulo_seccion, '').strip()
-            else:
-                # Si no hay secciones, asignar el texto completo al capítulo
-                contenido_capitulo = texto_capitulo.replace(titulo_capitulo, '').strip()
-                estructura[titulo_capitulo] = contenido_capitulo
-
-        return estructura
-
-# Función para adaptar el contenido usando la API
-def adaptar_contenido(contenido_original, titulo):
-    api_key = st.secrets["api"]["key"]
-    url = "https://api.openai.com/v1/chat/completions"  # URL de la API de OpenAI
-    
-    prompt = f"""
-    Adapta el siguiente contenido filosófico para estudiantes de 16 años. Aplica las siguientes estrategias:
-    
-    **Simplificación del Lenguaje**
-    - Reemplaza términos filosóficos complejos con lenguaje cotidiano.
-    - Usa oraciones más cortas.
-    - Explica conceptos abstractos con analogías relacionadas con la vida diaria de un adolescente.
-    - Elimina jerga académica.
-    
-    **Relevancia para Adolescentes**
-    - Conecta las ideas filosóficas con la exploración de la identidad personal, relaciones sociales, desafíos escolares y de la vida, tecnología y experiencias modernas, crecimiento personal e inteligencia emocional.
-    
-    **Técnicas de Engagement**
-    - Incluye un tono conversacional.
-    - Usa ejemplos del mundo real.
-    - Añade preguntas reflexivas.
-    - Desglosa ideas complejas en partes fáciles de entender.
-    - Resalta aplicaciones prácticas para la vida diaria.
-    
-    **Título:**
-    {titulo}
-    
-    **Contenido Original:**
-    {contenido_original}
-    
-    **Adaptación:**
-    """
-
-    payload = {
-        "messages": [
-            {"role": "system", "content": "Eres un asistente que adapta textos filosóficos para estudiantes de 16 años aplicando estrategias de simplificación, relevancia y engagement."},
-            {"role": "user", "content": prompt}
-        ],
-        "model": "gpt-4",
-        "temperature": 0.7
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            respuesta = response.json()
-            adaptacion = respuesta.get('choices')[0].get('message').get('content').strip()
-            return adaptacion
-        else:
-            st.error(f"Error al adaptar {titulo}: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        st.error(f"Excepción al adaptar {titulo}: {e}")
-        return None
-
-# Función para convertir texto con formato básico a Python-docx
-def texto_a_docx(paragraph, texto):
-    # Puedes implementar más reglas de formato si es necesario
-    lines = texto.split('\n')
-    for line in lines:
-        if line.startswith("**") and line.endswith("**"):
-            # Texto en negrita
-            run = paragraph.add_run(line.strip('*'))
-            run.bold = True
-        elif line.endswith("?"):
-            # Pregunta reflexiva en itálica
-            run = paragraph.add_run(line)
-            run.italic = True
-        else:
-            paragraph.add_run(line)
-    paragraph.add_run('\n')
-
-# Cargar el archivo PDF
-uploaded_file = st.file_uploader("Sube la obra filosófica en PDF", type=["pdf"])
-
-if uploaded_file is not None:
-    estructura = extraer_estructura_pdf(uploaded_file)
+        st.sidebar.caption(
+            f"{estadisticas_pdf['paginas']} páginas extraídas en {estadisticas_pdf['segundos']:.1f} s "
+            f"({estadisticas_pdf['paginas_por_segundo']:.0f} páginas/s)."
+        )
     if not estructura:
         st.error("No se pudieron extraer partes, capítulos o secciones del PDF. Verifica la estructura del documento.")
     else:
@@ -203,96 +119,189 @@ if uploaded_file is not None:
             "Seleccione una opción de adaptación:",
             ("Seleccionar manualmente", "Adaptar toda la obra")
         )
-        
-        seleccionados = {}
+
+        # Las secciones aplanadas ya están calculadas para este PDF
+        seleccionados = dict(secciones)
 
         if opcion == "Seleccionar manualmente":
-            # Navegar por la estructura jerárquica para seleccionar
-            for parte, contenido_parte in estructura.items():
+            # Navegar por la estructura jerárquica
+            for parte in estructura:
                 with st.sidebar.expander(parte):
-                    for capitulo, contenido_capitulo in contenido_parte.items():
-                        if isinstance(contenido_capitulo, dict):
-                            for seccion, contenido_seccion in contenido_capitulo.items():
-                                key = f"{parte} > {capitulo} > {seccion}"
-                                seleccionados[key] = contenido_seccion
-                        else:
-                            key = f"{parte} > {capitulo}"
-                            seleccionados[key] = contenido_capitulo
+                    for key in seleccionados:
+                        if key == parte or key.startswith(f"{parte} > "):
+                            st.text(key)
         else:
-            # Adaptar toda la obra
-            for parte, contenido_parte in estructura.items():
-                if isinstance(contenido_parte, dict):
-                    for capitulo, contenido_capitulo in contenido_parte.items():
-                        if isinstance(contenido_capitulo, dict):
-                            for seccion, contenido_seccion in contenido_capitulo.items():
-                                key = f"{parte} > {capitulo} > {seccion}"
-                                seleccionados[key] = contenido_seccion
-                        else:
-                            key = f"{parte} > {capitulo}"
-                            seleccionados[key] = contenido_capitulo
-                else:
-                    seleccionados[parte] = contenido_parte
             st.sidebar.info(f"Se procesarán todas las secciones disponibles: {len(seleccionados)} elementos.")
 
-        # Botón para iniciar la adaptación
+        max_concurrencia = st.sidebar.slider("Solicitudes simultáneas a la API", min_value=1, max_value=16, value=4)
+        omitir_cache = st.sidebar.checkbox("Omitir caché de adaptaciones", value=False)
+        presupuesto_tokens = st.sidebar.number_input(
+            "Tokens máximos de texto original por solicitud", min_value=500, max_value=100000,
+            value=PRESUPUESTO_TOKENS, step=500,
+            help="Los capítulos más largos se dividen por párrafos y se adaptan en paralelo."
+        )
+        solapamiento = st.sidebar.number_input("Párrafos de solapamiento entre fragmentos", min_value=0, max_value=5, value=0)
+        agrupar = st.sidebar.checkbox(
+            "Agrupar secciones cortas en una sola solicitud", value=False,
+            help="Las estrategias de adaptación se envían una vez por lote en lugar de una vez por sección."
+        )
+        umbral_lote = 0
+        if agrupar:
+            umbral_lote = st.sidebar.number_input(
+                "Tokens máximos de una sección para agruparla", min_value=50, max_value=presupuesto_tokens,
+                value=min(UMBRAL_LOTE, presupuesto_tokens), step=50
+            )
+
+        # Comparación con la edición anterior de la misma obra (la ya adaptada que comparte más secciones)
+        # Se busca una sola vez por PDF: recorre todas las ediciones guardadas
+        huellas = st.session_state["huellas"]
+        if "edicion_anterior" not in st.session_state:
+            st.session_state["edicion_anterior"] = obtener_revisiones().edicion_anterior(huellas, st.session_state["pdf_hash"])
+        anterior = st.session_state["edicion_anterior"]
+        if anterior:
+            cambios = comparar_ediciones(anterior[1], huellas)
+            st.sidebar.caption(
+                f"Edición anterior encontrada: {len(cambios['sin_cambios'])} secciones sin cambios, "
+                f"{len(cambios['modificadas'])} modificadas, {len(cambios['nuevas'])} nuevas y "
+                f"{len(cambios['eliminadas'])} eliminadas."
+            )
+            with st.sidebar.expander("Cambios respecto a la edición anterior"):
+                for etiqueta, clave in (("Modificadas", "modificadas"), ("Nuevas", "nuevas"), ("Eliminadas", "eliminadas")):
+                    if cambios[clave]:
+                        st.markdown(f"**{etiqueta}**")
+                        st.text("\n".join(cambios[clave]))
+        # Al omitir la caché se vuelven a adaptar todas las secciones
+        solo_cambios = st.sidebar.checkbox(
+            "Adaptar solo las secciones nuevas o modificadas", value=anterior is not None and not omitir_cache,
+            disabled=omitir_cache,
+            help="Las secciones cuyo texto ya se adaptó en una edición anterior se reutilizan sin volver a pedirlas."
+        ) and not omitir_cache
+
+        # Secciones que no merece la pena adaptar: vacías, entradas del índice y duplicadas de otra anterior
+        revision = st.session_state["revision"]
+        if revision["descartadas"] or revision["duplicadas"] or revision["cortas"]:
+            st.sidebar.caption(
+                f"Revisión previa: {len(revision['descartadas'])} secciones vacías o del índice, "
+                f"{len(revision['duplicadas'])} duplicadas y {len(revision['cortas'])} demasiado cortas para adaptarlas."
+            )
+            with st.sidebar.expander("Secciones descartadas, duplicadas y cortas"):
+                for titulo, motivo in revision["descartadas"].items():
+                    st.text(f"{titulo} ({motivo})")
+                for titulo, original in revision["duplicadas"].items():
+                    st.text(f"{titulo} = {original}")
+                for titulo in revision["cortas"]:
+                    st.text(f"{titulo} (se conserva sin adaptar)")
+        deduplicar = st.sidebar.checkbox(
+            "Omitir secciones vacías, del índice y duplicadas", value=True,
+            help="Las vacías y las del índice no se adaptan; las duplicadas reutilizan la adaptación de su original "
+                 "y las muy cortas se incluyen con su texto original."
+        )
+
+        # Trabajo reanudable: el id por defecto depende del PDF y de las opciones, así que
+        # volver a pulsar el botón tras un corte continúa donde se quedó
+        id_por_defecto = id_trabajo("obra", st.session_state["pdf_hash"], sorted(seleccionados), presupuesto_tokens, solapamiento)
+        id_elegido = st.sidebar.text_input("Id del trabajo (para reanudar)", value=id_por_defecto)
+        id_elegido = id_elegido.strip() or id_por_defecto
+        if not id_valido(id_elegido):
+            st.sidebar.error("El id del trabajo solo puede tener letras, números, '_' y '-'.")
+            st.stop()
+        diario = DiarioTrabajo(id_elegido)
+        resultados_previos = diario.resultados()
+        if resultados_previos:
+            st.sidebar.caption(
+                f"Trabajo {diario.id}: {len(diario.completados())} fragmentos guardados, "
+                f"{len(diario.fallidos())} fallidos que se reintentarán. Solo se reutilizan los guardados "
+                "con el mismo texto y las mismas opciones."
+            )
+        # Documento ya montado en una ejecución anterior de este trabajo
+        if st.session_state.get("documento_trabajo") != diario.id:
+            guardado = diario.leer_documento()
+            st.session_state["documento"] = Documento.desde_json(guardado) if guardado else None
+            st.session_state["documento_trabajo"] = diario.id
+
+        # Botón para iniciar la adaptación: el trabajo se encola y se ejecuta en segundo plano,
+        # así que sigue aunque se cierre la pestaña y se puede retomar con su id
         if st.sidebar.button("Adaptar Contenidos"):
             if not seleccionados:
                 st.sidebar.error("Por favor, seleccione al menos una parte, capítulo o sección válido.")
             else:
-                documentos = {}
                 total = len(seleccionados)
-                progress_bar = st.progress(0)
-                status_text = st.empty()
-
-                for idx, (titulo, contenido) in enumerate(seleccionados.items(), start=1):
-                    status_text.text(f"Adaptando {titulo} ({idx}/{total})...")
-
-                    if contenido:
-                        adaptacion = adaptar_contenido(contenido, titulo)
-                        if adaptacion:
-                            documentos[titulo] = adaptacion
-                        else:
-                            documentos[titulo] = "Error en la adaptación."
-                    else:
-                        documentos[titulo] = "Contenido no disponible."
-
-                    # Actualizar la barra de progreso
-                    progress = idx / total
-                    progress_bar.progress(progress)
-
-                    # Simular tiempo de espera (puedes eliminar esto en producción)
-                    time.sleep(0.5)
-
-                status_text.text("Adaptación completa.")
-                progress_bar.empty()
-
-                # Crear el documento Word
-                doc = Document()
-                estilo_normal = doc.styles['Normal']
-                estilo_normal.font.name = 'Arial'
-                estilo_normal.font.size = Pt(12)
-
-                for titulo, contenido in documentos.items():
-                    # Agregar título como encabezado de nivel 1
-                    doc.add_heading(titulo, level=1)
-
-                    # Dividir el contenido en párrafos basados en saltos de línea
-                    paragraphs = contenido.split('\n\n')
-                    for para in paragraphs:
-                        paragraph = doc.add_paragraph()
-                        texto_a_docx(paragraph, para)
-                    doc.add_page_break()
-
-                # Guardar el documento en memoria
-                buffer = BytesIO()
-                doc.save(buffer)
-                buffer.seek(0)
-
-                # Botón para descargar
-                st.success("Todos los contenidos han sido adaptados exitosamente.")
-                st.download_button(
-                    label="Descargar Documento Word",
-                    data=buffer,
-                    file_name="Adapted_Philosophical_Work.docx",
-                    mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-                )
+                # Todo lo que depende de Streamlit se resuelve aquí; el hilo del trabajo no tiene contexto de script
+                api_key = st.secrets["api"]["key"]
+                url = st.secrets["api"].get("url", OPENAI_URL)
+                cache = obtener_cache()
+                cliente = obtener_cliente()
+                enrutador = obtener_enrutador("obra")
+                revisiones = obtener_revisiones()
+                pdf_hash = st.session_state["pdf_hash"]
+
+                # Métricas de esta ejecución, empezando por la extracción del PDF
+                metricas = Metricas(st.secrets.get("precios", {}))
+                metricas.registrar_etapa("extraccion_pdf", estadisticas_pdf["segundos"])
+                metricas.registrar_etapa("estructura_pdf", estadisticas_pdf.get("segundos_estructura", 0.0))
+
+                def ejecutar(trabajo, ejecutor):
+                    # El documento se monta sección a sección, en orden, a medida que se completan
+                    documento = Documento(OBRA_TITULO)
+                    tiempos_primer_token = {}
+                    estadisticas_lotes = {}
+
+                    def al_completar(titulo, adaptacion, error, hechos, total_fragmentos):
+                        if error:
+                            trabajo.agregar_error(f"Error al adaptar {titulo}: {error}")
+                        trabajo.progresar(hechos, total_fragmentos, f"Adaptado {titulo} ({hechos}/{total_fragmentos})...")
+
+                    def al_terminar_seccion(titulo, adaptacion):
+                        with metricas.etapa("documento"):
+                            agregar_seccion_obra(documento, titulo, adaptacion)
+
+                    trabajo.progresar(0, total, f"Adaptando {total} elementos ({max_concurrencia} en paralelo)...")
+                    with metricas.etapa("adaptacion"):
+                        adaptar_contenidos_concurrente(
+                            seleccionados,
+                            api_key,
+                            url,
+                            max_concurrencia=max_concurrencia,
+                            al_completar=al_completar,
+                            cache=cache,
+                            omitir_cache=omitir_cache,
+                            al_progresar=trabajo.actualizar_parciales,
+                            tiempos_primer_token=tiempos_primer_token,
+                            presupuesto_tokens=presupuesto_tokens,
+                            solapamiento=solapamiento,
+                            cliente=cliente,
+                            enrutador=enrutador,
+                            diario=diario,
+                            al_terminar_seccion=al_terminar_seccion,
+                            umbral_lote=umbral_lote,
+                            estadisticas_lotes=estadisticas_lotes,
+                            metricas=metricas,
+                            revisiones=revisiones,
+                            solo_cambios=solo_cambios,
+                            ejecutor=ejecutor,
+                            deduplicar=deduplicar,
+                        )
+                    revisiones.guardar_edicion(pdf_hash, huellas)
+                    diario.guardar_documento(documento.a_json())
+                    return {
+                        "documento": documento,
+                        "metricas": metricas,
+                        "tiempos_primer_token": tiempos_primer_token,
+                        "estadisticas_lotes": estadisticas_lotes,
+                        "total": total,
+                    }
+
+                obtener_cola().enviar(obtener_usuario(), diario.id, f"{total} secciones", ejecutar, max_concurrencia)
+
+        # Progreso del trabajo en curso o resultado del último, si este trabajo está en la cola
+        trabajo = obtener_cola().obtener(diario.id)
+        if trabajo and not trabajo.terminado:
+            seguir_trabajo(diario.id)
+        elif trabajo:
+            mostrar_resultado(trabajo, mostrar_detalles_obra)
+
+        documento = st.session_state.get("documento")
+        if documento:
+            mostrar_descargas(documento, "Adapted_Philosophical_Work", st.session_state.get("metricas"))
+        if st.session_state.get("metricas"):
+            mostrar_metricas(st.session_state["metricas"])
@@ -0,0 +1,165 @@
+import re
+from html import unescape
+
+# Conversión del texto devuelto por el modelo en párrafos con runs (texto, negrita, cursiva)
+# Entiende tanto Markdown (**negrita**, *cursiva*, _cursiva_, # encabezados, listas con - o 1.)
+# como HTML sencillo (<b>, <strong>, <i>, <em>, <h1>-<h6>, <p>, <br>, <ul>/<ol>/<li>), mezclados si hace falta.
+# Recorre el texto una sola vez con una expresión regular, sin construir un árbol DOM por párrafo.
+
+# Marcas en línea: etiquetas HTML y marcas de negrita (** o __) o cursiva (* o _)
+# Todas empiezan por un carácter fijo para que la búsqueda salte rápido el texto normal;
+# los límites de palabra de * y _ se comprueban después en _es_marca.
+PATRON_EN_LINEA = re.compile(r'<(/?)([a-zA-Z][a-zA-Z0-9]*)\b[^<>]*?>|\*\*|__|[*_]')
+# Marcas al principio de línea en Markdown
+PATRON_ENCABEZADO_MD = re.compile(r'(#{1,6})\s+(.*?)\s*#*\s*$')
+PATRON_LISTA_MD = re.compile(r'(?:[-*+]|(\d+)[.)])\s+(.*)$')
+
+ESTILO_VINETA = "ListBullet"
+ESTILO_NUMERADA = "ListNumber"
+VINETA = "• "
+ETIQUETAS_NEGRITA = ("b", "strong")
+ETIQUETAS_CURSIVA = ("i", "em")
+ETIQUETAS_BLOQUE = ("p", "div", "blockquote")
+
+
+# Un * o _ solo es marca si está pegado a una palabra por algún lado (no en "5 * 3");
+# un _ o __ además no puede estar dentro de una palabra (snake_case)
+def _es_marca(contenido, inicio, fin):
+    anterior = contenido[inicio - 1] if inicio > 0 else " "
+    siguiente = contenido[fin] if fin < len(contenido) else " "
+    if contenido[inicio] == "*":
+        return contenido[inicio:fin] == "**" or not anterior.isspace() or not siguiente.isspace()
+    return (not anterior.isalnum() and not siguiente.isspace()) or (not anterior.isspace() and not siguiente.isalnum())
+
+
+class _Convertidor:
+    def __init__(self, preguntas_en_cursiva):
+        self.preguntas_en_cursiva = preguntas_en_cursiva
+        self.parrafos = []
+        self.runs = []
+        self.estilo = None
+        self.negrita = 0  # Contadores para admitir etiquetas anidadas
+        self.cursiva = 0
+        self.negrita_md = False
+        self.cursiva_md = False
+        self.cursiva_linea = False
+        self.listas = []  # Pila de listas HTML abiertas: [ordenada, contador]
+
+    def texto(self, texto):
+        if not texto:
+            return
+        texto = unescape(texto)
+        negrita = bool(self.negrita) or self.negrita_md
+        cursiva = bool(self.cursiva) or self.cursiva_md or self.cursiva_linea
+        if self.runs and self.runs[-1][1] == negrita and self.runs[-1][2] == cursiva:
+            # Texto seguido con el mismo formato: se une al run anterior
+            self.runs[-1] = (self.runs[-1][0] + texto, negrita, cursiva)
+        else:
+            self.runs.append((texto, negrita, cursiva))
+
+    def cerrar_parrafo(self):
+        if any(texto.strip() for texto, _, _ in self.runs):
+            # Sin saltos de línea sueltos al principio o al final del párrafo
+            texto, negrita, cursiva = self.runs[0]
+            self.runs[0] = (texto.lstrip("\n"), negrita, cursiva)
+            texto, negrita, cursiva = self.runs[-1]
+            self.runs[-1] = (texto.rstrip("\n"), negrita, cursiva)
+            self.parrafos.append((self.estilo, [run for run in self.runs if run[0]]))
+        self.runs = []
+        self.estilo = None
+        self.negrita_md = False
+        self.cursiva_md = False
+
+    def etiqueta(self, nombre, cierre):
+        nombre = nombre.lower()
+        paso = -1 if cierre else 1
+        if nombre in ETIQUETAS_NEGRITA:
+            self.negrita = max(0, self.negrita + paso)
+        elif nombre in ETIQUETAS_CURSIVA:
+            self.cursiva = max(0, self.cursiva + paso)
+        elif len(nombre) == 2 and nombre[0] == "h" and nombre[1] in "123456":
+            self.cerrar_parrafo()
+            if not cierre:
+                self.estilo = f"Heading{nombre[1]}"
+        elif nombre in ETIQUETAS_BLOQUE:
+            self.cerrar_parrafo()
+        elif nombre == "br":
+            self.texto("\n")
+        elif nombre in ("ul", "ol"):
+            self.cerrar_parrafo()
+            if cierre:
+                if self.listas:
+                    self.listas.pop()
+            else:
+                self.listas.append([nombre == "ol", 0])
+        elif nombre == "li":
+            self.cerrar_parrafo()
+            if not cierre:
+                ordenada, contador = self.listas[-1] if self.listas else (False, 0)
+                if ordenada:
+                    self.listas[-1][1] = contador + 1
+                    self.estilo = ESTILO_NUMERADA
+                    self.texto(f"{contador + 1}. ")
+                else:
+                    self.estilo = ESTILO_VINETA
+                    self.texto(VINETA)
+        # El resto de etiquetas (span, a, ...) se ignoran y se conserva su texto
+
+    def linea(self, linea):
+        contenido = linea.strip()
+        if not contenido:
+            self.cerrar_parrafo()
+            return
+
+        bloque = False
+        encabezado = PATRON_ENCABEZADO_MD.match(contenido)
+        lista = PATRON_LISTA_MD.match(contenido) if not encabezado else None
+        if encabezado:
+            self.cerrar_parrafo()
+            self.estilo = f"Heading{len(encabezado.group(1))}"
+            contenido = encabezado.group(2)
+            bloque = True
+        elif lista:
+            self.cerrar_parrafo()
+            if lista.group(1):
+                self.estilo = ESTILO_NUMERADA
+                self.texto(f"{lista.group(1)}. ")
+            else:
+                self.estilo = ESTILO_VINETA
+                self.texto(VINETA)
+            contenido = lista.group(2)
+            bloque = True
+        elif self.runs:
+            self.texto("\n")
+
+        # Pregunta reflexiva en itálica (regla de la adaptación para estudiantes)
+        self.cursiva_linea = self.preguntas_en_cursiva and contenido.endswith("?")
+        posicion = 0
+        for marca in PATRON_EN_LINEA.finditer(contenido):
+            inicio, fin = marca.span()
+            nombre = marca.group(2)
+            if not nombre and not _es_marca(contenido, inicio, fin):
+                continue
+            self.texto(contenido[posicion:inicio])
+            posicion = fin
+            if nombre:
+                self.etiqueta(nombre, marca.group(1))
+            elif fin - inicio == 2:
+                self.negrita_md = not self.negrita_md
+            else:
+                self.cursiva_md = not self.cursiva_md
+        self.texto(contenido[posicion:])
+        self.cursiva_linea = False
+        if bloque:
+            self.cerrar_parrafo()
+
+
+# Función para convertir un texto con formato en una lista de párrafos (estilo, runs)
+# estilo es None, "Heading1".."Heading6", "ListBullet" o "ListNumber"; runs es [(texto, negrita, cursiva)]
+# Las líneas en blanco separan párrafos y los saltos de línea simples se mantienen dentro del párrafo.
+def texto_a_parrafos(texto, preguntas_en_cursiva=False):
+    convertidor = _Convertidor(preguntas_en_cursiva)
+    for linea in texto.split("\n"):
+        convertidor.linea(linea)
+    convertidor.cerrar_parrafo()
+    return convertidor.parrafos
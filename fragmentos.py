@@ -0,0 +1,127 @@
+import re
+
+# División de textos largos en fragmentos que caben en la ventana de contexto del modelo
+# El recuento de tokens es una estimación (unos 4 caracteres por token en español/inglés),
+# suficiente para dejar margen sin depender de un tokenizador.
+
+CARACTERES_POR_TOKEN = 4
+PRESUPUESTO_TOKENS = 3000  # Tokens de contenido original por solicitud
+UMBRAL_LOTE = 800  # Tokens máximos de una sección para agruparla con otras en una solicitud
+SEPARADOR_FRAGMENTO = "[Fragmento {indice}/{total}]"
+
+
+# Función para estimar el número de tokens de un texto
+def estimar_tokens(texto):
+    return (len(texto) + CARACTERES_POR_TOKEN - 1) // CARACTERES_POR_TOKEN
+
+
+# Función para separar un texto en párrafos (líneas en blanco); si no hay, se usan las líneas
+def _parrafos(texto):
+    parrafos = [p.strip() for p in re.split(r'\n\s*\n', texto) if p.strip()]
+    if len(parrafos) <= 1:
+        parrafos = [p.strip() for p in texto.split('\n') if p.strip()]
+    return parrafos
+
+
+# Un párrafo que por sí solo supera el presupuesto se corta por palabras
+def _partir_parrafo(parrafo, presupuesto):
+    limite = presupuesto * CARACTERES_POR_TOKEN
+    trozos = []
+    actual = []
+    longitud = 0
+    for palabra in parrafo.split():
+        if actual and longitud + len(palabra) + 1 > limite:
+            trozos.append(" ".join(actual))
+            actual = []
+            longitud = 0
+        actual.append(palabra)
+        longitud += len(palabra) + 1
+    if actual:
+        trozos.append(" ".join(actual))
+    return trozos
+
+
+# Función para dividir un texto en fragmentos de como mucho presupuesto tokens, respetando los párrafos
+# Devuelve [(contexto, fragmento)]. Con solapamiento > 0 el contexto son los últimos párrafos del fragmento
+# anterior, que cuentan para el presupuesto pero solo se envían como contexto: no se adaptan otra vez.
+def dividir_en_fragmentos(texto, presupuesto=PRESUPUESTO_TOKENS, solapamiento=0):
+    if estimar_tokens(texto) <= presupuesto:
+        return [("", texto)]
+
+    parrafos = []
+    for parrafo in _parrafos(texto):
+        if estimar_tokens(parrafo) > presupuesto:
+            parrafos.extend(_partir_parrafo(parrafo, presupuesto))
+        else:
+            parrafos.append(parrafo)
+
+    fragmentos = []
+    actual = []
+    en_contexto = 0  # Párrafos del principio de actual que son contexto
+    tokens_actual = 0
+    for parrafo in parrafos:
+        tokens_parrafo = estimar_tokens(parrafo) + 1
+        if len(actual) > en_contexto and tokens_actual + tokens_parrafo > presupuesto:
+            fragmentos.append(("\n\n".join(actual[:en_contexto]), "\n\n".join(actual[en_contexto:])))
+            # Conservar los últimos párrafos como contexto mientras quepan junto al siguiente
+            actual = actual[-solapamiento:] if solapamiento else []
+            tokens_actual = sum(estimar_tokens(p) + 1 for p in actual)
+            while actual and tokens_actual + tokens_parrafo > presupuesto:
+                tokens_actual -= estimar_tokens(actual.pop(0)) + 1
+            en_contexto = len(actual)
+        actual.append(parrafo)
+        tokens_actual += tokens_parrafo
+    if len(actual) > en_contexto:
+        fragmentos.append(("\n\n".join(actual[:en_contexto]), "\n\n".join(actual[en_contexto:])))
+    return fragmentos
+
+
+# Función para dividir las secciones seleccionadas en unidades de trabajo
+# Devuelve {(titulo, indice): (titulo_fragmento, texto)} en orden, con un solo fragmento para las secciones cortas
+# Si se pasa el diccionario contextos, se rellena con {(titulo, indice): contexto} de los fragmentos que lo tienen
+def dividir_secciones(seleccionados, presupuesto=PRESUPUESTO_TOKENS, solapamiento=0, contextos=None):
+    unidades = {}
+    for titulo, contenido in seleccionados.items():
+        fragmentos = dividir_en_fragmentos(contenido, presupuesto, solapamiento) if contenido else [("", contenido)]
+        for indice, (contexto, fragmento) in enumerate(fragmentos, start=1):
+            titulo_fragmento = titulo
+            if len(fragmentos) > 1:
+                titulo_fragmento = f"{titulo} {SEPARADOR_FRAGMENTO.format(indice=indice, total=len(fragmentos))}"
+            unidades[(titulo, indice)] = (titulo_fragmento, fragmento)
+            if contexto and contextos is not None:
+                contextos[(titulo, indice)] = contexto
+    return unidades
+
+
+# Función para agrupar las unidades cortas (hasta umbral tokens) en lotes que se piden en una sola solicitud
+# Cada lote suma como mucho presupuesto tokens y max_por_lote unidades; las unidades largas van solas.
+# unidades es {clave: (titulo, texto)}; devuelve una lista de listas de claves
+def agrupar_en_lotes(unidades, umbral, presupuesto=PRESUPUESTO_TOKENS, max_por_lote=8):
+    lotes = []
+    actual = []
+    tokens_actual = 0
+    for clave, (_, texto) in unidades.items():
+        tokens = estimar_tokens(texto)
+        if tokens > umbral:
+            lotes.append([clave])
+            continue
+        if actual and (tokens_actual + tokens > presupuesto or len(actual) >= max_por_lote):
+            lotes.append(actual)
+            actual = []
+            tokens_actual = 0
+        actual.append(clave)
+        tokens_actual += tokens
+    if actual:
+        lotes.append(actual)
+    return lotes
+
+
+# Función para volver a unir las adaptaciones de los fragmentos bajo el título original
+def unir_fragmentos(adaptaciones):
+    documentos = {}
+    for (titulo, _), adaptacion in adaptaciones.items():
+        if titulo in documentos:
+            documentos[titulo] += "\n\n" + adaptacion
+        else:
+            documentos[titulo] = adaptacion
+    return documentos
@@ -0,0 +1,165 @@
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+# Métricas de una ejecución: tiempo de cada etapa (extracción del PDF, adaptación, exportación...),
+# latencia y tokens de cada solicitud a la API y coste estimado.
+# Se pueden mostrar al final de la ejecución y exportar en JSON o en el formato de texto de Prometheus.
+
+# Precios orientativos en USD por millón de tokens (entrada, salida)
+# Se pueden cambiar o ampliar con la sección [precios] de los secrets, por ejemplo: gpt-4 = [30, 60]
+PRECIOS = {
+    "gpt-4": (30.0, 60.0),
+    "gpt-4o": (2.5, 10.0),
+    "gpt-4o-mini": (0.15, 0.6),
+    "grok-beta": (5.0, 15.0),
+}
+PERCENTILES = (50, 90, 99)
+PREFIJO_PROMETHEUS = "estoicos"
+
+
+# Percentil por el método del rango más cercano; None si no hay valores
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _distribucion(valores):
+    distribucion = {f"p{p}": percentil(valores, p) for p in PERCENTILES}
+    distribucion["max"] = max(valores) if valores else None
+    return distribucion
+
+
+# Escapa el valor de una etiqueta de Prometheus
+def _etiqueta(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Metricas:
+    def __init__(self, precios=None):
+        self.precios = dict(PRECIOS)
+        for modelo, (entrada, salida) in (precios or {}).items():
+            self.precios[modelo] = (float(entrada), float(salida))
+        self.etapas = {}  # {nombre: [segundos de cada vez]}
+        self.solicitudes = []
+        self.fallos = {}  # {modelo: solicitudes fallidas}
+        self._candado = threading.Lock()
+
+    def registrar_etapa(self, nombre, segundos):
+        with self._candado:
+            self.etapas.setdefault(nombre, []).append(segundos)
+
+    # Mide el tiempo de un bloque: with metricas.etapa("adaptacion"): ...
+    @contextmanager
+    def etapa(self, nombre):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.registrar_etapa(nombre, time.perf_counter() - inicio)
+
+    # estimado indica que los tokens se han estimado porque la API no devolvió el campo usage
+    def registrar_solicitud(self, modelo, segundos, ttft=None, tokens_entrada=0, tokens_salida=0, estimado=False):
+        with self._candado:
+            self.solicitudes.append({
+                "modelo": modelo,
+                "segundos": segundos,
+                "ttft": ttft,
+                "tokens_entrada": tokens_entrada,
+                "tokens_salida": tokens_salida,
+                "estimado": estimado,
+            })
+
+    def registrar_fallo(self, modelo):
+        with self._candado:
+            self.fallos[modelo] = self.fallos.get(modelo, 0) + 1
+
+    def coste(self, modelo, tokens_entrada, tokens_salida):
+        entrada, salida = self.precios.get(modelo, (0.0, 0.0))
+        return (tokens_entrada * entrada + tokens_salida * salida) / 1_000_000
+
+    def resumen(self):
+        with self._candado:
+            etapas = {nombre: list(tiempos) for nombre, tiempos in self.etapas.items()}
+            solicitudes = list(self.solicitudes)
+            fallos = dict(self.fallos)
+
+        modelos = {}
+        for modelo in [s["modelo"] for s in solicitudes] + list(fallos):
+            modelos.setdefault(modelo, {
+                "solicitudes": 0, "fallidas": fallos.get(modelo, 0), "tokens_entrada": 0, "tokens_salida": 0,
+                "coste_estimado_usd": 0.0, "precio_conocido": modelo in self.precios,
+            })
+        for solicitud in solicitudes:
+            datos = modelos[solicitud["modelo"]]
+            datos["solicitudes"] += 1
+            datos["tokens_entrada"] += solicitud["tokens_entrada"]
+            datos["tokens_salida"] += solicitud["tokens_salida"]
+            datos["coste_estimado_usd"] += self.coste(solicitud["modelo"], solicitud["tokens_entrada"], solicitud["tokens_salida"])
+
+        return {
+            "etapas": {
+                nombre: {"veces": len(tiempos), "segundos_total": sum(tiempos), "segundos_media": sum(tiempos) / len(tiempos)}
+                for nombre, tiempos in etapas.items()
+            },
+            "solicitudes": {
+                "total": len(solicitudes),
+                "fallidas": sum(fallos.values()),
+                "latencia_segundos": _distribucion([s["segundos"] for s in solicitudes if s["segundos"] is not None]),
+                "ttft_segundos": _distribucion([s["ttft"] for s in solicitudes if s["ttft"] is not None]),
+                "tokens_entrada": sum(s["tokens_entrada"] for s in solicitudes),
+                "tokens_salida": sum(s["tokens_salida"] for s in solicitudes),
+                "con_tokens_estimados": sum(1 for s in solicitudes if s["estimado"]),
+                "coste_estimado_usd": sum(datos["coste_estimado_usd"] for datos in modelos.values()),
+            },
+            "modelos": modelos,
+        }
+
+    def a_json(self):
+        return json.dumps(self.resumen(), ensure_ascii=False, indent=2)
+
+    # Formato de exposición de texto de Prometheus (para el textfile collector de node_exporter o un pushgateway)
+    def a_prometheus(self, prefijo=PREFIJO_PROMETHEUS):
+        resumen = self.resumen()
+        lineas = []
+
+        def metrica(nombre, tipo, ayuda, muestras):
+            lineas.append(f"# HELP {prefijo}_{nombre} {ayuda}")
+            lineas.append(f"# TYPE {prefijo}_{nombre} {tipo}")
+            for sufijo, etiquetas, valor in muestras:
+                texto_etiquetas = ",".join(f'{clave}="{_etiqueta(v)}"' for clave, v in etiquetas.items())
+                lineas.append(f"{prefijo}_{nombre}{sufijo}{{{texto_etiquetas}}} {valor}" if texto_etiquetas
+                              else f"{prefijo}_{nombre}{sufijo} {valor}")
+
+        etapas = resumen["etapas"]
+        metrica("etapa_segundos_total", "counter", "Tiempo total de cada etapa en segundos",
+                [("", {"etapa": nombre}, datos["segundos_total"]) for nombre, datos in etapas.items()])
+        metrica("etapa_veces_total", "counter", "Veces que se ha ejecutado cada etapa",
+                [("", {"etapa": nombre}, datos["veces"]) for nombre, datos in etapas.items()])
+
+        with self._candado:
+            latencias = [s["segundos"] for s in self.solicitudes if s["segundos"] is not None]
+            ttfts = [s["ttft"] for s in self.solicitudes if s["ttft"] is not None]
+        for nombre, ayuda, valores in (
+            ("solicitud_segundos", "Latencia de las solicitudes a la API en segundos", latencias),
+            ("primer_token_segundos", "Tiempo hasta el primer token en segundos", ttfts),
+        ):
+            muestras = [("", {"quantile": p / 100}, percentil(valores, p)) for p in PERCENTILES if valores]
+            muestras += [("_sum", {}, sum(valores)), ("_count", {}, len(valores))]
+            metrica(nombre, "summary", ayuda, muestras)
+
+        modelos = resumen["modelos"]
+        metrica("solicitudes_total", "counter", "Solicitudes completadas por modelo",
+                [("", {"modelo": modelo}, datos["solicitudes"]) for modelo, datos in modelos.items()])
+        metrica("solicitudes_fallidas_total", "counter", "Solicitudes fallidas por modelo",
+                [("", {"modelo": modelo}, datos["fallidas"]) for modelo, datos in modelos.items()])
+        metrica("tokens_total", "counter", "Tokens de entrada y salida por modelo",
+                [("", {"modelo": modelo, "tipo": tipo}, datos[f"tokens_{tipo}"])
+                 for modelo, datos in modelos.items() for tipo in ("entrada", "salida")])
+        metrica("coste_estimado_usd_total", "counter", "Coste estimado en USD por modelo",
+                [("", {"modelo": modelo}, round(datos["coste_estimado_usd"], 6)) for modelo, datos in modelos.items()])
+        return "\n".join(lineas) + "\n"
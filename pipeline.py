@@ -0,0 +1,873 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+try:
+    import tomllib
+except ModuleNotFoundError:  # Python < 3.11
+    import tomli as tomllib
+
+from cache_llm import con_cache
+from cliente_llm import OPENAI_URL, XAI_URL, ErrorAPI, completar, con_espera_circuito, elegir_backend
+from documento import FORMATOS, Documento, exportar
+from duplicados import revisar_secciones
+from esquemas import parse_esquema, validar_esquema
+from fragmentos import PRESUPUESTO_TOKENS, agrupar_en_lotes, dividir_secciones, estimar_tokens, unir_fragmentos
+from revisiones import huellas_secciones
+from trabajos import id_trabajo
+
+# Lógica compartida por las aplicaciones de Streamlit y la línea de comandos (cli.py):
+# prompts, llamadas de adaptación y generación, y construcción de los documentos.
+# Nada de este módulo llama a Streamlit; los errores se lanzan como excepciones y el progreso
+# se comunica mediante funciones de retorno (al_recibir, al_completar...).
+
+RUTA_SECRETS = os.path.join(".streamlit", "secrets.toml")
+DIRECTORIO_EXPORTACIONES = os.environ.get("ESTOICOS_EXPORTACIONES", os.path.join(tempfile.gettempdir(), "estoicos"))
+
+
+# Función para leer la configuración de un fichero TOML (mismo formato que los secrets de Streamlit)
+# y de las variables de entorno, que tienen prioridad
+def cargar_configuracion(ruta=None):
+    ruta = ruta or os.environ.get("ESTOICOS_CONFIG") or (RUTA_SECRETS if os.path.exists(RUTA_SECRETS) else None)
+    secretos = {}
+    if ruta:
+        with open(ruta, "rb") as f:
+            secretos = tomllib.load(f)
+    api = secretos.get("api", {})
+    xai_key = os.environ.get("XAI_API_KEY") or secretos.get("XAI_API_KEY") or api.get("key")
+    xai_url = os.environ.get("XAI_API_URL") or secretos.get("XAI_API_URL") or XAI_URL
+    return {
+        "obra": {
+            "key": os.environ.get("OPENAI_API_KEY") or api.get("key"),
+            "url": os.environ.get("OPENAI_API_URL") or api.get("url", OPENAI_URL),
+        },
+        "cartas": {"key": xai_key, "url": xai_url},
+        "libro": {"key": xai_key, "url": xai_url},
+        "limites": secretos.get("limites", {}),
+        "backends": secretos.get("backends", {}),
+        "enrutado": secretos.get("enrutado", {}),
+        "precios": secretos.get("precios", {}),
+    }
+
+
+# Función para envolver al_recibir y anotar en tiempos el tiempo hasta el primer fragmento
+def medir_primer_token(al_recibir=None, tiempos=None, clave=None):
+    inicio = time.perf_counter()
+    recibido = []
+
+    def envoltura(fragmento):
+        if not recibido:
+            recibido.append(True)
+            if tiempos is not None:
+                segundos = time.perf_counter() - inicio
+                if isinstance(tiempos, dict):
+                    tiempos[clave] = segundos
+                else:
+                    tiempos.append(segundos)
+        if al_recibir:
+            al_recibir(fragmento)
+
+    return envoltura
+
+
+# Función para reservar un fichero temporal donde escribir un documento exportado
+def ruta_exportacion(sufijo):
+    os.makedirs(DIRECTORIO_EXPORTACIONES, exist_ok=True)
+    descriptor, ruta = tempfile.mkstemp(suffix=sufijo, dir=DIRECTORIO_EXPORTACIONES)
+    os.close(descriptor)
+    return ruta
+
+
+# Función para generar un formato del documento en disco y devolver su contenido (para un botón de descarga)
+# Con metricas el tiempo se registra en la etapa exportacion_<formato>
+def exportar_a_bytes(documento, formato, metricas=None):
+    ruta = ruta_exportacion(FORMATOS[formato]["extension"])
+    try:
+        if metricas:
+            with metricas.etapa(f"exportacion_{formato}"):
+                exportar(documento, formato, ruta)
+        else:
+            exportar(documento, formato, ruta)
+        with open(ruta, "rb") as f:
+            return f.read()
+    finally:
+        os.remove(ruta)
+
+
+# ---------------------------------------------------------------------------
+# Obras filosóficas en PDF (filos.py)
+# ---------------------------------------------------------------------------
+
+OBRA_MODELO = "gpt-4"
+OBRA_TEMPERATURA = 0.7
+OBRA_TITULO = "Adapted Philosophical Work"
+OBRA_PROMPT_SISTEMA = "Eres un asistente que adapta textos filosóficos para estudiantes de 16 años aplicando estrategias de simplificación, relevancia y engagement."
+
+
+# Estrategias de adaptación, compartidas por el prompt de una sección y el de un lote
+OBRA_ESTRATEGIAS = """    **Simplificación del Lenguaje**
+    - Reemplaza términos filosóficos complejos con lenguaje cotidiano.
+    - Usa oraciones más cortas.
+    - Explica conceptos abstractos con analogías relacionadas con la vida diaria de un adolescente.
+    - Elimina jerga académica.
+
+    **Relevancia para Adolescentes**
+    - Conecta las ideas filosóficas con la exploración de la identidad personal, relaciones sociales, desafíos escolares y de la vida, tecnología y experiencias modernas, crecimiento personal e inteligencia emocional.
+
+    **Técnicas de Engagement**
+    - Incluye un tono conversacional.
+    - Usa ejemplos del mundo real.
+    - Añade preguntas reflexivas.
+    - Desglosa ideas complejas en partes fáciles de entender.
+    - Resalta aplicaciones prácticas para la vida diaria."""
+
+
+# Con contexto (el final del fragmento anterior, con solapamiento) se incluye solo para dar continuidad
+def prompt_obra(contenido_original, titulo, contexto=""):
+    bloque_contexto = f"""
+    **Contexto (final del fragmento anterior, ya adaptado aparte; no lo adaptes ni lo repitas):**
+    {contexto}
+""" if contexto else ""
+    return f"""
+    Adapta el siguiente contenido filosófico para estudiantes de 16 años. Aplica las siguientes estrategias:
+
+{OBRA_ESTRATEGIAS}
+
+    **Título:**
+    {titulo}
+{bloque_contexto}
+    **Contenido Original:**
+    {contenido_original}
+
+    **Adaptación:**
+    """
+
+
+# Lotes: varias secciones cortas en una sola solicitud, con las estrategias una sola vez
+# Cada sección va precedida de su marca y la respuesta debe separar las adaptaciones con MARCA_ADAPTACION
+MARCA_SECCION = "=== SECCIÓN {indice} ==="
+MARCA_ADAPTACION = "=== ADAPTACIÓN {indice} ==="
+# Se admiten las marcas dentro de encabezados o negritas y sin tilde
+PATRON_MARCA_ADAPTACION = re.compile(r'^[ \t#*]*={2,}\s*ADAPTACI[ÓO]N\s+(\d+)\s*={2,}[ \t*]*$', re.MULTILINE | re.IGNORECASE)
+
+
+class ErrorLote(ValueError):
+    pass
+
+
+def prompt_obra_lote(elementos):
+    secciones = "\n\n".join(
+        f"    {MARCA_SECCION.format(indice=indice)}\n    **Título:** {titulo}\n\n    {contenido}"
+        for indice, (titulo, contenido) in enumerate(elementos, start=1)
+    )
+    return f"""
+    Adapta cada una de las {len(elementos)} secciones siguientes, por separado, para estudiantes de 16 años. Aplica a cada una las siguientes estrategias:
+
+{OBRA_ESTRATEGIAS}
+
+    **Formato de la respuesta:**
+    - Empieza la adaptación de cada sección con una línea que contenga solo su marca, en el mismo orden: {MARCA_ADAPTACION.format(indice=1)}, {MARCA_ADAPTACION.format(indice=2)}...
+    - No repitas el título ni añadas texto fuera de las adaptaciones.
+
+{secciones}
+
+    **Adaptaciones:**
+    """
+
+
+# Función para separar la respuesta de un lote en una adaptación por sección
+# Lanza ErrorLote si faltan marcas, están desordenadas o alguna adaptación está vacía
+def separar_lote(respuesta, num_secciones):
+    marcas = list(PATRON_MARCA_ADAPTACION.finditer(respuesta))
+    if [int(marca.group(1)) for marca in marcas] != list(range(1, num_secciones + 1)):
+        raise ErrorLote(f"Se esperaban {num_secciones} adaptaciones y se encontraron {len(marcas)} marcas")
+    adaptaciones = []
+    for marca, siguiente in zip(marcas, marcas[1:] + [None]):
+        adaptacion = respuesta[marca.end():siguiente.start() if siguiente else len(respuesta)].strip()
+        if not adaptacion:
+            raise ErrorLote(f"La adaptación {marca.group(1)} del lote está vacía")
+        adaptaciones.append(adaptacion)
+    return adaptaciones
+
+
+# Función para adaptar el contenido usando la API
+# Con al_recibir(fragmento) se reciben los tokens a medida que llegan (streaming)
+# Con un enrutador (cliente_llm.Enrutador) el backend y el modelo se eligen según el tamaño del contenido
+def adaptar_contenido(contenido_original, titulo, api_key, url=OPENAI_URL, cache=None, omitir_cache=False, al_recibir=None,
+                      cliente=None, enrutador=None, metricas=None, contexto=""):
+    prompt = prompt_obra(contenido_original, titulo, contexto)
+    backend, modelo = elegir_backend(enrutador, estimar_tokens(contenido_original), OBRA_MODELO, url, api_key, cliente)
+    payload = {
+        "messages": [
+            {"role": "system", "content": OBRA_PROMPT_SISTEMA},
+            {"role": "user", "content": prompt}
+        ],
+        "model": modelo,
+        "temperature": OBRA_TEMPERATURA
+    }
+
+    def llamar_api():
+        return completar(backend, payload, al_recibir, metricas).texto
+
+    return con_cache(cache, backend.modelo_cache(modelo), OBRA_TEMPERATURA, OBRA_PROMPT_SISTEMA, prompt, llamar_api,
+                     omitir=omitir_cache)
+
+
+# Función para adaptar varias secciones cortas [(titulo, contenido)] en una sola solicitud
+# Devuelve las adaptaciones en el mismo orden; lanza ErrorLote si la respuesta no se puede separar
+# (en ese caso no se guarda en la caché)
+def adaptar_lote(elementos, api_key, url=OPENAI_URL, cache=None, omitir_cache=False, al_recibir=None, cliente=None,
+                 enrutador=None, metricas=None):
+    prompt = prompt_obra_lote(elementos)
+    tokens = sum(estimar_tokens(contenido) for _, contenido in elementos)
+    backend, modelo = elegir_backend(enrutador, tokens, OBRA_MODELO, url, api_key, cliente)
+    payload = {
+        "messages": [
+            {"role": "system", "content": OBRA_PROMPT_SISTEMA},
+            {"role": "user", "content": prompt}
+        ],
+        "model": modelo,
+        "temperature": OBRA_TEMPERATURA
+    }
+
+    def llamar_api():
+        texto = completar(backend, payload, al_recibir, metricas).texto
+        separar_lote(texto, len(elementos))
+        return texto
+
+    texto = con_cache(cache, backend.modelo_cache(modelo), OBRA_TEMPERATURA, OBRA_PROMPT_SISTEMA, prompt, llamar_api,
+                      omitir=omitir_cache)
+    return separar_lote(texto, len(elementos))
+
+
+# Tokens estimados del prompt (sistema y usuario) de una solicitud
+def tokens_prompt(prompt):
+    return estimar_tokens(OBRA_PROMPT_SISTEMA) + estimar_tokens(prompt)
+
+
+# Parámetros de los que depende la adaptación de una sección; solo se reutiliza entre ediciones si no cambian
+def parametros_obra(presupuesto_tokens=PRESUPUESTO_TOKENS, solapamiento=0):
+    return id_trabajo(OBRA_MODELO, OBRA_TEMPERATURA, OBRA_PROMPT_SISTEMA, OBRA_ESTRATEGIAS, presupuesto_tokens, solapamiento)
+
+
+# Función para adaptar varias secciones a la vez con un número limitado de solicitudes simultáneas
+# Las secciones que superan presupuesto_tokens se dividen en fragmentos por párrafos, que se adaptan
+# en paralelo y se vuelven a unir bajo el título original. Con solapamiento, los párrafos repetidos del
+# fragmento anterior se envían solo como contexto y nunca en un lote, así que no aparecen dos veces.
+# Devuelve los resultados en el orden original y, desde el hilo que la llama, llama a
+# al_completar(titulo, adaptacion, error, hechos, total) al terminar cada fragmento y a al_progresar({titulo: texto_parcial})
+# periódicamente con el texto recibido hasta el momento de los fragmentos en curso.
+# Si se pasa el diccionario tiempos_primer_token, se rellena con los segundos hasta el primer token de cada fragmento.
+# Con un diario (trabajos.DiarioTrabajo) cada fragmento terminado se guarda en disco y los ya completados
+# en una ejecución anterior se toman del diario en lugar de volver a pedirse. Cada entrada lleva la huella
+# del texto del fragmento y de los parámetros (parametros_obra): las que no coinciden se vuelven a pedir.
+# al_terminar_seccion(titulo, adaptacion) recibe cada sección completa en el orden original, en cuanto
+# ella y todas las anteriores han terminado, para ir escribiendo el documento sin esperar al final.
+# Con umbral_lote > 0 los fragmentos de hasta umbral_lote tokens se agrupan (hasta max_por_lote y presupuesto_tokens)
+# en una sola solicitud; si la respuesta de un lote no se puede separar, sus fragmentos se piden uno a uno.
+# estadisticas_lotes se rellena con las solicitudes y los tokens de prompt estimados con y sin lotes.
+# Con un registro de revisiones (revisiones.RegistroRevisiones) cada sección adaptada sin errores se guarda
+# por la huella de su texto; con solo_cambios, las secciones cuya huella ya tiene adaptación se toman
+# del registro sin pedirse, como al subir una edición corregida de la obra (salvo con omitir_cache, que
+# vuelve a adaptarlas todas).
+# Con un ejecutor (por ejemplo el de cola.ColaTrabajos) las solicitudes se envían a él en lugar de a un
+# ThreadPoolExecutor propio de max_concurrencia hilos.
+# Si el cortacircuitos del cliente está abierto, cada solicitud espera a que vuelva a dejar pasar solicitudes
+# (cliente_llm.con_espera_circuito) en lugar de terminar con error en el acto.
+# Con deduplicar se revisan antes las secciones (duplicados.revisar_secciones): las vacías y las entradas del
+# índice no se adaptan ni se entregan, las duplicadas reciben la adaptación de su original sin pedirse y las
+# muy cortas se entregan con su texto original. estadisticas_lotes recoge entonces también las solicitudes y
+# los tokens de prompt evitados.
+def adaptar_contenidos_concurrente(seleccionados, api_key, url=OPENAI_URL, max_concurrencia=4, al_completar=None,
+                                   cache=None, omitir_cache=False, al_progresar=None, tiempos_primer_token=None,
+                                   presupuesto_tokens=PRESUPUESTO_TOKENS, solapamiento=0, cliente=None, diario=None,
+                                   al_terminar_seccion=None, umbral_lote=0, max_por_lote=8, estadisticas_lotes=None,
+                                   enrutador=None, metricas=None, revisiones=None, solo_cambios=False, ejecutor=None,
+                                   deduplicar=False):
+    revision = revisar_secciones(seleccionados) if deduplicar else {"descartadas": {}, "duplicadas": {}, "cortas": []}
+    descartadas, duplicadas = revision["descartadas"], revision["duplicadas"]
+    solicitudes_evitadas = tokens_evitados = 0
+    for titulo in list(descartadas) + list(duplicadas) + revision["cortas"]:
+        if seleccionados[titulo]:
+            evitadas = dividir_secciones({titulo: seleccionados[titulo]}, presupuesto_tokens, solapamiento)
+            solicitudes_evitadas += len(evitadas)
+            tokens_evitados += sum(tokens_prompt(prompt_obra(contenido, fragmento)) for fragmento, contenido in evitadas.values())
+    seleccionados = {titulo: contenido for titulo, contenido in seleccionados.items() if titulo not in descartadas}
+
+    huellas = huellas_secciones(seleccionados) if revisiones else {}
+    parametros = parametros_obra(presupuesto_tokens, solapamiento)
+    reutilizadas = {}
+    if revisiones and solo_cambios and not omitir_cache:
+        guardadas = revisiones.adaptaciones(huellas.values(), parametros)
+        reutilizadas = {titulo: guardadas[huella] for titulo, huella in huellas.items()
+                        if huella in guardadas and titulo not in duplicadas}
+    conservadas = {titulo: seleccionados[titulo] for titulo in revision["cortas"]}
+    # Las secciones reutilizadas y las cortas son una sola unidad con la adaptación ya hecha (las cortas, su texto
+    # original); las duplicadas no son unidades y se entregan con la adaptación de su original
+    sin_pedir = {**reutilizadas, **conservadas}
+    unidades = {}
+    contextos = {}
+    adaptaciones = {}
+    for titulo, contenido in seleccionados.items():
+        if titulo in duplicadas:
+            adaptaciones[(titulo, 1)] = None
+            continue
+        if titulo in sin_pedir:
+            nuevas = {(titulo, 1): (titulo, contenido)}
+        else:
+            nuevas = dividir_secciones({titulo: contenido}, presupuesto_tokens, solapamiento, contextos)
+        unidades.update(nuevas)
+        adaptaciones.update(dict.fromkeys(nuevas))
+    total = len(unidades)
+    hechos_total = 0
+    fragmentos_por_seccion = {titulo: 0 for titulo in seleccionados}
+    for titulo, _ in unidades:
+        fragmentos_por_seccion[titulo] += 1
+    pendientes_por_seccion = dict(fragmentos_por_seccion)
+    orden = list(seleccionados)
+    entregadas = 0
+    con_errores = set()
+    originales = set(duplicadas.values())
+    adaptadas = {}  # {original: adaptacion} de las secciones ya entregadas que tienen duplicadas
+
+    # Entrega las secciones completas en el orden original en cuanto todas las anteriores lo están
+    def entregar_secciones(clave):
+        nonlocal entregadas
+        pendientes_por_seccion[clave[0]] -= 1
+        while entregadas < len(orden) and pendientes_por_seccion[orden[entregadas]] == 0:
+            titulo = orden[entregadas]
+            if titulo in duplicadas:
+                # Su original es anterior, así que ya se entregó
+                adaptacion = adaptaciones[(titulo, 1)] = adaptadas[duplicadas[titulo]]
+                if al_terminar_seccion:
+                    al_terminar_seccion(titulo, adaptacion)
+                entregadas += 1
+                continue
+            fragmentos = {(titulo, i): adaptaciones[(titulo, i)] for i in range(1, fragmentos_por_seccion[titulo] + 1)}
+            adaptacion = unir_fragmentos(fragmentos)[titulo]
+            if titulo in originales:
+                adaptadas[titulo] = adaptacion
+            if revisiones and seleccionados[titulo] and titulo not in con_errores and titulo not in sin_pedir:
+                revisiones.guardar_adaptacion(huellas[titulo], parametros, adaptacion)
+            if al_terminar_seccion:
+                al_terminar_seccion(titulo, adaptacion)
+            entregadas += 1
+
+    # Huella de cada fragmento en el diario: si cambia el texto (otro PDF) o los parámetros, no se reutiliza
+    huellas_diario = {json.dumps(clave, ensure_ascii=False): id_trabajo(parametros, titulo, contenido, contextos.get(clave, ""))
+                      for clave, (titulo, contenido) in unidades.items()} if diario else {}
+    completados = diario.completados(huellas_diario) if diario else {}
+    parciales = {}
+    candado = threading.Lock()
+    lotes = {"lotes": 0, "secciones_en_lotes": 0, "lotes_fallidos": 0, "solicitudes": 0, "solicitudes_sin_lotes": 0,
+             "tokens_prompt": 0, "tokens_prompt_sin_lotes": 0, "secciones_reutilizadas": len(reutilizadas),
+             "secciones_descartadas": len(descartadas), "secciones_duplicadas": len(duplicadas),
+             "secciones_conservadas": len(conservadas),
+             "solicitudes_evitadas": solicitudes_evitadas, "tokens_evitados": tokens_evitados}
+
+    def contar(**incrementos):
+        with candado:
+            for campo, valor in incrementos.items():
+                lotes[campo] += valor
+
+    # Adapta una unidad o un lote de unidades; devuelve [(adaptacion, error)] en el orden de claves
+    def trabajar(claves):
+        elementos = [unidades[clave] for clave in claves]
+        etiqueta = elementos[0][0] if len(elementos) == 1 else f"Lote de {len(elementos)}: {elementos[0][0]}..."
+        with candado:
+            parciales[etiqueta] = []
+
+        def al_recibir(fragmento):
+            with candado:
+                parciales[etiqueta].append(fragmento)
+
+        def adaptar_una(titulo, contenido, al_recibir, contexto=""):
+            contar(solicitudes=1, tokens_prompt=tokens_prompt(prompt_obra(contenido, titulo, contexto)))
+            return con_espera_circuito(lambda: adaptar_contenido(
+                contenido, titulo, api_key, url, cache, omitir_cache, al_recibir, cliente, enrutador, metricas, contexto
+            ))
+
+        try:
+            al_recibir_medido = medir_primer_token(al_recibir, tiempos_primer_token, etiqueta)
+            if len(elementos) == 1:
+                return [(adaptar_una(*elementos[0], al_recibir_medido, contextos.get(claves[0], "")), None)]
+            try:
+                contar(lotes=1, secciones_en_lotes=len(elementos), solicitudes=1,
+                       tokens_prompt=tokens_prompt(prompt_obra_lote(elementos)))
+                return [(adaptacion, None) for adaptacion in con_espera_circuito(lambda: adaptar_lote(
+                    elementos, api_key, url, cache, omitir_cache, al_recibir_medido, cliente, enrutador, metricas
+                ))]
+            except ErrorLote:
+                # La respuesta no se pudo separar: se piden las secciones del lote una a una
+                contar(lotes_fallidos=1)
+                resultados = []
+                for titulo, contenido in elementos:
+                    with candado:
+                        parciales[etiqueta] = []
+                    try:
+                        resultados.append((adaptar_una(titulo, contenido, al_recibir), None))
+                    except Exception as e:
+                        resultados.append((None, e))
+                return resultados
+        finally:
+            with candado:
+                parciales.pop(etiqueta, None)
+
+    with ejecutor or ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+        por_pedir = {}
+        for clave, (titulo, contenido) in unidades.items():
+            clave_diario = json.dumps(clave, ensure_ascii=False)
+            if clave[0] in sin_pedir:
+                adaptaciones[clave] = sin_pedir[clave[0]]
+                hechos_total += 1
+                if al_completar:
+                    al_completar(titulo, adaptaciones[clave], None, hechos_total, total)
+                entregar_secciones(clave)
+            elif clave_diario in completados:
+                adaptaciones[clave] = completados[clave_diario]
+                hechos_total += 1
+                if al_completar:
+                    al_completar(titulo, adaptaciones[clave], None, hechos_total, total)
+                entregar_secciones(clave)
+            elif contenido:
+                por_pedir[clave] = (titulo, contenido)
+                contar(solicitudes_sin_lotes=1,
+                       tokens_prompt_sin_lotes=tokens_prompt(prompt_obra(contenido, titulo, contextos.get(clave, ""))))
+            else:
+                adaptaciones[clave] = "Contenido no disponible."
+                hechos_total += 1
+                if al_completar:
+                    al_completar(titulo, adaptaciones[clave], None, hechos_total, total)
+                entregar_secciones(clave)
+
+        if umbral_lote > 0:
+            # Los fragmentos con contexto van solos: el prompt de un lote no distingue el contexto del contenido
+            grupos = [[clave] for clave in por_pedir if clave in contextos] + agrupar_en_lotes(
+                {clave: unidad for clave, unidad in por_pedir.items() if clave not in contextos},
+                umbral_lote, presupuesto_tokens, max_por_lote
+            )
+        else:
+            grupos = [[clave] for clave in por_pedir]
+        futuros = {executor.submit(trabajar, claves): claves for claves in grupos}
+
+        pendientes = set(futuros)
+        while pendientes:
+            hechos, pendientes = wait(pendientes, timeout=0.25, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                claves = futuros[futuro]
+                try:
+                    resultados = futuro.result()
+                except Exception as e:
+                    resultados = [(None, e)] * len(claves)
+                for clave, (adaptacion, error) in zip(claves, resultados):
+                    adaptaciones[clave] = adaptacion or "Error en la adaptación."
+                    if not adaptacion:
+                        con_errores.add(clave[0])
+                    if diario:
+                        clave_diario = json.dumps(clave, ensure_ascii=False)
+                        diario.registrar(clave_diario, adaptaciones[clave], "ok" if adaptacion else "error",
+                                         huellas_diario[clave_diario])
+                    hechos_total += 1
+                    if al_completar:
+                        al_completar(unidades[clave][0], adaptaciones[clave], error, hechos_total, total)
+                    entregar_secciones(clave)
+            if al_progresar:
+                with candado:
+                    en_curso = {titulo: "".join(partes) for titulo, partes in parciales.items()}
+                al_progresar(en_curso)
+
+    if estadisticas_lotes is not None:
+        estadisticas_lotes.update(lotes)
+        estadisticas_lotes["tokens_ahorrados"] = lotes["tokens_prompt_sin_lotes"] - lotes["tokens_prompt"]
+    return unir_fragmentos(adaptaciones)
+
+
+# Función para añadir una sección adaptada de la obra al documento
+def agregar_seccion_obra(documento, titulo, contenido):
+    # Agregar título como encabezado de nivel 1
+    documento.agregar_encabezado(titulo, 1)
+    # Convertir el formato (Markdown o HTML) en párrafos; las preguntas reflexivas van en itálica
+    documento.agregar_texto(contenido, preguntas_en_cursiva=True)
+    documento.salto_pagina()
+
+
+# Función para crear el documento de la obra adaptada a partir de {titulo: adaptacion}
+def documento_obra(documentos):
+    documento = Documento(OBRA_TITULO)
+    for titulo, contenido in documentos.items():
+        agregar_seccion_obra(documento, titulo, contenido)
+    return documento
+
+
+# ---------------------------------------------------------------------------
+# Cartas de Séneca (seneca2.py)
+# ---------------------------------------------------------------------------
+
+CARTAS_MODELO = "grok-beta"
+CARTAS_TEMPERATURA = 0.7
+CARTAS_TITULO = "Adapted Seneca Letters"
+CARTAS_PROMPT_SISTEMA = "You are an assistant that adapts philosophical texts to modern corporate contexts using proper formatting."
+
+
+def prompt_carta(contenido_original, numero_carta):
+    return f"""
+Reimagine letter number {numero_carta} of Seneca to Lucilius, adapting it from its original philosophical content to a modern corporate environment of 2024. Use simple and contemporary language while preserving Seneca's wisdom. Ensure that examples and metaphors are relevant to current challenges faced by corporate managers, including references to modern technology, work-life balance, and common issues such as stress, leadership, and productivity.
+
+Original Content:
+{contenido_original}
+
+Adaptation (use proper formatting without Markdown symbols, e.g., use italics instead of asterisks, appropriate heading levels without hashtags):
+"""
+
+
+# Función para adaptar la carta usando la API de X
+def adaptar_carta(contenido_original, numero_carta, api_key, url=XAI_URL, cache=None, omitir_cache=False, al_recibir=None,
+                  cliente=None, enrutador=None, metricas=None):
+    prompt = prompt_carta(contenido_original, numero_carta)
+    backend, modelo = elegir_backend(enrutador, estimar_tokens(contenido_original), CARTAS_MODELO, url, api_key, cliente)
+    payload = {
+        "messages": [
+            {"role": "system", "content": CARTAS_PROMPT_SISTEMA},
+            {"role": "user", "content": prompt}
+        ],
+        "model": modelo,  # Modelo especificado
+        "temperature": CARTAS_TEMPERATURA
+    }
+
+    def llamar_api():
+        return completar(backend, payload, al_recibir, metricas).texto
+
+    return con_cache(cache, backend.modelo_cache(modelo), CARTAS_TEMPERATURA, CARTAS_PROMPT_SISTEMA, prompt, llamar_api,
+                     omitir=omitir_cache)
+
+
+# Función para adaptar varias cartas en paralelo; obtener_texto(numero) devuelve el texto original
+# Devuelve {"Letter N": adaptación} en el orden de numeros y guarda cada carta en el diario si se pasa
+# Desde el hilo que la llama se invoca al_completar(clave, adaptacion, error) a medida que termina cada carta (las
+# tomadas del diario, al principio) y al_progresar({clave: texto_parcial}) periódicamente con lo recibido de las
+# cartas en curso; al_recibir(clave, fragmento) recibe cada token desde el hilo que adapta la carta.
+# Con un ejecutor las cartas se adaptan en él en lugar de en un ThreadPoolExecutor propio
+# Con el cortacircuitos abierto cada carta espera a que vuelva a dejar pasar solicitudes, como en la obra
+def adaptar_cartas_concurrente(numeros, obtener_texto, api_key, url=XAI_URL, max_concurrencia=4, cache=None,
+                               omitir_cache=False, cliente=None, diario=None, al_completar=None, enrutador=None,
+                               metricas=None, ejecutor=None, al_recibir=None, al_progresar=None):
+    documentos = {}
+    completadas = diario.completados() if diario else {}
+    parciales = {}
+    candado = threading.Lock()
+
+    def trabajar(clave, numero):
+        contenido_original = obtener_texto(numero)
+        if not contenido_original:
+            return "Contenido no disponible.", None
+        with candado:
+            parciales[clave] = []
+
+        def al_recibir_carta(fragmento):
+            with candado:
+                parciales[clave].append(fragmento)
+            if al_recibir:
+                al_recibir(clave, fragmento)
+
+        try:
+            return con_espera_circuito(lambda: adaptar_carta(
+                contenido_original, numero, api_key, url, cache, omitir_cache, al_recibir_carta, cliente=cliente,
+                enrutador=enrutador, metricas=metricas
+            )), None
+        except Exception as e:
+            return None, e
+        finally:
+            with candado:
+                parciales.pop(clave, None)
+
+    with ejecutor or ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+        futuros = {}
+        for numero in dict.fromkeys(numeros):
+            clave = f"Letter {numero}"
+            if clave in completadas:
+                documentos[clave] = completadas[clave]
+                if al_completar:
+                    al_completar(clave, documentos[clave], None)
+            else:
+                futuros[executor.submit(trabajar, clave, numero)] = clave
+
+        pendientes = set(futuros)
+        while pendientes:
+            hechos, pendientes = wait(pendientes, timeout=0.25, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                clave = futuros[futuro]
+                adaptacion, error = futuro.result()
+                documentos[clave] = adaptacion or "Error en la adaptación."
+                if diario and adaptacion != "Contenido no disponible.":
+                    diario.registrar(clave, documentos[clave], "ok" if adaptacion else "error")
+                if al_completar:
+                    al_completar(clave, documentos[clave], error)
+            if al_progresar:
+                with candado:
+                    en_curso = {clave: "".join(partes) for clave, partes in parciales.items()}
+                al_progresar(en_curso)
+    # Solo el resultado sigue el orden de numeros
+    return {f"Letter {numero}": documentos[f"Letter {numero}"] for numero in numeros}
+
+
+# Función para añadir una carta adaptada al documento
+def agregar_carta(documento, titulo, contenido):
+    # Agregar título como encabezado de nivel 1
+    documento.agregar_encabezado(titulo, 1)
+    # Convertir el formato (HTML sencillo o Markdown) en párrafos
+    documento.agregar_texto(contenido)
+    documento.salto_pagina()
+
+
+# Función para crear el documento de las cartas adaptadas a partir de {"Letter N": adaptacion}
+def documento_cartas(documentos):
+    documento = Documento(CARTAS_TITULO, idioma="en")
+    for titulo, contenido in documentos.items():
+        agregar_carta(documento, titulo, contenido)
+    return documento
+
+
+# ---------------------------------------------------------------------------
+# Generación de libros (seneca.py)
+# ---------------------------------------------------------------------------
+
+LIBRO_MODELO = "grok-beta"
+LIBRO_TEMPERATURA = 0.7
+LIBRO_PROMPT_SISTEMA_ESQUEMA = "Eres un asistente experto en estructuración y generación de contenido para libros. Ayudas a crear esquemas detallados y desarrollas el contenido de cada sección de manera clara y coherente."
+LIBRO_PROMPT_SISTEMA_SECCION = "Eres un escritor experto que ayuda a desarrollar contenido de libros de manera clara y coherente."
+
+
+LIBRO_FORMATO_ESQUEMA = (
+    'Responde solo con un objeto JSON con este formato: '
+    '{"capitulos": [{"titulo": "Título del capítulo", "secciones": ["Título de la sección", ...]}, ...]}'
+)
+LIBRO_REINTENTOS_ESQUEMA = 1  # Nuevas peticiones del esquema si no se pudo leer ningún capítulo con secciones
+CODIGOS_SIN_SALIDA_ESTRUCTURADA = (400, 422)  # La API no admite response_format
+
+
+def prompt_esquema(titulo, num_capitulos, num_secciones, estructurado=True):
+    esquema_prompt = (
+        f"Necesito que generes un esquema detallado para un libro titulado '{titulo}'. "
+        f"El libro debe tener {num_capitulos} capítulos, y cada capítulo debe estar dividido en {num_secciones} secciones. "
+        f"Proporciona los títulos de cada capítulo y las secciones correspondientes de manera clara y organizada."
+    )
+    if estructurado:
+        return f"{esquema_prompt} {LIBRO_FORMATO_ESQUEMA}"
+    return (
+        f"{esquema_prompt} Escribe cada capítulo en una línea como 'Capítulo N: Título' "
+        f"y debajo sus secciones como '- Sección N: Título', sin descripciones."
+    )
+
+
+# Función para generar el esquema del libro
+# Con estructurado se pide la salida en JSON (response_format) para no depender del formato del texto
+def generar_esquema(titulo, num_capitulos, num_secciones, api_key, url=XAI_URL, cliente=None, al_recibir=None,
+                    enrutador=None, metricas=None, estructurado=True):
+    esquema_prompt = prompt_esquema(titulo, num_capitulos, num_secciones, estructurado)
+    backend, modelo = elegir_backend(enrutador, estimar_tokens(esquema_prompt), LIBRO_MODELO, url, api_key, cliente)
+    payload = {
+        "messages": [
+            {
+                "role": "system",
+                "content": LIBRO_PROMPT_SISTEMA_ESQUEMA
+            },
+            {
+                "role": "user",
+                "content": esquema_prompt
+            }
+        ],
+        "model": modelo,
+        "temperature": LIBRO_TEMPERATURA
+    }
+    if estructurado:
+        payload["response_format"] = {"type": "json_object"}
+    return completar(backend, payload, al_recibir, metricas).texto
+
+
+# Función para obtener el esquema ya parseado y ajustado al número de capítulos y secciones pedido
+# Primero se lee la respuesta como JSON y, si no lo es, con el analizador tolerante de texto; solo si no sale
+# ningún capítulo con secciones se vuelve a pedir, esta vez en texto con un formato fijo. Si la API rechaza
+# response_format también se pide en texto. Devuelve (capitulos, esquema, avisos); capitulos vacío si no hubo forma.
+def obtener_esquema(titulo, num_capitulos, num_secciones, api_key, url=XAI_URL, cliente=None, al_recibir=None,
+                    enrutador=None, metricas=None, reintentos=LIBRO_REINTENTOS_ESQUEMA):
+    avisos = []
+    estructurado = True
+    esquema = ""
+    intentos = 0
+    while intentos <= reintentos:
+        try:
+            esquema = generar_esquema(titulo, num_capitulos, num_secciones, api_key, url, cliente, al_recibir,
+                                      enrutador, metricas, estructurado)
+        except ErrorAPI as e:
+            if not estructurado or e.codigo not in CODIGOS_SIN_SALIDA_ESTRUCTURADA:
+                raise
+            avisos.append(f"La API no admite la salida en JSON ({e.codigo}); se pide el esquema en texto.")
+            estructurado = False
+            continue
+        capitulos, avisos_esquema = validar_esquema(parse_esquema(esquema), num_capitulos, num_secciones)
+        if capitulos:
+            return capitulos, esquema, avisos + avisos_esquema
+        intentos += 1
+        if intentos <= reintentos:
+            avisos.append("No se reconocieron capítulos con secciones en el esquema; se vuelve a pedir.")
+        estructurado = False
+    return {}, esquema, avisos
+
+
+def prompt_seccion(titulo, capitulo, seccion):
+    # Extraer título de la sección
+    if ":" in seccion:
+        titulo_seccion = seccion.split(":", 1)[1].strip()
+    else:
+        titulo_seccion = seccion
+    seccion_prompt = (
+        f"Escribe una sección detallada titulada '{titulo_seccion}' para el capítulo '{capitulo}' de un libro sobre '{titulo}'. "
+        f"La sección debe tener aproximadamente 300 palabras, ser clara, coherente y proporcionar información relevante y bien estructurada sobre el tema."
+    )
+    return titulo_seccion, seccion_prompt
+
+
+# Función para generar el contenido de una sección
+def generar_seccion(seccion_prompt, api_key, url=XAI_URL, cache=None, omitir_cache=False, cliente=None, al_recibir=None,
+                    enrutador=None, metricas=None):
+    backend, modelo = elegir_backend(enrutador, estimar_tokens(seccion_prompt), LIBRO_MODELO, url, api_key, cliente)
+    payload = {
+        "messages": [
+            {
+                "role": "system",
+                "content": LIBRO_PROMPT_SISTEMA_SECCION
+            },
+            {
+                "role": "user",
+                "content": seccion_prompt
+            }
+        ],
+        "model": modelo,
+        "temperature": LIBRO_TEMPERATURA,
+        "max_tokens": 500
+    }
+
+    def llamar_api():
+        return completar(backend, payload, al_recibir, metricas).texto
+
+    return con_cache(cache, backend.modelo_cache(modelo), LIBRO_TEMPERATURA, LIBRO_PROMPT_SISTEMA_SECCION, seccion_prompt, llamar_api,
+                     omitir=omitir_cache)
+
+
+# Libro guardado por capítulos y secciones en lugar de como una única cadena
+# Las descargas se generan con documento_libro; cada capítulo se puede obtener en Markdown para previsualizarlo.
+class Libro:
+    def __init__(self, titulo):
+        self.titulo = titulo
+        self.capitulos = []  # [(capitulo, [(seccion, contenido)])]
+
+    def agregar_capitulo(self, capitulo):
+        self.capitulos.append((capitulo, []))
+
+    def agregar_seccion(self, seccion, contenido):
+        self.capitulos[-1][1].append((seccion, contenido))
+
+    def _partes_capitulo(self, capitulo, secciones):
+        yield f"## {capitulo}\n\n"
+        for seccion, contenido in secciones:
+            yield f"### {seccion}\n\n{contenido}\n\n"
+
+    # Markdown de un solo capítulo (por posición), para mostrar el libro por páginas
+    def texto_capitulo(self, indice):
+        return "".join(self._partes_capitulo(*self.capitulos[indice]))
+
+
+# Función para crear el documento exportable de un libro: un encabezado de nivel 1 por capítulo
+# y de nivel 2 por sección, con el título del libro en la primera página
+def documento_libro(libro):
+    documento = Documento(libro.titulo)
+    documento.agregar_texto(f"# {libro.titulo}")
+    documento.salto_pagina()
+    for capitulo, secciones in libro.capitulos:
+        documento.agregar_encabezado(capitulo, 1)
+        for seccion, contenido in secciones:
+            documento.agregar_encabezado(seccion, 2)
+            documento.agregar_texto(contenido)
+        documento.salto_pagina()
+    return documento
+
+
+# Función para generar el libro completo a partir del esquema ya parseado
+# Las secciones se piden en paralelo (como mucho max_concurrencia a la vez) y se devuelve un Libro en el orden del esquema.
+# Cada sección se identifica como "Capítulo > Sección". Desde el hilo que la llama se invoca
+# al_completar(seccion, contenido, error, hechos, total) al terminar cada una y al_progresar({seccion: texto_parcial})
+# periódicamente con lo recibido de las secciones en curso.
+# Si se pasa el diccionario estadisticas, se rellena con los segundos de cada sección (segundos_seccion),
+# el tiempo total de la fase de secciones (segundos_total) y el número de secciones.
+def generar_libro(titulo, capitulos, api_key, url=XAI_URL, cache=None, omitir_cache=False, cliente=None,
+                  max_concurrencia=4, al_completar=None, al_progresar=None, tiempos_primer_token=None, estadisticas=None,
+                  enrutador=None, metricas=None):
+    inicio_total = time.perf_counter()
+    unidades = {}
+    for cap_num, (capitulo, secciones) in enumerate(capitulos.items(), 1):
+        for sec_num, seccion in enumerate(secciones, 1):
+            unidades[(cap_num, sec_num)] = (f"{capitulo} > {seccion}", prompt_seccion(titulo, capitulo, seccion)[1])
+    contenidos = {}
+    segundos_seccion = {}
+    parciales = {}
+    candado = threading.Lock()
+
+    def trabajar(seccion, seccion_prompt):
+        inicio = time.perf_counter()
+        with candado:
+            parciales[seccion] = []
+
+        def al_recibir(fragmento):
+            with candado:
+                parciales[seccion].append(fragmento)
+
+        try:
+            return generar_seccion(
+                seccion_prompt, api_key, url, cache, omitir_cache, cliente,
+                medir_primer_token(al_recibir, tiempos_primer_token), enrutador, metricas
+            )
+        finally:
+            with candado:
+                parciales.pop(seccion, None)
+                segundos_seccion[seccion] = time.perf_counter() - inicio
+
+    with ThreadPoolExecutor(max_workers=max_concurrencia) as executor:
+        futuros = {
+            executor.submit(trabajar, seccion, seccion_prompt): clave
+            for clave, (seccion, seccion_prompt) in unidades.items()
+        }
+        pendientes = set(futuros)
+        while pendientes:
+            hechos, pendientes = wait(pendientes, timeout=0.25, return_when=FIRST_COMPLETED)
+            for futuro in hechos:
+                clave = futuros[futuro]
+                try:
+                    contenido = futuro.result()
+                    error = None
+                except Exception as e:
+                    contenido = None
+                    error = e
+                contenidos[clave] = contenido or "Error al generar esta sección."
+                if al_completar:
+                    al_completar(unidades[clave][0], contenidos[clave], error, len(contenidos), len(unidades))
+            if al_progresar:
+                with candado:
+                    en_curso = {seccion: "".join(partes) for seccion, partes in parciales.items()}
+                al_progresar(en_curso)
+
+    libro = Libro(titulo)
+    for cap_num, (capitulo, secciones) in enumerate(capitulos.items(), 1):
+        libro.agregar_capitulo(capitulo)
+        for sec_num, seccion in enumerate(secciones, 1):
+            libro.agregar_seccion(seccion, contenidos[(cap_num, sec_num)])
+
+    if estadisticas is not None:
+        estadisticas.update(
+            segundos_seccion=segundos_seccion,
+            segundos_total=time.perf_counter() - inicio_total,
+            secciones=len(unidades),
+        )
+    return libro
@@ -0,0 +1,117 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+# Adaptación incremental de ediciones revisadas de una obra
+# Cada sección se identifica por la huella de su texto normalizado, así que un cambio en los saltos de línea,
+# en los espacios o en la partición con guiones de la nueva extracción no la marca como modificada.
+# Las adaptaciones se guardan por huella (y por los parámetros con los que se hicieron) y cada edición
+# subida guarda las huellas de sus secciones, para comparar una edición corregida con la anterior
+# y volver a adaptar solo las secciones nuevas o modificadas.
+
+RUTA_REVISIONES = os.environ.get("ESTOICOS_REVISIONES", os.path.join(".cache", "revisiones.sqlite"))
+
+PATRON_GUION_FIN_LINEA = re.compile(r'(\w)-\s*\n\s*(\w)')
+PATRON_ESPACIOS = re.compile(r'\s+')
+
+
+# Función para normalizar el texto de una sección antes de calcular su huella
+def normalizar_texto(texto):
+    texto = unicodedata.normalize("NFC", texto or "")
+    texto = PATRON_GUION_FIN_LINEA.sub(r'\1\2', texto)
+    return PATRON_ESPACIOS.sub(" ", texto).strip()
+
+
+def huella_seccion(texto):
+    return hashlib.sha256(normalizar_texto(texto).encode("utf-8")).hexdigest()
+
+
+# Función para calcular {titulo: huella} de las secciones seleccionadas
+def huellas_secciones(secciones):
+    return {titulo: huella_seccion(texto) for titulo, texto in secciones.items()}
+
+
+# Función para comparar las huellas de dos ediciones por título de sección
+# Devuelve {"nuevas": [...], "modificadas": [...], "eliminadas": [...], "sin_cambios": [...]} con los títulos en orden
+def comparar_ediciones(anteriores, actuales):
+    cambios = {"nuevas": [], "modificadas": [], "eliminadas": [], "sin_cambios": []}
+    for titulo, huella in actuales.items():
+        if titulo not in anteriores:
+            cambios["nuevas"].append(titulo)
+        elif anteriores[titulo] != huella:
+            cambios["modificadas"].append(titulo)
+        else:
+            cambios["sin_cambios"].append(titulo)
+    cambios["eliminadas"] = [titulo for titulo in anteriores if titulo not in actuales]
+    return cambios
+
+
+class RegistroRevisiones:
+    def __init__(self, ruta=RUTA_REVISIONES):
+        directorio = os.path.dirname(ruta)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+        self._candado = threading.Lock()
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False)
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS adaptaciones ("
+            " huella TEXT NOT NULL, parametros TEXT NOT NULL, texto TEXT NOT NULL, creado REAL NOT NULL,"
+            " PRIMARY KEY (huella, parametros))"
+        )
+        self._conexion.execute(
+            "CREATE TABLE IF NOT EXISTS ediciones ("
+            " pdf_hash TEXT PRIMARY KEY, huellas TEXT NOT NULL, creado REAL NOT NULL)"
+        )
+        self._conexion.commit()
+
+    # Devuelve {huella: adaptacion} de las huellas indicadas que ya se adaptaron con los mismos parámetros
+    def adaptaciones(self, huellas, parametros):
+        huellas = list(set(huellas))
+        encontradas = {}
+        with self._candado:
+            # Por bloques para no superar el límite de variables de SQLite
+            for inicio in range(0, len(huellas), 500):
+                bloque = huellas[inicio:inicio + 500]
+                encontradas.update(self._conexion.execute(
+                    f"SELECT huella, texto FROM adaptaciones WHERE parametros = ? AND huella IN ({','.join('?' * len(bloque))})",
+                    [parametros] + bloque,
+                ).fetchall())
+        return encontradas
+
+    def guardar_adaptacion(self, huella, parametros, texto):
+        with self._candado:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO adaptaciones (huella, parametros, texto, creado) VALUES (?, ?, ?, ?)",
+                (huella, parametros, texto, time.time()),
+            )
+            self._conexion.commit()
+
+    # Guarda las huellas {titulo: huella} de una edición (identificada por el hash del PDF)
+    def guardar_edicion(self, pdf_hash, huellas):
+        with self._candado:
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO ediciones (pdf_hash, huellas, creado) VALUES (?, ?, ?)",
+                (pdf_hash, json.dumps(huellas, ensure_ascii=False), time.time()),
+            )
+            self._conexion.commit()
+
+    # Busca la edición anterior de la misma obra: la que comparte más secciones con huellas
+    # (y, a igualdad, la más reciente), sin contar la propia edición. Devuelve (pdf_hash, huellas) o None
+    def edicion_anterior(self, huellas, pdf_hash=None):
+        actuales = set(huellas.values())
+        with self._candado:
+            filas = self._conexion.execute(
+                "SELECT pdf_hash, huellas, creado FROM ediciones WHERE pdf_hash != ?", (pdf_hash or "",)
+            ).fetchall()
+        mejor = None
+        for hash_edicion, datos, creado in filas:
+            anteriores = json.loads(datos)
+            comunes = len(actuales & set(anteriores.values()))
+            if comunes and (mejor is None or (comunes, creado) > mejor[0]):
+                mejor = ((comunes, creado), hash_edicion, anteriores)
+        return (mejor[1], mejor[2]) if mejor else None
@@ -1,135 +1,132 @@
 import streamlit as st
-import requests
-import re
+import statistics
+import time
+from metricas import Metricas
+from pipeline import (
+    XAI_URL, documento_libro, generar_libro as generar_libro_desde_esquema, medir_primer_token,
+    obtener_esquema,
+)
+from ui_comun import mostrar_descargas, mostrar_metricas, obtener_cache, obtener_cliente, obtener_enrutador
 
 # Configurar la clave de API de x.ai
 XAI_API_KEY = st.secrets["XAI_API_KEY"]
 
-def parse_esquema(esquema):
-    capitulos = {}
-    cap_pattern = re.compile(r'Capítulo\s*\d+[:\.\-]?\s*(.*)', re.IGNORECASE)
-    seccion_pattern = re.compile(r'(?:-|\*)\s*Sección\s*\d+[:\.\-]?\s*(.*)', re.IGNORECASE)
-
-    cap = None
-    for linea in esquema.split('\n'):
-        cap_match = cap_pattern.match(linea)
-        if cap_match:
-            cap = cap_match.group(1).strip()
-            capitulos[cap] = []
-            continue
-        seccion_match = seccion_pattern.match(linea)
-        if seccion_match and cap:
-            seccion = seccion_match.group(1).strip()
-            capitulos[cap].append(seccion)
-    
-    return capitulos
+# URL de la API de x.ai (se puede apuntar a un servidor local con XAI_API_URL en los secrets)
+API_URL = st.secrets.get("XAI_API_URL", XAI_URL)
 
-def generar_libro(titulo, num_capitulos, num_secciones):
-    try:
-        # 1. Generar el esquema del libro
-        esquema_prompt = (
-            f"Necesito que generes un esquema detallado para un libro titulado '{titulo}'. "
-            f"El libro debe tener {num_capitulos} capítulos, y cada capítulo debe estar dividido en {num_secciones} secciones. "
-            f"Proporciona los títulos de cada capítulo y las secciones correspondientes de manera clara y organizada."
-        )
-        
-        esquema_response = requests.post(
-            "https://api.x.ai/v1/chat/completions",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {XAI_API_KEY}"
-            },
-            json={
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Eres un asistente experto en estructuración y generación de contenido para libros. Ayudas a crear esquemas detallados y desarrollas el contenido de cada sección de manera clara y coherente."
-                    },
-                    {
-                        "role": "user",
-                        "content": esquema_prompt
-                    }
-                ],
-                "model": "grok-beta",
-                "stream": False,
-                "temperature": 0.7
-            }
-        )
+# Función para mostrar en un st.empty el texto que va llegando; devuelve la función de retorno y la lista de partes
+def mostrar_en_vivo(vista):
+    partes = []
+
+    def al_recibir(fragmento):
+        partes.append(fragmento)
+        vista.markdown("".join(partes))
 
-        if esquema_response.status_code != 200:
-            st.error(f"Error al generar el esquema: {esquema_response.text}")
-            return ""
+    return al_recibir, partes
 
-        esquema = esquema_response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
-        
-        # **Agregar depuración: Mostrar el esquema generado**
+def generar_libro(titulo, num_capitulos, num_secciones, omitir_cache=False, max_concurrencia=4, metricas=None):
+    metricas = metricas if metricas is not None else Metricas()
+    try:
+        inicio = time.perf_counter()
+        # 1. Generar el esquema del libro
+        # **Agregar depuración: Mostrar el esquema generado a medida que llega**
         st.subheader("Esquema Generado")
-        st.text(esquema)
+        tiempos_primer_token = []
+        vista_esquema = st.empty()
+        al_recibir_esquema, _ = mostrar_en_vivo(vista_esquema)
+        try:
+            with metricas.etapa("esquema"):
+                capitulos, esquema, avisos = obtener_esquema(
+                    titulo, num_capitulos, num_secciones, XAI_API_KEY, API_URL, obtener_cliente(),
+                    medir_primer_token(al_recibir_esquema, tiempos_primer_token), obtener_enrutador("libro"), metricas
+                )
+        except RuntimeError as e:
+            st.error(f"Error al generar el esquema: {e}")
+            return None
 
-        # Parsear el esquema usando expresiones regulares
-        capitulos = parse_esquema(esquema)
-        
         if not capitulos:
+            vista_esquema.code(esquema)
             st.error("No se pudieron extraer los capítulos y secciones del esquema generado. Revisa el esquema o ajusta los prompts.")
-            return ""
-
-        # 2. Generar contenido para cada sección
-        libro = f"# {titulo}\n\n"
-        for cap_num, (capitulo, secciones) in enumerate(capitulos.items(), 1):
-            libro += f"## {capitulo}\n\n"
-            for sec_num, seccion in enumerate(secciones, 1):
-                # Extraer título de la sección
-                if ":" in seccion:
-                    titulo_seccion = seccion.split(":", 1)[1].strip()
-                else:
-                    titulo_seccion = seccion
-                seccion_prompt = (
-                    f"Escribe una sección detallada titulada '{titulo_seccion}' para el capítulo '{capitulo}' de un libro sobre '{titulo}'. "
-                    f"La sección debe tener aproximadamente 300 palabras, ser clara, coherente y proporcionar información relevante y bien estructurada sobre el tema."
-                )
-                
-                seccion_response = requests.post(
-                    "https://api.x.ai/v1/chat/completions",
-                    headers={
-                        "Content-Type": "application/json",
-                        "Authorization": f"Bearer {XAI_API_KEY}"
-                    },
-                    json={
-                        "messages": [
-                            {
-                                "role": "system",
-                                "content": "Eres un escritor experto que ayuda a desarrollar contenido de libros de manera clara y coherente."
-                            },
-                            {
-                                "role": "user",
-                                "content": seccion_prompt
-                            }
-                        ],
-                        "model": "grok-beta",
-                        "stream": False,
-                        "temperature": 0.7,
-                        "max_tokens": 500
-                    }
-                )
+            return None
+
+        # El esquema llega en JSON: se sustituye por la lista ya parseada de capítulos y secciones
+        vista_esquema.markdown("\n".join(
+            f"**{capitulo}**\n" + "\n".join(f"- {seccion}" for seccion in secciones) + "\n"
+            for capitulo, secciones in capitulos.items()
+        ))
+        for aviso in avisos:
+            st.warning(aviso)
 
-                if seccion_response.status_code != 200:
-                    st.error(f"Error al generar la sección '{titulo_seccion}': {seccion_response.text}")
-                    contenido_seccion = "Error al generar esta sección."
-                else:
-                    contenido_seccion = seccion_response.json().get("choices", [{}])[0].get("message", {}).get("content", "")
-                
-                libro += f"### {seccion}\n\n{contenido_seccion}\n\n"
-        
+        # 2. Generar el contenido de las secciones en paralelo, mostrando las que están en curso a medida que llegan
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        en_curso = st.empty()
+
+        def al_completar(seccion, contenido, error, hechos, total):
+            if error:
+                st.error(f"Error al generar la sección '{seccion}': {error}")
+            status_text.text(f"Generada {seccion} ({hechos}/{total})...")
+            progress_bar.progress(hechos / total)
+
+        def al_progresar(parciales):
+            with en_curso.container():
+                for seccion, texto in parciales.items():
+                    st.markdown(f"**{seccion}**")
+                    st.markdown(texto[-2000:] or "_Esperando el primer token..._")
+
+        estadisticas = {}
+        with metricas.etapa("secciones"):
+            libro = generar_libro_desde_esquema(
+                titulo, capitulos, XAI_API_KEY, API_URL, obtener_cache(), omitir_cache, obtener_cliente(),
+                max_concurrencia, al_completar, al_progresar, tiempos_primer_token, estadisticas, obtener_enrutador("libro"),
+                metricas
+            )
+
+        en_curso.empty()
+        status_text.empty()
+        progress_bar.empty()
+        mostrar_tiempos(estadisticas, time.perf_counter() - inicio, tiempos_primer_token)
         return libro
 
     except Exception as e:
         st.error(f"Ocurrió un error: {e}")
-        return ""
+        return None
+
+# Función para mostrar el tiempo total y la latencia de cada sección al terminar
+def mostrar_tiempos(estadisticas, segundos_total, tiempos_primer_token):
+    latencias = estadisticas["segundos_seccion"]
+    col_total, col_secciones, col_mediana, col_max = st.columns(4)
+    col_total.metric("Tiempo total", f"{segundos_total:.1f} s")
+    col_secciones.metric("Fase de secciones", f"{estadisticas['segundos_total']:.1f} s")
+    if latencias:
+        col_mediana.metric("Latencia por sección (mediana)", f"{statistics.median(latencias.values()):.2f} s")
+        col_max.metric("Latencia por sección (máximo)", f"{max(latencias.values()):.2f} s")
+    if tiempos_primer_token:
+        st.metric(
+            "Tiempo medio hasta el primer token",
+            f"{sum(tiempos_primer_token) / len(tiempos_primer_token):.2f} s",
+        )
+    with st.expander("Latencia de cada sección"):
+        st.table({"Sección": list(latencias), "Segundos": [round(s, 2) for s in latencias.values()]})
+
+# Vista previa por capítulos: solo se envía al navegador el capítulo elegido
+def mostrar_capitulo(libro):
+    if not libro.capitulos:
+        return
+    indice = st.selectbox(
+        "Capítulo", range(len(libro.capitulos)),
+        format_func=lambda i: f"{i + 1}. {libro.capitulos[i][0]}",
+    )
+    with st.container(height=600):
+        st.markdown(libro.texto_capitulo(indice))
 
 def main():
     st.title("Generador de Libros con IA usando x.ai")
     st.write("Introduce los detalles de tu libro y deja que la IA lo escriba por ti.")
     
+    omitir_cache = st.sidebar.checkbox("Omitir caché de secciones", value=False)
+    max_concurrencia = st.sidebar.slider("Secciones simultáneas", min_value=1, max_value=16, value=4)
+
     # Formulario para ingresar detalles del libro
     with st.form(key='book_form'):
         titulo = st.text_input("Título del Libro", "Introducción a la Inteligencia Artificial")
@@ -140,16 +137,22 @@ def main():
     if submit_button:
         st.info("Generando el libro, por favor espera...")
         # Llamar a la función para generar el libro
-        libro = generar_libro(titulo, num_capitulos, num_secciones)
+        metricas = Metricas(st.secrets.get("precios", {}))
+        libro = generar_libro(titulo, num_capitulos, num_secciones, omitir_cache, max_concurrencia, metricas)
         if libro:
             st.success("Libro generado exitosamente!")
-            st.download_button(
-                label="Descargar Libro",
-                data=libro,
-                file_name=f"{titulo.replace(' ', '_')}.txt",
-                mime="text/plain"
-            )
-            st.text_area("Contenido del Libro", libro, height=600)
+        # El libro se guarda en la sesión para poder pasar de capítulo sin volver a generarlo
+        st.session_state["libro"] = libro
+        with metricas.etapa("documento"):
+            st.session_state["documento"] = documento_libro(libro) if libro else None
+        st.session_state["metricas"] = metricas
+
+    libro = st.session_state.get("libro")
+    if libro:
+        mostrar_descargas(st.session_state["documento"], libro.titulo.replace(' ', '_'), st.session_state.get("metricas"))
+        mostrar_capitulo(libro)
+    if st.session_state.get("metricas"):
+        mostrar_metricas(st.session_state["metricas"])
 
 if __name__ == "__main__":
     main()
@@ -1,11 +1,13 @@
 import streamlit as st
-import requests
-from docx import Document
-from docx.shared import Pt
-from io import BytesIO
-import time
-from bs4 import BeautifulSoup
-import re
+from documento import Documento
+from metricas import Metricas
+from pipeline import XAI_URL, adaptar_cartas_concurrente, documento_cartas
+from trabajos import DiarioTrabajo, id_trabajo, id_valido
+from cartas_wikisource import TOTAL_CARTAS_POR_DEFECTO, EspejoCartas, crear_sesion, descubrir_total_cartas
+from ui_comun import (
+    mostrar_descargas, mostrar_metricas, mostrar_resultado, obtener_cache, obtener_cliente, obtener_cola,
+    obtener_enrutador, obtener_usuario, seguir_trabajo,
+)
 
 # Configuración de la página
 st.set_page_config(
@@ -19,93 +21,34 @@ st.title("Adaptador de Cartas de Séneca a un Contexto Corporativo Moderno")
 
 # Descripción
 st.markdown("""
-Esta aplicación adapta las **65 Cartas de Séneca a Lucilio** a un entorno corporativo moderno, proporcionando consejos relevantes para los gestores de empresas en 2024.
+Esta aplicación adapta las **Cartas de Séneca a Lucilio** a un entorno corporativo moderno, proporcionando consejos relevantes para los gestores de empresas en 2024.
 """)
 
-# Función para obtener el contenido de una carta específica
-def obtener_contenido_carta(numero):
-    url = f"https://en.wikisource.org/wiki/Moral_letters_to_Lucilius/Letter_{numero}"
-    response = requests.get(url)
-    if response.status_code == 200:
-        # Extraer el contenido principal de la carta
-        soup = BeautifulSoup(response.content, 'html.parser')
-        content_div = soup.find('div', {'class': 'mw-parser-output'})
-        if not content_div:
-            return None
-        paragraphs = content_div.find_all('p')
-        contenido = "\n\n".join([para.get_text() for para in paragraphs])
-        return contenido
-    else:
-        return None
-
-# Función para adaptar la carta usando la API de X
-def adaptar_carta(contenido_original, numero_carta):
-    api_key = st.secrets["api"]["key"]
-    url = "https://api.x.ai/v1/chat/completions"  # URL de la API de X
+# Espejo local de las cartas y sesión HTTP compartidos por todas las sesiones del servidor
+@st.cache_resource
+def obtener_espejo():
+    return EspejoCartas()
 
-    prompt = f"""
-Reimagine letter number {numero_carta} of Seneca to Lucilius, adapting it from its original philosophical content to a modern corporate environment of 2024. Use simple and contemporary language while preserving Seneca's wisdom. Ensure that examples and metaphors are relevant to current challenges faced by corporate managers, including references to modern technology, work-life balance, and common issues such as stress, leadership, and productivity.
+@st.cache_resource
+def obtener_sesion():
+    return crear_sesion()
 
-Original Content:
-{contenido_original}
+# Resumen propio de las cartas al terminar el trabajo
+def mostrar_detalles_cartas(resultado):
+    ttft = resultado["metricas"].resumen()["solicitudes"]["ttft_segundos"]
+    if ttft["p50"] is not None:
+        st.metric("Tiempo hasta el primer token (mediana)", f"{ttft['p50']:.2f} s")
 
-Adaptation (use proper formatting without Markdown symbols, e.g., use italics instead of asterisks, appropriate heading levels without hashtags):
-"""
+# Total de cartas disponibles, descubierto a partir del índice de Wikisource
+# Solo se consulta al adaptar o descargar todas las cartas, no en cada arranque; hasta entonces se muestra
+# TOTAL_CARTAS_POR_DEFECTO
+@st.cache_data(ttl=24 * 3600, show_spinner="Consultando el índice de las cartas...")
+def descubrir_total():
+    return descubrir_total_cartas(obtener_sesion())
 
-    payload = {
-        "messages": [
-            {"role": "system", "content": "You are an assistant that adapts philosophical texts to modern corporate contexts using proper formatting."},
-            {"role": "user", "content": prompt}
-        ],
-        "model": "grok-beta",  # Modelo especificado
-        "stream": False,
-        "temperature": 0.7
-    }
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-
-    try:
-        response = requests.post(url, headers=headers, json=payload)
-        if response.status_code == 200:
-            respuesta = response.json()
-            # Asumiendo que la respuesta tiene una estructura similar a OpenAI
-            adaptacion = respuesta.get('choices')[0].get('message').get('content').strip()
-            return adaptacion
-        else:
-            st.error(f"Error al adaptar la carta {numero_carta}: {response.status_code} - {response.text}")
-            return None
-    except Exception as e:
-        st.error(f"Excepción al adaptar la carta {numero_carta}: {e}")
-        return None
-
-# Función para convertir HTML a formato de Python-docx
-def html_a_docx(paragraph, html_text):
-    # Parsear el HTML usando BeautifulSoup
-    soup = BeautifulSoup(html_text, 'html.parser')
-    for elem in soup:
-        if isinstance(elem, str):
-            paragraph.add_run(elem)
-        elif elem.name in ['i', 'em']:
-            run = paragraph.add_run(elem.get_text())
-            run.italic = True
-        elif elem.name in ['b', 'strong']:
-            run = paragraph.add_run(elem.get_text())
-            run.bold = True
-        elif re.match(r'h[1-6]', elem.name):
-            # Manejar encabezados
-            nivel = int(elem.name[1])
-            if 1 <= nivel <= 6:
-                paragraph.style = f'Heading {nivel}'
-                paragraph.add_run(elem.get_text())
-        else:
-            # Manejar otros casos o etiquetas desconocidas
-            paragraph.add_run(elem.get_text())
-
-# Total de cartas disponibles
-TOTAL_CARTAS = 65  # Actualizado a 65 cartas
+def total_cartas():
+    st.session_state["total_cartas"] = descubrir_total()
+    return st.session_state["total_cartas"]
 
 # Entrada de números de cartas
 st.sidebar.header("Configuración de Adaptación")
@@ -126,69 +69,109 @@ if opcion == "Seleccionar manualmente":
         numeros_cartas = []
 else:
     # Adaptar todas las cartas
-    numeros_cartas = list(range(1, TOTAL_CARTAS + 1))
-    st.sidebar.info(f"Se procesarán todas las {TOTAL_CARTAS} cartas disponibles.")
+    numeros_cartas = list(range(1, total_cartas() + 1))
+    st.sidebar.info(f"Se procesarán todas las {len(numeros_cartas)} cartas disponibles.")
+
+omitir_cache = st.sidebar.checkbox("Omitir caché de adaptaciones", value=False)
+
+# Descarga previa de todas las cartas al espejo local
+st.sidebar.caption(
+    f"Cartas en el espejo local: {len(obtener_espejo().numeros_guardados())}/"
+    f"{st.session_state.get('total_cartas', TOTAL_CARTAS_POR_DEFECTO)}"
+)
+revalidar = st.sidebar.checkbox("Revalidar cartas ya descargadas", value=False)
+if st.sidebar.button("Descargar todas las cartas"):
+    total = total_cartas()
+    descarga_bar = st.sidebar.progress(0)
+    descargadas = []
+
+    def al_descargar(numero, texto):
+        descargadas.append(numero)
+        descarga_bar.progress(len(descargadas) / total)
+
+    obtener_espejo().descargar_todas(
+        obtener_sesion(), range(1, total + 1), revalidar=revalidar, al_completar=al_descargar
+    )
+    descarga_bar.empty()
+    st.sidebar.success(f"{len(descargadas)} cartas disponibles en el espejo local.")
+
+# Trabajo reanudable: cada carta adaptada se guarda en el diario al terminar y,
+# al volver a lanzar el mismo trabajo, solo se adaptan las pendientes o fallidas
+id_por_defecto = id_trabajo("cartas", numeros_cartas)
+id_elegido = st.sidebar.text_input("Id del trabajo (para reanudar)", value=id_por_defecto)
+id_elegido = id_elegido.strip() or id_por_defecto
+if not id_valido(id_elegido):
+    st.sidebar.error("El id del trabajo solo puede tener letras, números, '_' y '-'.")
+    st.stop()
+diario = DiarioTrabajo(id_elegido)
+completadas = diario.completados()
+if diario.resultados():
+    st.sidebar.caption(
+        f"Trabajo {diario.id}: {len(completadas)} cartas guardadas, {len(diario.fallidos())} fallidas que se reintentarán."
+    )
+
+# Documento ya montado en una ejecución anterior de este trabajo
+if st.session_state.get("documento_trabajo") != diario.id:
+    guardado = diario.leer_documento()
+    st.session_state["documento"] = Documento.desde_json(guardado) if guardado else None
+    st.session_state["documento_trabajo"] = diario.id
 
-# Botón para iniciar la adaptación
+# Botón para iniciar la adaptación: el trabajo se encola y se ejecuta en segundo plano,
+# así que sigue aunque se cierre la pestaña y se puede retomar con su id
+max_concurrencia = st.sidebar.slider("Solicitudes simultáneas a la API", min_value=1, max_value=16, value=4)
 if st.sidebar.button("Adaptar Cartas"):
     if not numeros_cartas:
         st.sidebar.error("Por favor, ingrese al menos un número de carta válido.")
     else:
-        documentos = {}
         total = len(numeros_cartas)
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-
-        for idx, numero in enumerate(numeros_cartas, start=1):
-            status_text.text(f"Adaptando carta {numero} ({idx}/{total})...")
-
-            contenido_original = obtener_contenido_carta(numero)
-            if contenido_original:
-                adaptacion = adaptar_carta(contenido_original, numero)
-                if adaptacion:
-                    documentos[f"Letter {numero}"] = adaptacion
-                else:
-                    documentos[f"Letter {numero}"] = "Error en la adaptación."
-            else:
-                documentos[f"Letter {numero}"] = "Contenido no disponible."
-
-            # Actualizar la barra de progreso
-            progress = idx / total
-            progress_bar.progress(progress)
-
-            # Simular tiempo de espera (puedes eliminar esto en producción)
-            time.sleep(0.5)
-
-        status_text.text("Adaptación completa.")
-        progress_bar.empty()
-
-        # Crear el documento Word
-        doc = Document()
-        estilo_normal = doc.styles['Normal']
-        estilo_normal.font.name = 'Arial'
-        estilo_normal.font.size = Pt(12)
-
-        for titulo, contenido in documentos.items():
-            # Agregar título como encabezado de nivel 1
-            doc.add_heading(titulo, level=1)
-
-            # Dividir el contenido en párrafos basados en saltos de línea dobles
-            paragraphs = contenido.split('\n\n')
-            for para in paragraphs:
-                paragraph = doc.add_paragraph()
-                html_a_docx(paragraph, para)
-            doc.add_page_break()
-
-        # Guardar el documento en memoria
-        buffer = BytesIO()
-        doc.save(buffer)
-        buffer.seek(0)
-
-        # Botón para descargar
-        st.success("Todas las cartas han sido adaptadas exitosamente.")
-        st.download_button(
-            label="Descargar Documento Word",
-            data=buffer,
-            file_name="Adapted_Seneca_Letters.docx",
-            mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-        )
+        # Todo lo que depende de Streamlit se resuelve aquí; el hilo del trabajo no tiene contexto de script
+        api_key = st.secrets["api"]["key"]
+        url = st.secrets["api"].get("url", XAI_URL)
+        cache = obtener_cache()
+        cliente = obtener_cliente()
+        enrutador = obtener_enrutador("cartas")
+        espejo = obtener_espejo()
+        sesion = obtener_sesion()
+        metricas = Metricas(st.secrets.get("precios", {}))
+
+        def ejecutar(trabajo, ejecutor):
+            # Las cartas se anuncian según terminan; el documento se monta al final, en el orden pedido
+            hechas = []
+
+            def obtener_texto(numero):
+                with metricas.etapa("obtener_carta"):
+                    return espejo.obtener(numero, sesion)
+
+            def al_completar(clave, adaptacion, error):
+                if error:
+                    trabajo.agregar_error(f"Error al adaptar la carta {clave}: {error}")
+                hechas.append(clave)
+                trabajo.progresar(len(hechas), total, f"Adaptada {clave} ({len(hechas)}/{total})...")
+
+            trabajo.progresar(0, total, f"Adaptando {total} cartas ({max_concurrencia} en paralelo)...")
+            with metricas.etapa("adaptacion"):
+                documentos = adaptar_cartas_concurrente(
+                    numeros_cartas, obtener_texto, api_key, url, max_concurrencia=max_concurrencia, cache=cache,
+                    omitir_cache=omitir_cache, cliente=cliente, diario=diario, al_completar=al_completar,
+                    enrutador=enrutador, metricas=metricas, ejecutor=ejecutor,
+                    al_progresar=trabajo.actualizar_parciales,
+                )
+            with metricas.etapa("documento"):
+                documento = documento_cartas(documentos)
+            diario.guardar_documento(documento.a_json())
+            return {"documento": documento, "metricas": metricas}
+
+        obtener_cola().enviar(obtener_usuario(), diario.id, f"{total} cartas", ejecutar, max_concurrencia)
+
+# Progreso del trabajo en curso o resultado del último, si este trabajo está en la cola
+trabajo = obtener_cola().obtener(diario.id)
+if trabajo and not trabajo.terminado:
+    seguir_trabajo(diario.id)
+elif trabajo:
+    mostrar_resultado(trabajo, mostrar_detalles_cartas)
+
+documento = st.session_state.get("documento")
+if documento:
+    mostrar_descargas(documento, "Adapted_Seneca_Letters", st.session_state.get("metricas"))
+if st.session_state.get("metricas"):
+    mostrar_metricas(st.session_state["metricas"])
@@ -0,0 +1,90 @@
+import pytest
+
+import cache_llm
+import cli
+from cache_llm import CacheLLM, clave_solicitud, con_cache
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1_000_000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(cache_llm.time, "time", reloj)
+    return reloj
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return CacheLLM(str(tmp_path / "cache.sqlite"))
+
+
+def test_clave_solicitud_depende_de_todos_los_campos():
+    base = clave_solicitud("modelo", 0.7, "sistema", "prompt")
+    assert base == clave_solicitud("modelo", 0.7, "sistema", "prompt")
+    assert base != clave_solicitud("otro", 0.7, "sistema", "prompt")
+    assert base != clave_solicitud("modelo", 0.2, "sistema", "prompt")
+    assert base != clave_solicitud("modelo", 0.7, "otro", "prompt")
+    assert base != clave_solicitud("modelo", 0.7, "sistema", "otro")
+
+
+def test_con_cache_solo_genera_una_vez(cache):
+    generadas = []
+
+    def generar():
+        generadas.append(1)
+        return "respuesta"
+
+    assert con_cache(cache, "m", 0.7, "s", "p", generar) == "respuesta"
+    assert con_cache(cache, "m", 0.7, "s", "p", generar) == "respuesta"
+    assert len(generadas) == 1
+    assert cache.estadisticas()["aciertos"] == 1
+
+
+def test_con_cache_omitir_regenera_y_actualiza(cache):
+    con_cache(cache, "m", 0.7, "s", "p", lambda: "vieja")
+    assert con_cache(cache, "m", 0.7, "s", "p", lambda: "nueva", omitir=True) == "nueva"
+    assert con_cache(cache, "m", 0.7, "s", "p", lambda: "otra") == "nueva"
+
+
+def test_con_cache_no_guarda_respuestas_vacias(cache):
+    con_cache(cache, "m", 0.7, "s", "p", lambda: "")
+    assert cache.estadisticas()["entradas"] == 0
+
+
+def test_las_entradas_caducan(tmp_path, reloj):
+    cache = CacheLLM(str(tmp_path / "cache.sqlite"), ttl=60)
+    cache.guardar("a", "valor")
+    reloj.ahora += 61
+    assert cache.obtener("a") is None
+    assert cache.estadisticas()["entradas"] == 0
+
+
+def test_se_desalojan_las_usadas_hace_mas_tiempo(tmp_path, reloj):
+    cache = CacheLLM(str(tmp_path / "cache.sqlite"), tamano_maximo=25)
+    for clave in "abc":
+        reloj.ahora += 1
+        cache.guardar(clave, "x" * 10)
+    # Con 30 bytes se supera el máximo: sale "a", la menos usada
+    assert cache.obtener("a") is None
+    reloj.ahora += 1
+    assert cache.obtener("b") is not None
+    reloj.ahora += 1
+    cache.guardar("d", "x" * 10)
+    assert cache.obtener("c") is None and cache.obtener("b") is not None
+
+
+def test_vaciar_desde_la_linea_de_comandos(tmp_path, monkeypatch):
+    ruta = str(tmp_path / "cache.sqlite")
+    CacheLLM(ruta).guardar("a", "valor")
+    monkeypatch.setattr(cli, "CacheLLM", lambda: CacheLLM(ruta))
+    monkeypatch.delenv("ESTOICOS_CONFIG", raising=False)
+    monkeypatch.chdir(tmp_path)
+    assert cli.main(["cache", "--vaciar"]) == 0
+    assert CacheLLM(ruta).estadisticas()["entradas"] == 0
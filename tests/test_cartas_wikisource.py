@@ -0,0 +1,89 @@
+import pytest
+import requests
+
+from cartas_wikisource import EspejoCartas, descubrir_total_cartas, extraer_texto_carta
+
+PAGINA = (
+    '<html><body><div id="menu"><p>Navegación</p></div>'
+    '<div class="mw-parser-output"><p>Séneca saluda a Lucilio.</p><p>Reclama tu tiempo.</p></div></body></html>'
+).encode("utf-8")
+
+
+class Respuesta:
+    def __init__(self, status_code=200, content=b"", headers=None):
+        self.status_code = status_code
+        self.content = content
+        self.text = content.decode("utf-8")
+        self.headers = headers or {}
+
+
+# Sesión falsa: devuelve las respuestas indicadas en orden y guarda las cabeceras de cada petición
+class Sesion:
+    def __init__(self, *respuestas):
+        self.respuestas = list(respuestas)
+        self.peticiones = []
+
+    def get(self, url, headers=None, timeout=None):
+        self.peticiones.append((url, headers or {}))
+        respuesta = self.respuestas.pop(0)
+        if isinstance(respuesta, Exception):
+            raise respuesta
+        return respuesta
+
+
+@pytest.fixture
+def espejo(tmp_path):
+    return EspejoCartas(str(tmp_path / "cartas.sqlite"))
+
+
+def test_extraer_texto_carta_solo_del_contenido_principal():
+    assert extraer_texto_carta(PAGINA) == "Séneca saluda a Lucilio.\n\nReclama tu tiempo."
+    assert extraer_texto_carta(b"<html><body><p>Sin contenido</p></body></html>") is None
+
+
+def test_obtener_guarda_la_carta_y_la_sirve_desde_disco(espejo):
+    sesion = Sesion(Respuesta(200, PAGINA, {"ETag": '"v1"'}))
+    assert espejo.obtener(1, sesion) == "Séneca saluda a Lucilio.\n\nReclama tu tiempo."
+    assert espejo.obtener(1, sesion) == "Séneca saluda a Lucilio.\n\nReclama tu tiempo."
+    assert len(sesion.peticiones) == 1
+    assert espejo.numeros_guardados() == [1]
+
+
+def test_revalidar_usa_cabeceras_condicionales(espejo):
+    espejo.obtener(1, Sesion(Respuesta(200, PAGINA, {"ETag": '"v1"', "Last-Modified": "ayer"})))
+    sesion = Sesion(Respuesta(304))
+    assert espejo.obtener(1, sesion, revalidar=True).startswith("Séneca")
+    assert sesion.peticiones[0][1] == {"If-None-Match": '"v1"', "If-Modified-Since": "ayer"}
+
+
+def test_paginas_sin_contenido_no_se_guardan(espejo):
+    sesion = Sesion(Respuesta(200, b"<html><body>Error del servidor</body></html>"), Respuesta(200, PAGINA))
+    assert espejo.obtener(2, sesion) is None
+    assert espejo.numeros_guardados() == []
+    # La siguiente vez se vuelve a pedir
+    assert espejo.obtener(2, sesion).startswith("Séneca")
+    assert espejo.numeros_guardados() == [2]
+
+
+def test_errores_de_red_devuelven_lo_guardado(espejo):
+    espejo.obtener(1, Sesion(Respuesta(200, PAGINA)))
+    assert espejo.obtener(1, Sesion(requests.ConnectionError()), revalidar=True).startswith("Séneca")
+    assert espejo.obtener(1, Sesion(Respuesta(500)), revalidar=True).startswith("Séneca")
+    assert espejo.obtener(3, Sesion(requests.Timeout())) is None
+    assert espejo.obtener(3, Sesion(Respuesta(404))) is None
+
+
+def test_descargar_todas(espejo):
+    completadas = {}
+    sesion = Sesion(*[Respuesta(200, PAGINA) for _ in range(3)])
+    espejo.descargar_todas(sesion, [1, 2, 3], max_concurrencia=1,
+                           al_completar=lambda numero, texto: completadas.update({numero: texto}))
+    assert sorted(completadas) == [1, 2, 3]
+    assert espejo.numeros_guardados() == [1, 2, 3]
+
+
+def test_descubrir_total_cartas():
+    indice = Respuesta(200, b'<a href="/wiki/X/Letter_1">1</a><a href="/wiki/X/Letter_124">124</a>')
+    assert descubrir_total_cartas(Sesion(indice)) == 124
+    assert descubrir_total_cartas(Sesion(Respuesta(503)), por_defecto=65) == 65
+    assert descubrir_total_cartas(Sesion(requests.ConnectionError()), por_defecto=65) == 65
@@ -0,0 +1,168 @@
+import time
+
+import pytest
+
+import cliente_llm
+from cliente_llm import CircuitoAbierto, Cortacircuitos, LimitadorTasa, leer_eventos_sse
+
+
+def test_leer_eventos_sse_une_lineas_data_e_ignora_comentarios():
+    lineas = [
+        ": keep-alive",
+        "event: message",
+        'data: {"a": 1}',
+        "",
+        "data: primera",
+        "data:segunda",
+        "",
+        "",
+        None,
+        "data: [DONE]",
+        "",
+        "data: después de DONE",
+        "",
+    ]
+    assert list(leer_eventos_sse(lineas)) == ['{"a": 1}', "primera\nsegunda"]
+
+
+def test_leer_eventos_sse_entrega_el_ultimo_evento_sin_linea_vacia():
+    assert list(leer_eventos_sse(["data: uno", "", "data: dos"])) == ["uno", "dos"]
+    assert list(leer_eventos_sse(["data: uno", "", "data: [DONE]"])) == ["uno"]
+
+
+def test_limitador_sin_limites_no_espera():
+    limitador = LimitadorTasa()
+    inicio = time.perf_counter()
+    for _ in range(1000):
+        limitador.adquirir(10000)
+    assert time.perf_counter() - inicio < 0.5
+
+
+def test_limitador_espera_a_que_se_recargue_el_cupo():
+    # 600 solicitudes por minuto: agotado el cupo inicial, la siguiente espera unos 0,1 s
+    limitador = LimitadorTasa(solicitudes_por_minuto=600)
+    for _ in range(600):
+        limitador.adquirir(1)
+    inicio = time.perf_counter()
+    limitador.adquirir(1)
+    assert 0.05 < time.perf_counter() - inicio < 1.0
+
+
+def test_limitador_no_bloquea_solicitudes_mayores_que_la_capacidad():
+    limitador = LimitadorTasa(tokens_por_minuto=100)
+    inicio = time.perf_counter()
+    limitador.adquirir(5000)
+    assert time.perf_counter() - inicio < 0.5
+    assert limitador.disponibles[1] == pytest.approx(0, abs=1)
+
+
+class Reloj:
+    def __init__(self):
+        self.ahora = 1000.0
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(cliente_llm.time, "monotonic", reloj)
+    return reloj
+
+
+def test_cortacircuitos_se_abre_tras_umbral_fallos(reloj):
+    cortacircuitos = Cortacircuitos(umbral_fallos=3, segundos_abierto=30)
+    for _ in range(2):
+        cortacircuitos.permitir()
+        cortacircuitos.registrar_fallo()
+    cortacircuitos.permitir()
+    cortacircuitos.registrar_fallo()
+    with pytest.raises(CircuitoAbierto):
+        cortacircuitos.permitir()
+    reloj.ahora += 29
+    with pytest.raises(CircuitoAbierto):
+        cortacircuitos.permitir()
+
+
+def test_cortacircuitos_semiabierto_deja_pasar_una_prueba(reloj):
+    cortacircuitos = Cortacircuitos(umbral_fallos=1, segundos_abierto=10)
+    cortacircuitos.registrar_fallo()
+    reloj.ahora += 11
+    cortacircuitos.permitir()  # la solicitud de prueba pasa
+    with pytest.raises(CircuitoAbierto):
+        cortacircuitos.permitir()  # las demás se rechazan mientras dura la prueba
+    cortacircuitos.registrar_exito()
+    cortacircuitos.permitir()
+    assert cortacircuitos.fallos_seguidos == 0
+
+
+def test_cortacircuitos_vuelve_a_abrirse_si_falla_la_prueba(reloj):
+    cortacircuitos = Cortacircuitos(umbral_fallos=1, segundos_abierto=10)
+    cortacircuitos.registrar_fallo()
+    reloj.ahora += 11
+    cortacircuitos.permitir()
+    cortacircuitos.registrar_fallo()
+    reloj.ahora += 5
+    with pytest.raises(CircuitoAbierto):
+        cortacircuitos.permitir()
+
+
+def test_cortacircuitos_un_exito_reinicia_los_fallos(reloj):
+    cortacircuitos = Cortacircuitos(umbral_fallos=2, segundos_abierto=10)
+    cortacircuitos.registrar_fallo()
+    cortacircuitos.registrar_exito()
+    cortacircuitos.registrar_fallo()
+    cortacircuitos.permitir()
+
+
+@pytest.fixture
+def esperas(reloj, monkeypatch):
+    esperas = []
+
+    def dormir(segundos):
+        esperas.append(segundos)
+        reloj.ahora += segundos
+
+    monkeypatch.setattr(cliente_llm.time, "sleep", dormir)
+    return esperas
+
+
+def test_con_espera_circuito_reintenta_al_reabrirse(reloj, esperas):
+    cortacircuitos = Cortacircuitos(umbral_fallos=1, segundos_abierto=8)
+    cortacircuitos.registrar_fallo()
+
+    def solicitud():
+        cortacircuitos.permitir()
+        return "ok"
+
+    assert cliente_llm.con_espera_circuito(solicitud, sondeo=5) == "ok"
+    assert esperas == [5, 3]
+
+
+def test_con_espera_circuito_se_rinde_tras_la_espera_maxima(reloj, esperas):
+    cortacircuitos = Cortacircuitos(umbral_fallos=1, segundos_abierto=1000)
+    cortacircuitos.registrar_fallo()
+    with pytest.raises(CircuitoAbierto):
+        cliente_llm.con_espera_circuito(cortacircuitos.permitir, espera_maxima=12, sondeo=5)
+    assert esperas == [5, 5, 2]
+
+
+def test_adaptar_espera_al_circuito_en_lugar_de_fallar(esperas, monkeypatch):
+    import pipeline
+
+    llamadas = []
+
+    def adaptar_contenido(contenido, titulo, *args):
+        llamadas.append(titulo)
+        if len(llamadas) == 1:
+            raise CircuitoAbierto("abierto", 2.0)
+        return "Adaptado."
+
+    monkeypatch.setattr(pipeline, "adaptar_contenido", adaptar_contenido)
+    errores = []
+    resultado = pipeline.adaptar_contenidos_concurrente(
+        {"Uno": "Texto."}, "clave", al_completar=lambda titulo, adaptacion, error, *_: errores.append(error)
+    )
+    assert resultado == {"Uno": "Adaptado."}
+    assert llamadas == ["Uno", "Uno"] and esperas == [2.0] and errores == [None]
@@ -0,0 +1,74 @@
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from cola import EjecutorJusto
+
+
+@pytest.fixture
+def ejecutor():
+    ejecutor = EjecutorJusto(max_hilos=1)
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+# Ocupa el único hilo hasta que se suelta el evento, para encolar varias tareas antes de que empiecen
+def bloquear(ejecutor):
+    evento = threading.Event()
+    futuro = ejecutor.enviar("bloqueo", evento.wait)
+    return evento, futuro
+
+
+def test_ejecutor_justo_reparte_por_turnos(ejecutor):
+    orden = []
+    evento, bloqueo = bloquear(ejecutor)
+    futuros = [ejecutor.enviar(usuario, orden.append, (f"{usuario}{i}",)) for usuario in "ab" for i in range(3)]
+    evento.set()
+    wait([bloqueo] + futuros, timeout=5)
+    assert orden == ["a0", "b0", "a1", "b1", "a2", "b2"]
+
+
+def test_ejecutor_justo_respeta_el_limite_por_usuario():
+    ejecutor = EjecutorJusto(max_hilos=4)
+    candado = threading.Lock()
+    a_la_vez = {"actual": 0, "maximo": 0}
+
+    def tarea():
+        with candado:
+            a_la_vez["actual"] += 1
+            a_la_vez["maximo"] = max(a_la_vez["maximo"], a_la_vez["actual"])
+        time.sleep(0.02)
+        with candado:
+            a_la_vez["actual"] -= 1
+
+    futuros = [ejecutor.enviar("a", tarea, limite=2) for _ in range(8)]
+    wait(futuros, timeout=5)
+    ejecutor.cerrar()
+    assert a_la_vez["maximo"] == 2
+
+
+def test_ejecutor_justo_olvida_a_los_usuarios_sin_tareas(ejecutor):
+    futuros = [ejecutor.enviar(f"sesion-{i}", time.sleep, (0,)) for i in range(20)]
+    wait(futuros, timeout=5)
+    # El contador se libera en el hilo justo después de resolver el futuro
+    for _ in range(100):
+        if not ejecutor._en_curso:
+            break
+        time.sleep(0.01)
+    assert ejecutor._en_curso == {}
+
+
+def test_ejecutor_justo_propaga_excepciones(ejecutor):
+    futuro = ejecutor.enviar("a", int, ("no es un número",))
+    with pytest.raises(ValueError):
+        futuro.result(timeout=5)
+    # El hilo sigue atendiendo tareas después del error
+    assert ejecutor.enviar("a", int, ("7",)).result(timeout=5) == 7
+
+
+def test_ejecutor_justo_cerrado_rechaza_tareas(ejecutor):
+    ejecutor.cerrar()
+    with pytest.raises(RuntimeError):
+        ejecutor.enviar("a", print)
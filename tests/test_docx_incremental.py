@@ -0,0 +1,59 @@
+import zipfile
+
+import pytest
+
+from docx_incremental import DocxIncremental
+
+docx = pytest.importorskip("docx")
+
+
+def test_el_documento_se_abre_con_python_docx(tmp_path):
+    ruta = str(tmp_path / "prueba.docx")
+    with DocxIncremental(ruta) as doc:
+        doc.agregar_titulo("Carta 1", 1)
+        doc.agregar_parrafo([("Normal, ", False, False), ("negrita", True, False), (" y ", False, False),
+                             ("cursiva", False, True)])
+        doc.agregar_parrafo([("• Un punto", False, False)], "ListBullet")
+        doc.salto_pagina()
+        doc.agregar_titulo("Subtítulo", 2)
+    assert doc.parrafos == 4
+
+    documento = docx.Document(ruta)
+    parrafos = [p for p in documento.paragraphs if p.text]
+    assert [(p.style.name, p.text) for p in parrafos] == [
+        ("Heading 1", "Carta 1"),
+        ("Normal", "Normal, negrita y cursiva"),
+        ("List Bullet", "• Un punto"),
+        ("Heading 2", "Subtítulo"),
+    ]
+    assert [(run.text, bool(run.bold), bool(run.italic)) for run in parrafos[1].runs] == [
+        ("Normal, ", False, False), ("negrita", True, False), (" y ", False, False), ("cursiva", False, True),
+    ]
+    assert documento.styles["Normal"].font.name == "Arial"
+    assert documento.styles["Normal"].font.size.pt == 12
+
+
+def test_escapa_xml_y_quita_caracteres_de_control(tmp_path):
+    ruta = str(tmp_path / "prueba.docx")
+    with DocxIncremental(ruta) as doc:
+        doc.agregar_parrafo([("<b>&\"no\"</b>\x07\x00 fin", False, False)])
+    assert docx.Document(ruta).paragraphs[0].text == "<b>&\"no\"</b> fin"
+
+
+def test_saltos_de_linea_y_tabuladores(tmp_path):
+    ruta = str(tmp_path / "prueba.docx")
+    with DocxIncremental(ruta) as doc:
+        doc.agregar_parrafo([("uno\ndos\ttres", False, False)])
+    with zipfile.ZipFile(ruta) as paquete:
+        xml = paquete.read("word/document.xml").decode("utf-8")
+    assert "<w:br/>" in xml and "<w:tab/>" in xml
+    assert docx.Document(ruta).paragraphs[0].text == "uno\ndos\ttres"
+
+
+def test_cerrar_dos_veces_no_falla(tmp_path):
+    doc = DocxIncremental(str(tmp_path / "prueba.docx"))
+    doc.agregar_titulo("Título")
+    doc.cerrar()
+    doc.cerrar()
+    with zipfile.ZipFile(str(tmp_path / "prueba.docx")) as paquete:
+        assert paquete.testzip() is None
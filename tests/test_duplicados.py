@@ -0,0 +1,87 @@
+from duplicados import MOTIVO_INDICE, MOTIVO_VACIA, es_corta, motivo_descarte, revisar_secciones
+
+TEXTO = (
+    "La virtud es el único bien y todo lo demás es indiferente. El sabio vive conforme a la naturaleza y acepta "
+    "con serenidad lo que no depende de él, porque sabe que solo sus juicios están en su poder."
+)
+OTRO_TEXTO = (
+    "La muerte no es un mal, pues mientras existimos no está presente y cuando está presente ya no existimos. "
+    "Quien aprende a morir desaprende a servir y se libera de toda esclavitud."
+)
+# Sección larga, como las de una obra real: un cambio de una palabra apenas altera su firma
+LARGO = " ".join(f"En la carta {i} Séneca recuerda a Lucilio que el tiempo es lo único nuestro." for i in range(40))
+
+
+def test_motivo_descarte_vacias():
+    assert motivo_descarte("") == MOTIVO_VACIA
+    assert motivo_descarte(None) == MOTIVO_VACIA
+    assert motivo_descarte("  \n\n 17 \n") == MOTIVO_INDICE  # solo un número de página
+
+
+def test_secciones_cortas_no_se_descartan():
+    assert motivo_descarte("Pocas palabras aquí.") is None
+    assert es_corta("Pocas palabras aquí.")
+    assert not es_corta(TEXTO)
+    revision = revisar_secciones({"Epígrafe": "Vivir es combatir.", "Capítulo 1": TEXTO, "Cita": "Vivir es combatir."})
+    # Se conservan sin adaptar y sin compararse entre ellas
+    assert revision == {"descartadas": {}, "duplicadas": {}, "cortas": ["Epígrafe", "Cita"]}
+
+
+def test_motivo_descarte_indice():
+    indice = "Capítulo 1 La mente ........ 5\nCapítulo 2 La virtud ........ 17\nCapítulo 3 La muerte 29\nXII"
+    assert motivo_descarte(indice) == MOTIVO_INDICE
+
+
+def test_motivo_descarte_conserva_el_texto_normal():
+    # Un capítulo cuya primera línea acaba en número no es el índice si el resto es prosa
+    assert motivo_descarte("Capítulo 1\n" + TEXTO) is None
+
+
+def test_revisar_secciones_duplicadas_exactas_y_casi_identicas():
+    secciones = {
+        "Índice": "Capítulo 1 ........ 3\nCapítulo 2 ........ 9",
+        "Capítulo 1": TEXTO,
+        "Vacía": "",
+        "Capítulo 1 (copia)": "  " + TEXTO.replace(" ", "\n", 3) + "\n",
+        "Capítulo 2": OTRO_TEXTO,
+        "Capítulo 3": LARGO,
+        "Capítulo 3 (errata)": LARGO.replace("carta 7 Séneca", "carta 7 el filósofo"),
+    }
+    revision = revisar_secciones(secciones)
+    assert revision["descartadas"] == {"Índice": MOTIVO_INDICE, "Vacía": MOTIVO_VACIA}
+    assert revision["duplicadas"] == {"Capítulo 1 (copia)": "Capítulo 1", "Capítulo 3 (errata)": "Capítulo 3"}
+
+
+def test_revisar_secciones_distintas_no_son_duplicadas():
+    revision = revisar_secciones({"Uno": TEXTO, "Dos": OTRO_TEXTO, "Tres": LARGO, "Cuatro": LARGO[: len(LARGO) // 2] + OTRO_TEXTO})
+    assert revision == {"descartadas": {}, "duplicadas": {}, "cortas": []}
+
+
+def test_revisar_secciones_el_original_es_siempre_anterior():
+    revision = revisar_secciones({"B": TEXTO, "A": TEXTO, "C": TEXTO})
+    assert revision["duplicadas"] == {"A": "B", "C": "B"}
+
+
+def test_adaptar_conserva_las_secciones_cortas_sin_pedirlas(monkeypatch):
+    import pipeline
+
+    pedidas = []
+
+    def adaptar_contenido(contenido, titulo, *args):
+        pedidas.append(titulo)
+        return f"Adaptado: {titulo}"
+
+    monkeypatch.setattr(pipeline, "adaptar_contenido", adaptar_contenido)
+    entregadas = []
+    estadisticas = {}
+    resultado = pipeline.adaptar_contenidos_concurrente(
+        {"Índice": "Capítulo 1 ........ 3\nCapítulo 2 ........ 9", "Epígrafe": "Vivir es combatir.",
+         "Capítulo 1": TEXTO, "Capítulo 1 (copia)": TEXTO},
+        "clave", deduplicar=True, estadisticas_lotes=estadisticas,
+        al_terminar_seccion=lambda titulo, adaptacion: entregadas.append(titulo),
+    )
+    assert pedidas == ["Capítulo 1"]
+    assert resultado == {"Epígrafe": "Vivir es combatir.", "Capítulo 1": "Adaptado: Capítulo 1",
+                         "Capítulo 1 (copia)": "Adaptado: Capítulo 1"}
+    assert entregadas == ["Epígrafe", "Capítulo 1", "Capítulo 1 (copia)"]
+    assert estadisticas["secciones_conservadas"] == 1 and estadisticas["solicitudes_evitadas"] == 3
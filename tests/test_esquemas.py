@@ -0,0 +1,53 @@
+import pytest
+
+from esquemas import limpiar_titulo, parse_esquema, validar_esquema
+
+ESPERADO = {"La mente": ["El control", "La atención"], "La virtud": ["Justicia", "Templanza"]}
+
+
+@pytest.mark.parametrize("esquema", [
+    '{"capitulos": [{"titulo": "La mente", "secciones": ["El control", "La atención"]},'
+    ' {"titulo": "La virtud", "secciones": [{"titulo": "Justicia"}, {"titulo": "Templanza"}]}]}',
+    'Aquí está:\n```json\n{"chapters": [{"title": "Capítulo 1: La mente", "sections": ["El control", "La atención"]},'
+    ' {"title": "Capítulo 2: La virtud", "sections": ["Justicia", "Templanza"]}]}\n```\nSuerte.',
+    '{"La mente": ["El control", "La atención"], "La virtud": ["Justicia", "Templanza"]}',
+    "Capítulo 1: La mente\n- Sección 1: El control\n- Sección 2: La atención\n"
+    "Capítulo 2: La virtud\n- Sección 1: Justicia\n- Sección 2: Templanza",
+    "# Libro\n\n## La mente\n### El control\n### La atención\n\n## La virtud\n### Justicia\n### Templanza",
+    "**Capítulo I: La mente**\n* **Sección 1:** El control\n* **Sección 2:** La atención\n"
+    "**Capítulo II: La virtud**\n* **Sección 1:** Justicia\n* **Sección 2:** Templanza",
+    "I. La mente\n   a) El control\n   b) La atención\nII. La virtud\n   a) Justicia\n   b) Templanza",
+    "1. La mente\n   1.1 El control\n   1.2 La atención\n2. La virtud\n   2.1 Justicia\n   2.2 Templanza",
+    "Capítulo 1 – \"La mente\"\n• Sección 1 – «El control»\n• Sección 2 – «La atención»\n"
+    "Capítulo 2 – \"La virtud\"\n• Sección 1 – «Justicia»\n• Sección 2 – «Templanza»",
+])
+def test_parse_esquema_formatos(esquema):
+    assert parse_esquema(esquema) == ESPERADO
+
+
+def test_parse_esquema_json_invalido_cae_al_texto():
+    esquema = '{"capitulos": [\nCapítulo 1: La mente\n- Sección 1: El control'
+    assert parse_esquema(esquema) == {"La mente": ["El control"]}
+
+
+def test_parse_esquema_sin_capitulos():
+    assert parse_esquema("") == {}
+    assert parse_esquema("Lo siento, no puedo ayudarte con eso.") == {}
+
+
+def test_parse_esquema_capitulos_repetidos_no_se_pisan():
+    esquema = "Capítulo 1: Repaso\n- Sección 1: A\nCapítulo 2: Repaso\n- Sección 1: B"
+    assert parse_esquema(esquema) == {"Repaso": ["A"], "Repaso (2)": ["B"]}
+
+
+def test_limpiar_titulo_conserva_la_palabra_sin_numero():
+    assert limpiar_titulo("Capítulo 3: El capítulo final") == "El capítulo final"
+    assert limpiar_titulo("Capítulos de la vida") == "Capítulos de la vida"
+    assert limpiar_titulo("**2.1 — «Epicteto»**") == "Epicteto"
+
+
+def test_validar_esquema_recorta_y_avisa():
+    capitulos = {"A": ["a1", "a2", "a3"], "Vacío": [], "B": ["b1"], "C": ["c1", "c2"]}
+    validos, avisos = validar_esquema(capitulos, 2, 2)
+    assert validos == {"A": ["a1", "a2"], "B": ["b1"]}
+    assert len(avisos) == 4  # capítulo vacío, secciones de más, de menos y capítulos de más
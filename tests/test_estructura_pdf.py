@@ -0,0 +1,42 @@
+from estructura_pdf import aplanar_estructura, estructurar_texto
+
+
+def test_estructurar_texto_con_partes():
+    paginas = [
+        "Prólogo sin encabezado\nParte I\nCapítulo 1\nSección 1\nTexto uno.\n",
+        "Sección 2\nTexto dos.\nCapítulo 2\nTexto del capítulo sin secciones.\n",
+        "Parte II\nCapítulo 3\nSección 1\nTexto tres.",
+    ]
+    assert estructurar_texto(paginas) == {
+        "Parte I": {
+            "Capítulo 1": {"Sección 1": "Texto uno.", "Sección 2": "Texto dos."},
+            "Capítulo 2": "Texto del capítulo sin secciones.",
+        },
+        "Parte II": {"Capítulo 3": {"Sección 1": "Texto tres."}},
+    }
+
+
+def test_estructurar_texto_sin_partes():
+    paginas = ["Capítulo 1\nSección 1\nUno.\nCapítulo 2\nDos."]
+    estructura = estructurar_texto(paginas)
+    assert estructura == {"Capítulo 1": {"Sección 1": "Uno."}, "Capítulo 2": "Dos."}
+    assert aplanar_estructura(estructura) == {"Capítulo 1 > Sección 1": "Uno.", "Capítulo 2": "Dos."}
+
+
+def test_estructurar_texto_omite_capitulos_anteriores_a_la_primera_parte():
+    paginas = ["Capítulo 1\nIntroducción.\nParte 1\nCapítulo 2\nTexto."]
+    assert estructurar_texto(paginas) == {"Parte 1": {"Capítulo 2": "Texto."}}
+
+
+def test_estructurar_texto_vacio_o_sin_encabezados():
+    assert estructurar_texto([]) == {}
+    assert estructurar_texto(["Solo texto corrido, sin capítulos."]) == {}
+
+
+def test_aplanar_estructura_con_partes():
+    estructura = {"Parte I": {"Capítulo 1": {"Sección 1": "a"}, "Capítulo 2": "b"}, "Epílogo": "c"}
+    assert aplanar_estructura(estructura) == {
+        "Parte I > Capítulo 1 > Sección 1": "a",
+        "Parte I > Capítulo 2": "b",
+        "Epílogo": "c",
+    }
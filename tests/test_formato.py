@@ -0,0 +1,63 @@
+from formato import ESTILO_NUMERADA, ESTILO_VINETA, VINETA, texto_a_parrafos
+
+
+def test_parrafos_separados_por_lineas_en_blanco():
+    assert texto_a_parrafos("Uno\ndos\n\n\nTres") == [
+        (None, [("Uno\ndos", False, False)]),
+        (None, [("Tres", False, False)]),
+    ]
+
+
+def test_negrita_y_cursiva_markdown():
+    assert texto_a_parrafos("Es **muy** *importante* y _claro_.") == [(None, [
+        ("Es ", False, False), ("muy", True, False), (" ", False, False), ("importante", False, True),
+        (" y ", False, False), ("claro", False, True), (".", False, False),
+    ])]
+
+
+def test_asteriscos_y_guiones_bajos_que_no_son_marcas():
+    assert texto_a_parrafos("5 * 3 = 15 y mi_variable_larga") == [(None, [("5 * 3 = 15 y mi_variable_larga", False, False)])]
+
+
+def test_encabezados_y_listas_markdown():
+    texto = "## Ideas clave\n- Primera\n* Segunda\n1. Paso uno\n2) Paso dos"
+    assert texto_a_parrafos(texto) == [
+        ("Heading2", [("Ideas clave", False, False)]),
+        (ESTILO_VINETA, [(VINETA + "Primera", False, False)]),
+        (ESTILO_VINETA, [(VINETA + "Segunda", False, False)]),
+        (ESTILO_NUMERADA, [("1. Paso uno", False, False)]),
+        (ESTILO_NUMERADA, [("2. Paso dos", False, False)]),
+    ]
+
+
+def test_html_sencillo_con_etiquetas_anidadas_y_entidades():
+    texto = "<h1>Título</h1><p>Texto <b>fuerte <i>y inclinado</i></b> &amp; más<br>línea</p>"
+    assert texto_a_parrafos(texto) == [
+        ("Heading1", [("Título", False, False)]),
+        (None, [("Texto ", False, False), ("fuerte ", True, False), ("y inclinado", True, True),
+                (" & más\nlínea", False, False)]),
+    ]
+
+
+def test_listas_html_numeradas_y_con_vinetas():
+    texto = "<ol><li>Uno</li><li>Dos</li></ol><ul><li>Punto</li></ul>"
+    assert texto_a_parrafos(texto) == [
+        (ESTILO_NUMERADA, [("1. Uno", False, False)]),
+        (ESTILO_NUMERADA, [("2. Dos", False, False)]),
+        (ESTILO_VINETA, [(VINETA + "Punto", False, False)]),
+    ]
+
+
+def test_preguntas_en_cursiva_solo_si_se_pide():
+    texto = "Una idea.\n¿Qué harías tú?"
+    assert texto_a_parrafos(texto) == [(None, [("Una idea.\n¿Qué harías tú?", False, False)])]
+    assert texto_a_parrafos(texto, preguntas_en_cursiva=True) == [
+        (None, [("Una idea.\n", False, False), ("¿Qué harías tú?", False, True)]),
+    ]
+
+
+def test_marcas_sin_cerrar_no_pasan_al_parrafo_siguiente():
+    assert texto_a_parrafos("**sin cerrar\n\nNormal") == [
+        (None, [("sin cerrar", True, False)]),
+        (None, [("Normal", False, False)]),
+    ]
@@ -0,0 +1,80 @@
+import pytest
+
+import pipeline
+from fragmentos import (agrupar_en_lotes, dividir_en_fragmentos, dividir_secciones, estimar_tokens,
+                        unir_fragmentos)
+from pipeline import adaptar_contenidos_concurrente, prompt_obra
+
+# Diez párrafos de unos 50 tokens cada uno
+PARRAFOS = [f"Párrafo {i}: " + "palabra " * 22 for i in range(10)]
+TEXTO = "\n\n".join(p.strip() for p in PARRAFOS)
+
+
+def test_texto_corto_en_un_solo_fragmento():
+    assert dividir_en_fragmentos("Breve.", 100) == [("", "Breve.")]
+
+
+def test_fragmentos_sin_solapamiento_cubren_el_texto_una_vez():
+    fragmentos = dividir_en_fragmentos(TEXTO, 150)
+    assert len(fragmentos) > 1
+    assert all(contexto == "" for contexto, _ in fragmentos)
+    assert all(estimar_tokens(fragmento) <= 150 for _, fragmento in fragmentos)
+    assert "\n\n".join(fragmento for _, fragmento in fragmentos) == TEXTO
+
+
+def test_el_solapamiento_va_como_contexto_y_no_se_repite():
+    fragmentos = dividir_en_fragmentos(TEXTO, 150, solapamiento=1)
+    # Cada párrafo se adapta una sola vez
+    assert "\n\n".join(fragmento for _, fragmento in fragmentos) == TEXTO
+    for (_, anterior), (contexto, fragmento) in zip(fragmentos, fragmentos[1:]):
+        assert contexto == anterior.split("\n\n")[-1]
+        assert estimar_tokens(contexto) + estimar_tokens(fragmento) <= 150
+
+
+def test_parrafo_enorme_se_corta_por_palabras():
+    fragmentos = dividir_en_fragmentos("palabra " * 200, 50)
+    assert len(fragmentos) > 1
+    assert all(estimar_tokens(fragmento) <= 50 for _, fragmento in fragmentos)
+
+
+def test_dividir_secciones_titula_los_fragmentos_y_devuelve_contextos():
+    contextos = {}
+    unidades = dividir_secciones({"Corta": "Breve.", "Larga": TEXTO, "Vacía": ""}, 150, 1, contextos)
+    assert unidades[("Corta", 1)] == ("Corta", "Breve.")
+    assert unidades[("Vacía", 1)] == ("Vacía", "")
+    largas = [clave for clave in unidades if clave[0] == "Larga"]
+    assert unidades[largas[0]][0] == f"Larga [Fragmento 1/{len(largas)}]"
+    assert set(contextos) == set(largas[1:])
+
+
+def test_unir_fragmentos_en_orden():
+    adaptaciones = {("A", 1): "a1", ("A", 2): "a2", ("B", 1): "b1"}
+    assert unir_fragmentos(adaptaciones) == {"A": "a1\n\na2", "B": "b1"}
+
+
+def test_agrupar_en_lotes_respeta_umbral_y_maximo():
+    unidades = {i: (f"T{i}", "x" * 40) for i in range(5)}  # 10 tokens cada una
+    unidades[5] = ("Larga", "x" * 400)
+    assert agrupar_en_lotes(unidades, umbral=20, presupuesto=1000, max_por_lote=2) == [[0, 1], [2, 3], [5], [4]]
+
+
+def test_prompt_obra_marca_el_contexto():
+    assert "Contexto" not in prompt_obra("Texto.", "Título")
+    prompt = prompt_obra("Texto.", "Título", "Párrafo anterior.")
+    assert prompt.index("Párrafo anterior.") < prompt.index("**Contenido Original:**")
+
+
+@pytest.mark.parametrize("umbral_lote", [0, 200])
+def test_adaptar_con_solapamiento_no_duplica_el_texto(monkeypatch, umbral_lote):
+    recibidos = []
+
+    def adaptar_contenido(contenido, titulo, api_key, url, cache, omitir_cache, al_recibir, cliente, enrutador,
+                          metricas, contexto=""):
+        recibidos.append((contenido, contexto))
+        return contenido
+
+    monkeypatch.setattr(pipeline, "adaptar_contenido", adaptar_contenido)
+    resultado = adaptar_contenidos_concurrente({"Larga": TEXTO}, "clave", presupuesto_tokens=150, solapamiento=1,
+                                               umbral_lote=umbral_lote)
+    assert resultado == {"Larga": TEXTO}
+    assert any(contexto for _, contexto in recibidos)
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+from cliente_llm import BackendLocal, completar
+from metricas import Metricas, percentil
+
+
+def test_percentil_por_rango_mas_cercano():
+    valores = [5, 1, 4, 2, 3]
+    assert percentil(valores, 50) == 3
+    assert percentil(valores, 90) == 5
+    assert percentil(valores, 1) == 1
+    assert percentil([], 50) is None
+
+
+def test_resumen_agrega_por_modelo_con_precios_propios():
+    metricas = Metricas({"propio": [1, 2]})
+    metricas.registrar_solicitud("gpt-4", 1.0, 0.2, 1000, 500)
+    metricas.registrar_solicitud("gpt-4", 3.0, None, 1000, 500, estimado=True)
+    metricas.registrar_solicitud("propio", 2.0, 0.1, 1_000_000, 1_000_000)
+    metricas.registrar_fallo("desconocido")
+    resumen = metricas.resumen()
+
+    solicitudes = resumen["solicitudes"]
+    assert solicitudes["total"] == 3 and solicitudes["fallidas"] == 1
+    assert solicitudes["latencia_segundos"] == {"p50": 2.0, "p90": 3.0, "p99": 3.0, "max": 3.0}
+    assert solicitudes["ttft_segundos"]["max"] == 0.2
+    assert solicitudes["con_tokens_estimados"] == 1
+    # gpt-4: 2000 * 30 + 1000 * 60 por millón; propio: 1 + 2
+    assert resumen["modelos"]["gpt-4"]["coste_estimado_usd"] == pytest.approx(0.12)
+    assert resumen["modelos"]["propio"]["coste_estimado_usd"] == pytest.approx(3.0)
+    assert solicitudes["coste_estimado_usd"] == pytest.approx(3.12)
+    assert resumen["modelos"]["desconocido"] == {
+        "solicitudes": 0, "fallidas": 1, "tokens_entrada": 0, "tokens_salida": 0, "coste_estimado_usd": 0.0,
+        "precio_conocido": False,
+    }
+
+
+def test_etapas_y_exportacion_json():
+    metricas = Metricas()
+    with metricas.etapa("adaptacion"):
+        pass
+    metricas.registrar_etapa("adaptacion", 2.0)
+    datos = json.loads(metricas.a_json())
+    assert datos["etapas"]["adaptacion"]["veces"] == 2
+    assert datos["etapas"]["adaptacion"]["segundos_total"] >= 2.0
+
+
+def test_exportacion_prometheus():
+    metricas = Metricas()
+    metricas.registrar_etapa('con "comillas"', 1.5)
+    metricas.registrar_solicitud("gpt-4", 0.5, 0.1, 10, 20)
+    texto = metricas.a_prometheus()
+    assert '# TYPE estoicos_etapa_segundos_total counter' in texto
+    assert 'estoicos_etapa_segundos_total{etapa="con \\"comillas\\""} 1.5' in texto
+    assert 'estoicos_solicitud_segundos{quantile="0.5"} 0.5' in texto
+    assert "estoicos_solicitud_segundos_count 1" in texto
+    assert 'estoicos_tokens_total{modelo="gpt-4",tipo="salida"} 20' in texto
+    assert texto.endswith("\n")
+
+
+def test_completar_registra_la_solicitud_y_estima_los_tokens():
+    metricas = Metricas()
+    payload = {"model": "gpt-4", "messages": [{"role": "user", "content": "x" * 40}]}
+    respuesta = completar(BackendLocal(lambda payload: "y" * 20), payload, metricas=metricas)
+    assert respuesta.texto == "y" * 20
+    solicitud = metricas.solicitudes[0]
+    assert solicitud["modelo"] == "local/gpt-4"
+    assert (solicitud["tokens_entrada"], solicitud["tokens_salida"], solicitud["estimado"]) == (10, 5, True)
+
+
+def test_completar_registra_los_fallos():
+    def responder(payload):
+        raise RuntimeError("caído")
+
+    metricas = Metricas()
+    with pytest.raises(RuntimeError):
+        completar(BackendLocal(responder), {"model": "gpt-4", "messages": []}, metricas=metricas)
+    assert metricas.fallos == {"local/gpt-4": 1}
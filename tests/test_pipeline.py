@@ -0,0 +1,154 @@
+import json
+import time
+
+import pytest
+
+from cola import EjecutorJusto
+from pipeline import ErrorLote, adaptar_contenidos_concurrente, separar_lote
+from trabajos import DiarioTrabajo
+
+
+def test_separar_lote_en_orden():
+    respuesta = "=== ADAPTACIÓN 1 ===\nPrimera.\n\n=== ADAPTACIÓN 2 ===\nSegunda\ncon dos líneas."
+    assert separar_lote(respuesta, 2) == ["Primera.", "Segunda\ncon dos líneas."]
+
+
+def test_separar_lote_tolera_marcas_decoradas():
+    # Algunos modelos envuelven la marca en Markdown o la escriben sin tilde
+    respuesta = "Aquí tienes:\n## === ADAPTACION 1 ===\nUno\n**=== Adaptación 2 ===**\nDos"
+    assert separar_lote(respuesta, 2) == ["Uno", "Dos"]
+
+
+def test_separar_lote_ignora_la_marca_dentro_de_una_linea():
+    respuesta = "=== ADAPTACIÓN 1 ===\nVer la === ADAPTACIÓN 2 === más abajo.\n=== ADAPTACIÓN 2 ===\nDos"
+    assert separar_lote(respuesta, 2) == ["Ver la === ADAPTACIÓN 2 === más abajo.", "Dos"]
+
+
+@pytest.mark.parametrize("respuesta", [
+    "=== ADAPTACIÓN 1 ===\nUno",  # falta una
+    "=== ADAPTACIÓN 2 ===\nDos\n=== ADAPTACIÓN 1 ===\nUno",  # desordenadas
+    "=== ADAPTACIÓN 1 ===\nUno\n=== ADAPTACIÓN 1 ===\nOtra vez\n=== ADAPTACIÓN 2 ===\nDos",  # repetida
+    "Una sola adaptación sin marcas",
+])
+def test_separar_lote_rechaza_marcas_incorrectas(respuesta):
+    with pytest.raises(ErrorLote):
+        separar_lote(respuesta, 2)
+
+
+def test_separar_lote_rechaza_adaptaciones_vacias():
+    with pytest.raises(ErrorLote):
+        separar_lote("=== ADAPTACIÓN 1 ===\n   \n=== ADAPTACIÓN 2 ===\nDos", 2)
+
+
+# Adaptación simulada: cada título tarda lo indicado en retrasos (para que terminen desordenados)
+# y los títulos de fallos lanzan una excepción
+@pytest.fixture
+def simular(monkeypatch):
+    import pipeline
+
+    estado = {"pedidas": [], "retrasos": {}, "fallos": set()}
+
+    def adaptar_contenido(contenido, titulo, *args):
+        estado["pedidas"].append(titulo)
+        time.sleep(estado["retrasos"].get(titulo, 0))
+        if titulo in estado["fallos"]:
+            raise RuntimeError(f"fallo en {titulo}")
+        return f"Adaptado: {contenido}"
+
+    monkeypatch.setattr(pipeline, "adaptar_contenido", adaptar_contenido)
+    return estado
+
+
+def test_adaptar_entrega_en_el_orden_original(simular):
+    simular["retrasos"] = {"Uno": 0.2, "Dos": 0.1}
+    secciones = {"Uno": "Texto uno.", "Dos": "Texto dos.", "Tres": "Texto tres.", "Vacía": ""}
+    terminadas = []
+    avisos = []
+    resultado = adaptar_contenidos_concurrente(
+        secciones, "clave", max_concurrencia=4,
+        al_completar=lambda titulo, adaptacion, error, hechos, total: avisos.append((titulo, hechos, total)),
+        al_terminar_seccion=lambda titulo, adaptacion: terminadas.append(titulo),
+    )
+    assert list(resultado) == list(secciones)
+    assert resultado["Uno"] == "Adaptado: Texto uno." and resultado["Vacía"] == "Contenido no disponible."
+    assert terminadas == list(secciones)
+    # al_completar sigue el orden de llegada, con el recuento acumulado
+    assert [hechos for _, hechos, _ in avisos] == [1, 2, 3, 4]
+    assert avisos[-1][0] == "Uno" and all(total == 4 for _, _, total in avisos)
+
+
+def test_adaptar_con_el_ejecutor_de_la_cola(simular):
+    compartido = EjecutorJusto(max_hilos=2)
+    try:
+        resultado = adaptar_contenidos_concurrente({"Uno": "Texto uno.", "Dos": "Texto dos."}, "clave",
+                                                   ejecutor=compartido.para("usuario", 2))
+        # El ejecutor compartido sigue abierto para otros trabajos
+        assert compartido.enviar("otro", lambda: 1).result(timeout=5) == 1
+    finally:
+        compartido.cerrar()
+    assert resultado == {"Uno": "Adaptado: Texto uno.", "Dos": "Adaptado: Texto dos."}
+
+
+def test_adaptar_los_fallos_se_reintentan_al_reanudar(simular, tmp_path):
+    simular["fallos"] = {"Dos"}
+    diario = DiarioTrabajo("reanudar", directorio=str(tmp_path))
+    errores = []
+    resultado = adaptar_contenidos_concurrente(
+        {"Uno": "Texto uno.", "Dos": "Texto dos."}, "clave", diario=diario,
+        al_completar=lambda titulo, adaptacion, error, *_: errores.append(error) if error else None,
+    )
+    assert resultado["Dos"] == "Error en la adaptación."
+    assert len(errores) == 1 and diario.fallidos() == [json.dumps(["Dos", 1], ensure_ascii=False)]
+
+    simular["fallos"] = set()
+    simular["pedidas"].clear()
+    resultado = adaptar_contenidos_concurrente({"Uno": "Texto uno.", "Dos": "Texto dos."}, "clave", diario=diario)
+    assert simular["pedidas"] == ["Dos"]
+    assert resultado == {"Uno": "Adaptado: Texto uno.", "Dos": "Adaptado: Texto dos."}
+    assert diario.fallidos() == []
+
+
+def test_adaptar_duplicadas_sin_pedirlas(simular):
+    texto = "El sabio vive conforme a la naturaleza y acepta con serenidad lo que no depende de él."
+    estadisticas = {}
+    resultado = adaptar_contenidos_concurrente(
+        {"Original": texto, "Copia": texto, "Índice": "Capítulo 1 ........ 3\nCapítulo 2 ........ 9"},
+        "clave", deduplicar=True, estadisticas_lotes=estadisticas,
+    )
+    assert simular["pedidas"] == ["Original"]
+    assert resultado == {"Original": f"Adaptado: {texto}", "Copia": f"Adaptado: {texto}"}
+    assert estadisticas["secciones_duplicadas"] == 1 and estadisticas["secciones_descartadas"] == 1
+
+
+def test_adaptar_lote_que_no_se_puede_separar_se_pide_uno_a_uno(simular, monkeypatch):
+    import pipeline
+
+    def adaptar_lote(elementos, *args):
+        raise ErrorLote("sin marcas")
+
+    monkeypatch.setattr(pipeline, "adaptar_lote", adaptar_lote)
+    estadisticas = {}
+    resultado = adaptar_contenidos_concurrente({"Uno": "Texto uno.", "Dos": "Texto dos."}, "clave", umbral_lote=100,
+                                               estadisticas_lotes=estadisticas)
+    assert resultado == {"Uno": "Adaptado: Texto uno.", "Dos": "Adaptado: Texto dos."}
+    assert estadisticas["lotes"] == 1 and estadisticas["lotes_fallidos"] == 1
+    assert sorted(simular["pedidas"]) == ["Dos", "Uno"]
+
+
+def test_adaptar_cartas_en_el_orden_pedido_y_sin_repetir(monkeypatch):
+    import pipeline
+
+    pedidas = []
+
+    def adaptar_carta(contenido, numero, *args, **kwargs):
+        pedidas.append(numero)
+        time.sleep(0.1 if numero == 3 else 0)
+        return f"Carta {numero} adaptada"
+
+    monkeypatch.setattr(pipeline, "adaptar_carta", adaptar_carta)
+    resultado = pipeline.adaptar_cartas_concurrente(
+        [3, 1, 3, 2], lambda numero: "" if numero == 2 else f"Texto {numero}", "clave"
+    )
+    assert list(resultado) == ["Letter 3", "Letter 1", "Letter 2"]
+    assert resultado["Letter 2"] == "Contenido no disponible."
+    assert sorted(pedidas) == [1, 3]
@@ -0,0 +1,82 @@
+import pytest
+
+import pipeline
+import revisiones
+from revisiones import RegistroRevisiones, comparar_ediciones, huella_seccion, huellas_secciones
+
+
+@pytest.fixture
+def registro(tmp_path):
+    return RegistroRevisiones(str(tmp_path / "revisiones.sqlite"))
+
+
+def test_la_huella_ignora_espacios_saltos_y_guiones_de_fin_de_linea():
+    original = "El sabio vive conforme a la natura-\nleza y acepta su destino."
+    extraido_de_nuevo = "El sabio  vive conforme\na la naturaleza y acepta su destino. "
+    assert huella_seccion(original) == huella_seccion(extraido_de_nuevo)
+    assert huella_seccion(original) != huella_seccion("El sabio vive conforme a la razón.")
+
+
+def test_comparar_ediciones():
+    anteriores = {"A": "1", "B": "2", "C": "3"}
+    actuales = {"A": "1", "B": "cambiada", "D": "4"}
+    assert comparar_ediciones(anteriores, actuales) == {
+        "nuevas": ["D"], "modificadas": ["B"], "eliminadas": ["C"], "sin_cambios": ["A"],
+    }
+
+
+def test_adaptaciones_por_huella_y_parametros(registro):
+    registro.guardar_adaptacion("h1", "p1", "Adaptación 1")
+    registro.guardar_adaptacion("h2", "p2", "Adaptación 2")
+    assert registro.adaptaciones(["h1", "h2", "h3"], "p1") == {"h1": "Adaptación 1"}
+    # Muchas huellas a la vez: se consultan por bloques
+    assert registro.adaptaciones([f"x{i}" for i in range(1200)] + ["h2"], "p2") == {"h2": "Adaptación 2"}
+
+
+def test_edicion_anterior_con_mas_secciones_en_comun(registro, monkeypatch):
+    reloj = iter(range(100, 200))
+    monkeypatch.setattr(revisiones.time, "time", lambda: next(reloj))
+    registro.guardar_edicion("pdf_a", {"Uno": "h1", "Dos": "h2"})
+    registro.guardar_edicion("pdf_b", {"Uno": "h1", "Dos": "h2", "Tres": "h3"})
+    registro.guardar_edicion("pdf_c", {"Otra": "z"})
+    actuales = {"Uno": "h1", "Dos": "h2", "Tres": "h3-corregida"}
+    # pdf_a y pdf_b comparten dos secciones: gana la más reciente
+    assert registro.edicion_anterior(actuales, "pdf_nuevo") == ("pdf_b", {"Uno": "h1", "Dos": "h2", "Tres": "h3"})
+    # La propia edición no cuenta
+    assert registro.edicion_anterior({"Otra": "z"}, "pdf_c") is None
+
+
+def test_solo_cambios_readapta_solo_lo_modificado(registro, monkeypatch):
+    pedidas = []
+
+    def adaptar_contenido(contenido, titulo, *args):
+        pedidas.append(titulo)
+        return f"Adaptado: {contenido}"
+
+    monkeypatch.setattr(pipeline, "adaptar_contenido", adaptar_contenido)
+    primera = {"Uno": "Texto uno.", "Dos": "Texto dos."}
+    pipeline.adaptar_contenidos_concurrente(primera, "clave", revisiones=registro)
+    registro.guardar_edicion("pdf_1", huellas_secciones(primera))
+    pedidas.clear()
+
+    corregida = {"Uno": "Texto\nuno.", "Dos": "Texto dos corregido.", "Tres": "Texto tres."}
+    estadisticas = {}
+    resultado = pipeline.adaptar_contenidos_concurrente(corregida, "clave", revisiones=registro, solo_cambios=True,
+                                                        estadisticas_lotes=estadisticas)
+    assert sorted(pedidas) == ["Dos", "Tres"]
+    assert resultado["Uno"] == "Adaptado: Texto uno."
+    assert estadisticas["secciones_reutilizadas"] == 1
+    pedidas.clear()
+    # Con otros parámetros no se reutiliza nada
+    pipeline.adaptar_contenidos_concurrente(corregida, "clave", revisiones=registro, solo_cambios=True,
+                                            presupuesto_tokens=500)
+    assert sorted(pedidas) == ["Dos", "Tres", "Uno"]
+
+
+def test_omitir_cache_vuelve_a_adaptarlo_todo(registro, monkeypatch):
+    pedidas = []
+    monkeypatch.setattr(pipeline, "adaptar_contenido", lambda contenido, titulo, *args: pedidas.append(titulo) or "A")
+    secciones = {"Uno": "Texto uno."}
+    pipeline.adaptar_contenidos_concurrente(secciones, "clave", revisiones=registro)
+    pipeline.adaptar_contenidos_concurrente(secciones, "clave", revisiones=registro, solo_cambios=True, omitir_cache=True)
+    assert pedidas == ["Uno", "Uno"]
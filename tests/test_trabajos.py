@@ -0,0 +1,79 @@
+import pytest
+
+import pipeline
+from pipeline import adaptar_contenidos_concurrente
+from trabajos import DiarioTrabajo, id_trabajo, id_valido
+
+
+@pytest.fixture
+def diario(tmp_path):
+    return DiarioTrabajo("prueba", directorio=str(tmp_path))
+
+
+# Sustituye la llamada a la API por una adaptación simulada que cuenta las solicitudes
+@pytest.fixture
+def pedidas(monkeypatch):
+    pedidas = []
+
+    def adaptar_contenido(contenido, titulo, *args, **kwargs):
+        pedidas.append(titulo)
+        return f"Adaptado: {contenido}"
+
+    monkeypatch.setattr(pipeline, "adaptar_contenido", adaptar_contenido)
+    return pedidas
+
+
+def test_id_trabajo_estable_y_valido():
+    assert id_trabajo("obra", "abc", 1) == id_trabajo("obra", "abc", 1)
+    assert id_trabajo("obra", "abc", 1) != id_trabajo("obra", "abc", 2)
+    assert id_valido(id_trabajo("obra"))
+    for invalido in ["", "../fuera", "a/b", "con espacio"]:
+        assert not id_valido(invalido)
+    with pytest.raises(ValueError):
+        DiarioTrabajo("../fuera")
+
+
+def test_diario_guarda_el_ultimo_resultado_de_cada_clave(diario):
+    diario.registrar("a", "Error en la adaptación.", "error")
+    diario.registrar("b", "Texto b")
+    assert diario.fallidos() == ["a"]
+    diario.registrar("a", "Texto a")
+    assert diario.completados() == {"a": "Texto a", "b": "Texto b"}
+    assert diario.fallidos() == []
+
+
+def test_diario_ignora_una_linea_cortada(diario):
+    diario.registrar("a", "Texto a")
+    with open(diario.ruta, "a", encoding="utf-8") as f:
+        f.write('{"clave": "b", "est')
+    assert diario.completados() == {"a": "Texto a"}
+
+
+def test_diario_filtra_por_huella(diario):
+    diario.registrar("a", "Texto a", huella="h1")
+    diario.registrar("b", "Texto b")
+    assert diario.completados({"a": "h1", "b": "h2"}) == {"a": "Texto a"}
+    assert diario.completados({"a": "otra"}) == {}
+
+
+def test_reanudar_solo_pide_lo_pendiente(diario, pedidas):
+    secciones = {"Uno": "Texto uno.", "Dos": "Texto dos."}
+    primera = adaptar_contenidos_concurrente(secciones, "clave", diario=diario)
+    assert sorted(pedidas) == ["Dos", "Uno"]
+    pedidas.clear()
+    assert adaptar_contenidos_concurrente(secciones, "clave", diario=diario) == primera
+    assert pedidas == []
+
+
+def test_reanudar_con_otro_texto_u_opciones_no_reutiliza(diario, pedidas):
+    adaptar_contenidos_concurrente({"Uno": "Texto uno.", "Dos": "Texto dos."}, "clave", diario=diario)
+    pedidas.clear()
+    # Mismo id y mismos títulos, pero otro PDF: solo cambia el texto de "Dos"
+    resultado = adaptar_contenidos_concurrente({"Uno": "Texto uno.", "Dos": "Texto nuevo."}, "clave", diario=diario)
+    assert pedidas == ["Dos"]
+    assert resultado["Dos"] == "Adaptado: Texto nuevo."
+    pedidas.clear()
+    # Otro presupuesto de tokens: todas las entradas quedan descartadas
+    adaptar_contenidos_concurrente({"Uno": "Texto uno.", "Dos": "Texto nuevo."}, "clave", diario=diario,
+                                   presupuesto_tokens=500)
+    assert sorted(pedidas) == ["Dos", "Uno"]
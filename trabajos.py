@@ -0,0 +1,91 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+# Diario de trabajos por lotes (obra completa o todas las cartas)
+# Cada resultado se añade a un fichero JSONL en cuanto termina, así que un refresco del navegador
+# o un reinicio del servidor no pierde lo ya pagado: al reanudar el trabajo con el mismo id
+# se saltan las claves completadas y solo se repiten las pendientes o fallidas.
+# Cada entrada puede llevar una huella de lo que la produjo (texto de origen y parámetros): al reanudar
+# con un id escrito a mano tras cambiar el PDF o las opciones, las entradas cuya huella no coincide se descartan.
+
+DIRECTORIO_TRABAJOS = os.environ.get("ESTOICOS_TRABAJOS", ".trabajos")
+# Los ids forman el nombre del fichero del diario: nada de separadores de ruta ni "..", que saldrían del directorio
+PATRON_ID_TRABAJO = re.compile(r'^[0-9A-Za-z_-]+$')
+
+
+# Función para derivar un id de trabajo estable a partir de sus parámetros
+def id_trabajo(*partes):
+    datos = json.dumps(partes, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()[:16]
+
+
+# Función para comprobar que un id (por ejemplo, el escrito por el usuario para reanudar) es válido
+def id_valido(id_trabajo):
+    return bool(PATRON_ID_TRABAJO.match(id_trabajo or ""))
+
+
+class DiarioTrabajo:
+    def __init__(self, id_trabajo, directorio=DIRECTORIO_TRABAJOS):
+        if not id_valido(id_trabajo):
+            raise ValueError(f"Id de trabajo no válido: {id_trabajo!r} (solo letras, números, '_' y '-')")
+        os.makedirs(directorio, exist_ok=True)
+        self.id = id_trabajo
+        self.ruta = os.path.join(directorio, f"{id_trabajo}.jsonl")
+        self._candado = threading.Lock()
+
+    # Añade el resultado de una clave al diario y lo fuerza a disco
+    def registrar(self, clave, texto, estado="ok", huella=None):
+        entrada = {"clave": clave, "estado": estado, "texto": texto, "hora": time.time()}
+        if huella is not None:
+            entrada["huella"] = huella
+        linea = json.dumps(entrada, ensure_ascii=False)
+        with self._candado:
+            with open(self.ruta, "a", encoding="utf-8") as f:
+                f.write(linea + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+    # Devuelve {clave: {"estado": ..., "texto": ..., "huella": ...}} con el último resultado de cada clave
+    def resultados(self):
+        resultados = {}
+        if not os.path.exists(self.ruta):
+            return resultados
+        with self._candado:
+            with open(self.ruta, encoding="utf-8") as f:
+                for linea in f:
+                    try:
+                        entrada = json.loads(linea)
+                    except json.JSONDecodeError:
+                        continue  # Línea incompleta por un corte a mitad de escritura
+                    resultados[entrada["clave"]] = {
+                        "estado": entrada["estado"], "texto": entrada["texto"], "huella": entrada.get("huella")
+                    }
+        return resultados
+
+    # Devuelve {clave: texto} de las claves completadas con éxito
+    # Con huellas ({clave: huella}) solo cuentan las entradas registradas con la misma huella
+    def completados(self, huellas=None):
+        return {clave: r["texto"] for clave, r in self.resultados().items()
+                if r["estado"] == "ok" and (huellas is None or (clave in huellas and huellas[clave] == r["huella"]))}
+
+    def fallidos(self):
+        return [clave for clave, r in self.resultados().items() if r["estado"] != "ok"]
+
+    # El documento montado a partir de los resultados (documento.Documento en JSON) se guarda junto
+    # al diario para poder volver a ofrecer las descargas sin repetir el trabajo
+    def guardar_documento(self, datos):
+        ruta = self.ruta[:-len(".jsonl")] + ".documento.json"
+        with open(ruta + ".tmp", "w", encoding="utf-8") as f:
+            f.write(datos)
+        os.replace(ruta + ".tmp", ruta)
+
+    def leer_documento(self):
+        ruta = self.ruta[:-len(".jsonl")] + ".documento.json"
+        if not os.path.exists(ruta):
+            return None
+        with open(ruta, encoding="utf-8") as f:
+            return f.read()
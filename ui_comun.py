@@ -0,0 +1,145 @@
+import streamlit as st
+import uuid
+from cache_llm import CacheLLM
+from cliente_llm import crear_cliente, crear_enrutador
+from cola import ColaTrabajos
+from documento import FORMATOS
+from pipeline import exportar_a_bytes
+
+# Piezas de interfaz comunes a las aplicaciones de Streamlit (filos.py, seneca.py y seneca2.py)
+# Los recursos con st.cache_resource se crean una vez por proceso y los comparten todas las sesiones y
+# las tres aplicaciones si se sirven desde el mismo servidor.
+
+
+# Caché de adaptaciones y secciones generadas
+@st.cache_resource
+def obtener_cache():
+    return CacheLLM()
+
+
+# Cliente HTTP: un único límite de solicitudes y tokens por minuto (configurable en la sección [limites]
+# de los secrets), reintentos con espera y cortacircuitos
+@st.cache_resource
+def obtener_cliente():
+    return crear_cliente(st.secrets.get("limites", {}))
+
+
+# Backends y reglas de enrutado opcionales de una aplicación ("obra", "cartas" o "libro"): secciones [backends]
+# y [enrutado.<aplicacion>] de los secrets, por ejemplo para enviar las secciones cortas a un modelo más barato
+@st.cache_resource
+def obtener_enrutador(aplicacion):
+    return crear_enrutador(st.secrets.get("backends", {}), st.secrets.get("enrutado", {}).get(aplicacion), obtener_cliente())
+
+
+# Cola de trabajos: los trabajos se ejecutan en segundo plano y sus solicitudes se reparten por turnos
+# entre usuarios (sección [cola] de los secrets: hilos y trabajos_simultaneos)
+@st.cache_resource
+def obtener_cola():
+    config = st.secrets.get("cola", {})
+    return ColaTrabajos(config.get("hilos", 16), config.get("trabajos_simultaneos", 4))
+
+
+# Identificador del usuario de esta sesión para repartir los turnos de la cola
+def obtener_usuario():
+    if "usuario" not in st.session_state:
+        st.session_state["usuario"] = uuid.uuid4().hex
+    return st.session_state["usuario"]
+
+
+# Progreso de un trabajo de la cola, consultado cada segundo sin volver a ejecutar toda la página
+# Al terminar se vuelve a ejecutar la página para mostrar el resultado y las descargas
+@st.fragment(run_every=1.0)
+def seguir_trabajo(id_trabajo_cola):
+    trabajo = obtener_cola().obtener(id_trabajo_cola)
+    if trabajo is None or trabajo.terminado:
+        st.rerun()
+    estado = trabajo.instantanea()
+    if estado["estado"] == "en_cola":
+        st.info(f"Trabajo {estado['id']} en cola (posición {obtener_cola().posicion(estado['id'])}).")
+        return
+    st.progress(estado["hechos"] / estado["total"] if estado["total"] else 0.0)
+    st.text(estado["mensaje"])
+    st.caption(f"Trabajo {estado['id']}: se puede cerrar la pestaña y volver con este id para ver el resultado.")
+    for error in estado["errores"]:
+        st.error(error)
+    # Tokens de las secciones o cartas en curso a medida que llegan
+    for titulo, texto in estado["parciales"].items():
+        st.markdown(f"**{titulo}**")
+        st.markdown(texto[-2000:] or "_Esperando el primer token..._")
+
+
+# Resultado de un trabajo terminado: se pasa a la sesión una sola vez y se muestra su resumen
+# mostrar_detalles(resultado) añade lo propio de cada aplicación antes del estado de la caché
+def mostrar_resultado(trabajo, mostrar_detalles=None):
+    estado = trabajo.instantanea()
+    if estado["estado"] == "error":
+        st.error(f"El trabajo {estado['id']} falló: {estado['error']}")
+        return
+    resultado = trabajo.resultado
+    if st.session_state.get("resultado_mostrado") != (estado["id"], estado["fin"]):
+        st.session_state["documento"] = resultado["documento"]
+        st.session_state["metricas"] = resultado["metricas"]
+        st.session_state["resultado_mostrado"] = (estado["id"], estado["fin"])
+    for error in estado["errores"]:
+        st.error(error)
+    if mostrar_detalles:
+        mostrar_detalles(resultado)
+    stats = obtener_cache().estadisticas()
+    st.sidebar.caption(f"Caché: {stats['aciertos']} aciertos, {stats['fallos']} fallos, {stats['entradas']} entradas")
+    st.success(f"Trabajo {estado['id']} terminado en {estado['fin'] - estado['inicio']:.1f} s.")
+
+
+# Botones de descarga: cada formato se genera a partir del documento solo cuando se pulsa su botón
+def mostrar_descargas(documento, nombre_base, metricas=None):
+    columnas = st.columns(len(FORMATOS))
+    for columna, (formato, datos) in zip(columnas, FORMATOS.items()):
+        columna.download_button(
+            label=f"Descargar {datos['nombre']}",
+            data=lambda formato=formato: exportar_a_bytes(documento, formato, metricas),
+            file_name=nombre_base + datos["extension"],
+            mime=datos["mime"],
+            on_click="ignore",
+            key=f"descargar_{formato}",
+        )
+
+
+# Panel con las métricas de la última ejecución y su exportación en JSON o para Prometheus
+def mostrar_metricas(metricas):
+    resumen = metricas.resumen()
+    solicitudes = resumen["solicitudes"]
+    latencia = solicitudes["latencia_segundos"]
+    with st.expander("Métricas de la última ejecución", expanded=True):
+        col_solicitudes, col_latencia, col_tokens, col_coste = st.columns(4)
+        col_solicitudes.metric("Solicitudes a la API", solicitudes["total"], help=f"{solicitudes['fallidas']} fallidas")
+        col_latencia.metric(
+            "Latencia p50 / p90",
+            f"{latencia['p50']:.2f} / {latencia['p90']:.2f} s" if latencia["p50"] is not None else "-",
+            help=f"p99 {latencia['p99']:.2f} s, máxima {latencia['max']:.2f} s" if latencia["p99"] is not None else None,
+        )
+        col_tokens.metric("Tokens de entrada / salida", f"{solicitudes['tokens_entrada']} / {solicitudes['tokens_salida']}")
+        col_coste.metric("Coste estimado", f"{solicitudes['coste_estimado_usd']:.4f} USD")
+        if solicitudes["con_tokens_estimados"]:
+            st.caption(f"Tokens estimados en {solicitudes['con_tokens_estimados']} solicitudes sin el campo usage.")
+        st.table({
+            "Etapa": list(resumen["etapas"]),
+            "Veces": [datos["veces"] for datos in resumen["etapas"].values()],
+            "Segundos": [round(datos["segundos_total"], 2) for datos in resumen["etapas"].values()],
+        })
+        if resumen["modelos"]:
+            st.table({
+                "Modelo": list(resumen["modelos"]),
+                "Solicitudes": [datos["solicitudes"] for datos in resumen["modelos"].values()],
+                "Tokens de entrada": [datos["tokens_entrada"] for datos in resumen["modelos"].values()],
+                "Tokens de salida": [datos["tokens_salida"] for datos in resumen["modelos"].values()],
+                "Coste (USD)": [round(datos["coste_estimado_usd"], 4) for datos in resumen["modelos"].values()],
+            })
+        col_json, col_prometheus = st.columns(2)
+        col_json.download_button(
+            "Exportar métricas (JSON)", data=metricas.a_json, file_name="metricas.json", mime="application/json",
+            on_click="ignore", key="metricas_json",
+        )
+        col_prometheus.download_button(
+            "Exportar métricas (Prometheus)", data=metricas.a_prometheus, file_name="metricas.prom", mime="text/plain",
+            on_click="ignore", key="metricas_prometheus",
+        )
+